@@ -0,0 +1,172 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from data import AnimFrame, AnimGroup
+
+# Where a bulk edit applies.
+SCOPE_SELECTION = "selection"
+SCOPE_DIRECTION = "direction"
+SCOPE_GROUP = "group"
+SCOPE_ALL = "all"
+
+# frameIndex, flip, duration, shadow x and y, sprite x and y of a frame, what a bulk edit can change.
+FrameValues = Tuple[int, int, int, int, int, int, int]
+
+
+@dataclass
+class BulkEdit:
+    spriteOffset: Tuple[int, int] = (0, 0)  # Added to every sprite offset.
+    shadowOffset: Tuple[int, int] = (0, 0)  # Added to every shadow offset.
+    durationScale: float = 1.0
+    flip: Optional[bool] = None  # None leaves flips as they are.
+    frameRemap: Dict[int, int] = field(default_factory=dict)  # Sheet frame index to replace with another.
+
+    @property
+    def empty(self) -> bool:
+        return (self.spriteOffset == (0, 0) and self.shadowOffset == (0, 0) and self.durationScale == 1
+                and self.flip is None and not self.frameRemap)
+
+    def describe(self) -> str:
+        parts = []
+        if self.spriteOffset != (0, 0):
+            parts.append(f"sprite offset {self.spriteOffset[0]:+d}, {self.spriteOffset[1]:+d}")
+        if self.shadowOffset != (0, 0):
+            parts.append(f"shadow offset {self.shadowOffset[0]:+d}, {self.shadowOffset[1]:+d}")
+        if self.durationScale != 1:
+            parts.append(f"durations x{self.durationScale:g}")
+        if self.flip is not None:
+            parts.append("flipped" if self.flip else "not flipped")
+        if self.frameRemap:
+            parts.append("frames " + ", ".join(f"{old}>{new}" for old, new in self.frameRemap.items()))
+
+        return "; ".join(parts)
+
+
+@dataclass
+class BulkEditRecord:
+    """What one bulk edit changed, enough to undo it as a whole."""
+    description: str
+    frames: List[Tuple[AnimFrame, FrameValues]] = field(default_factory=list)  # Values before the edit.
+    groups: List[Tuple[AnimGroup, str, bool]] = field(default_factory=list)  # copyName and modified before.
+    sequences: List[Tuple[AnimGroup, int]] = field(default_factory=list)  # (group, direction) that changed.
+
+    def touches(self, group: AnimGroup) -> bool:
+        return any(changed is group for changed, _, _ in self.groups)
+
+    def undo(self):
+        for frame, values in self.frames:
+            setFrameValues(frame, values)
+
+        for group, copyName, modified in self.groups:
+            group.copyName = copyName
+            group.modified = modified
+
+        for group, direction in self.sequences:
+            group.directions[direction].invalidate()
+
+
+def dropTouching(history: List[BulkEditRecord], group: AnimGroup) -> bool:
+    """Undoing a bulk edit restores the values from before it, over any edit of the group made since. Drop the records
+    that touched the group from the history, and the older ones, which could only be undone under them."""
+    touched = [index for index, record in enumerate(history) if record.touches(group)]
+    if touched:
+        del history[:touched[-1] + 1]
+
+    return bool(touched)
+
+
+def frameValues(frame: AnimFrame) -> FrameValues:
+    return (frame.frameIndex, frame.flip, frame.duration, frame.shadowOffset.x, frame.shadowOffset.y,
+            frame.spriteOffset.x, frame.spriteOffset.y)
+
+
+def setFrameValues(frame: AnimFrame, values: FrameValues):
+    (frame.frameIndex, frame.flip, frame.duration, frame.shadowOffset.x, frame.shadowOffset.y,
+     frame.spriteOffset.x, frame.spriteOffset.y) = values
+
+
+def parseFrameRemap(text: str) -> Dict[int, int]:
+    """Remap pairs written as "4>7, 5>8", sheet frame 4 becomes 7 and 5 becomes 8."""
+    remap = {}
+    for pair in text.replace(";", ",").split(","):
+        if not pair.strip():
+            continue
+
+        try:
+            old, new = (int(value) for value in pair.split(">"))
+        except ValueError:
+            raise ValueError(f"'{pair.strip()}' is not a frame remap, write them as 4>7.")
+
+        remap[old] = new
+
+    return remap
+
+
+def _editedValues(values: FrameValues, edit: BulkEdit) -> FrameValues:
+    frameIndex, flip, duration, shadowX, shadowY, spriteX, spriteY = values
+    frameIndex = edit.frameRemap.get(frameIndex, frameIndex)
+    if edit.flip is not None:
+        flip = int(edit.flip)
+    if edit.durationScale != 1:
+        duration = max(1, round(duration * edit.durationScale))
+
+    return (frameIndex, flip, duration, shadowX + edit.shadowOffset[0], shadowY + edit.shadowOffset[1],
+            spriteX + edit.spriteOffset[0], spriteY + edit.spriteOffset[1])
+
+
+def _wholeGroups(targets: List[Tuple[AnimGroup, int, List[AnimFrame]]]) -> Set[int]:
+    """Ids of the groups every frame of which is a target."""
+    covered = {}
+    for group, direction, frames in targets:
+        if frames is group.directions[direction].frames:
+            covered.setdefault(id(group), set()).add(direction)
+
+    return {id(group) for group, _, _ in targets if len(covered.get(id(group), ())) == len(group.directions)}
+
+
+def applyBulkEdit(targets: List[Tuple[AnimGroup, int, List[AnimFrame]]], edit: BulkEdit,
+                  frameCount: Optional[int] = None) -> BulkEditRecord:
+    """Apply the edit to the frames of every (group, direction, frames) target in one pass, and return the record to
+    undo it with. Remapped indexes are checked against the frame count first, so an invalid edit changes nothing.
+    Edited groups stop being copies, like any other edit, unless the group they copy gets the same edit throughout."""
+    if edit.durationScale <= 0:
+        raise ValueError("Durations can only be scaled by a positive factor.")
+
+    if frameCount is not None:
+        invalid = [new for new in edit.frameRemap.values() if not 0 <= new < frameCount]
+        if invalid:
+            raise ValueError(f"Frame {invalid[0]} does not exist, the sheet has {frameCount} frames.")
+
+    whole = _wholeGroups(targets)
+    wholeNames = {group.name for group, _, _ in targets if id(group) in whole}
+
+    record = BulkEditRecord(edit.describe())
+    seenFrames = set()
+    seenGroups = set()
+    for group, direction, frames in targets:
+        changed = False
+        for frame in frames:
+            # A frame listed twice still only moves once.
+            if id(frame) in seenFrames:
+                continue
+            seenFrames.add(id(frame))
+
+            before = frameValues(frame)
+            after = _editedValues(before, edit)
+            if after != before:
+                setFrameValues(frame, after)
+                record.frames.append((frame, before))
+                changed = True
+
+        if not changed:
+            continue
+
+        group.directions[direction].invalidate()
+        record.sequences.append((group, direction))
+        if id(group) not in seenGroups:
+            seenGroups.add(id(group))
+            record.groups.append((group, group.copyName, group.modified))
+            if not (id(group) in whole and group.copyName in wholeNames):
+                group.copyName = ""
+
+    return record
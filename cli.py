@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import sys
+from typing import List
+
+import pyglet
+
+# Nothing here needs a window, don't let pyglet try to create one on import.
+pyglet.options['shadow_window'] = False
+
+from PIL import Image
+
+from convert import (ConvertOptions, batchConvert, convertMultiToSingle, convertSingleToMulti,
+                     formatConversionReport)
+from export import COMPRESSION_PROFILES, ExportError, SheetWriter, benchmarkProfiles, formatBenchmark, formatBytes
+from library import findLibrary, indexCollection, openLibrary, parseFrameSize, queryLibrary
+from optimize import applyMirroredDirections, findMirroredDirections, optimizeSheet
+from sheetio import SheetError, createFrameDataXML, importMultiSheet, loadSingleSheet, writeXML
+from tracing import span, tracer
+from validate import formatValidationReport, validateTree, validationSummary
+
+
+def _sheetPaths(directory: str) -> List[str]:
+    return sorted(os.path.join(directory, fileName) for fileName in os.listdir(directory)
+                  if fileName.lower().endswith(".png"))
+
+
+def _createWriter(args) -> SheetWriter:
+    return SheetWriter(args.indexed, COMPRESSION_PROFILES[args.profile])
+
+
+def benchmarkCommand(args) -> int:
+    paths = _sheetPaths(args.directory)
+    if not paths:
+        print(f"No sheets found in {args.directory}.", file=sys.stderr)
+        return 1
+
+    images = []
+    for path in paths:
+        with Image.open(path) as image:
+            images.append(image.convert('RGBA'))
+
+    print(f"Encoding {len(images)} sheets from {args.directory}, best of {args.repeat}.")
+    print(formatBenchmark(benchmarkProfiles(images, args.indexed, args.repeat)))
+    return 0
+
+
+def recompressCommand(args) -> int:
+    """Re-encode the sheets of a character in place, for example with the release profile before shipping."""
+    writer = _createWriter(args)
+    before = after = 0
+
+    for path in _sheetPaths(args.directory):
+        before += os.path.getsize(path)
+        with Image.open(path) as image:
+            image = image.convert('RGBA')
+
+        writer.save(image, path)
+        after += os.path.getsize(path)
+
+    print(writer.details())
+
+    print(f"{formatBytes(before)} -> {formatBytes(after)} with the {writer.profile.name} profile.")
+    return 0
+
+
+def optimizeCommand(args) -> int:
+    """Drop unused frames and merge duplicate and mirrored frames of a single sheet."""
+    try:
+        loaded = loadSingleSheet(args.frameData)
+    except SheetError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    sourceDir = os.path.dirname(args.frameData)
+    outputDir = args.output or sourceDir
+    os.makedirs(outputDir, exist_ok=True)
+
+    sizeBefore = sum(os.path.getsize(os.path.join(sourceDir, name)) for name in ("Anim.png", "Offsets.png")
+                     if os.path.exists(os.path.join(sourceDir, name)))
+
+    if args.mirror:
+        mirrors = findMirroredDirections(loaded.groups, loaded.sheet, loaded.actionPts, loaded.frameWidth,
+                                         loaded.frameHeight)
+        for mirror in mirrors:
+            print(mirror)
+
+        applyMirroredDirections(mirrors)
+
+    try:
+        optimized = optimizeSheet(loaded.groups, loaded.sheet, loaded.actionPts, loaded.frameWidth,
+                                  loaded.frameHeight)
+    except SheetError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    writer = _createWriter(args)
+    writer.save(optimized.sheet.toPIL(), os.path.join(outputDir, "Anim.png"))
+    if optimized.actionPts:
+        writer.save(optimized.actionPts.toPIL(), os.path.join(outputDir, "Offsets.png"))
+
+    root, elidedFrames = createFrameDataXML(loaded.groups, loaded.frameWidth, loaded.frameHeight, loaded.shadowSize,
+                                            not args.no_trim, not args.no_collapse)
+    writeXML(root, os.path.join(outputDir, os.path.basename(args.frameData)))
+
+    sizeAfter = sum(os.path.getsize(path) for path, _ in writer.report)
+    print(optimized.summary())
+    print(f"Pixels: {formatBytes(optimized.bytesBefore)} -> {formatBytes(optimized.bytesAfter)}")
+    print(f"Files: {formatBytes(sizeBefore)} -> {formatBytes(sizeAfter)}")
+    if elidedFrames:
+        print(f"{elidedFrames} frames written as copies of identical actions.")
+    return 0
+
+
+def convertCommand(args) -> int:
+    """Convert every sheet under a directory between the single and multi-sheet formats."""
+    options = ConvertOptions(args.to, not args.no_trim, not args.no_collapse, args.profile, args.indexed)
+    results = batchConvert(args.directory, options, args.output, args.workers, args.force)
+    if not results:
+        print(f"No {options.source} sheets found in {args.directory}.", file=sys.stderr)
+        return 1
+
+    print(formatConversionReport(results))
+    return 1 if any(result.status == "failed" for result in results) else 0
+
+
+def validateCommand(args) -> int:
+    """Check every FrameData.xml and AnimData.xml in a directory tree. Fails if any has errors, or warnings when
+    strict."""
+    reports = validateTree(args.directory, args.workers)
+    if not reports:
+        print(f"No FrameData.xml or AnimData.xml found in {args.directory}.", file=sys.stderr)
+        return 1
+
+    if args.format == "json":
+        print(json.dumps({"summary": validationSummary(reports), "files": [report.toDict() for report in reports]},
+                         indent=2))
+    else:
+        print(formatValidationReport(reports))
+
+    failed = any(report.errors or (args.strict and report.warnings) for report in reports)
+    return 1 if failed else 0
+
+
+def indexCommand(args) -> int:
+    """Create or update the library of a collection."""
+    result = indexCollection(args.directory, args.database, args.workers, args.force)
+    print(result.summary())
+    return 0
+
+
+def queryCommand(args) -> int:
+    """List the characters of an indexed collection matching every filter given."""
+    database = args.database or findLibrary(args.directory)
+    if not database or not os.path.exists(database):
+        print(f"No library found for {args.directory}, run the index command first.", file=sys.stderr)
+        return 1
+
+    try:
+        frameSize = parseFrameSize(args.frame_size) if args.frame_size else None
+    except ValueError:
+        print(f"Frame size must be given as WIDTHxHEIGHT, not {args.frame_size}.", file=sys.stderr)
+        return 1
+
+    connection = openLibrary(database)
+    entries = queryLibrary(connection, args.directory, args.action, args.missing_action, args.copy_of, frameSize,
+                           args.format)
+    connection.close()
+
+    if args.json:
+        print(json.dumps([vars(entry) for entry in entries], indent=2))
+        return 0
+
+    for entry in entries:
+        details = entry.error or (f"{entry.format}, {entry.frameSize}, {entry.actionCount} actions, "
+                                  f"{entry.frameCount} frames, {formatBytes(entry.sheetBytes)}")
+        matched = f" [{', '.join(entry.matchedActions)}]" if entry.matchedActions else ""
+        print(f"{entry.path}: {details}{matched}")
+
+    print(f"{len(entries)} characters.")
+    return 0
+
+
+def profileCommand(args) -> int:
+    """Load a sheet like the editor does, optionally converting it to the other format, and show where the time
+    went."""
+    tracer.enabled = True
+    isMulti = os.path.basename(args.dataFile) == "AnimData.xml"
+
+    try:
+        if args.export:
+            os.makedirs(args.export, exist_ok=True)
+            with span("convert"):
+                if isMulti:
+                    convertMultiToSingle(args.dataFile, args.export, ConvertOptions("single"))
+                else:
+                    convertSingleToMulti(args.dataFile, args.export, ConvertOptions("multi"))
+        elif isMulti:
+            with span("import"):
+                importMultiSheet(args.dataFile)
+        else:
+            with span("load"):
+                loadSingleSheet(args.dataFile)
+    except (SheetError, ExportError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print(tracer.formatSummary())
+    return 0
+
+
+def _addOutputOptions(parser: argparse.ArgumentParser):
+    parser.add_argument("--profile", choices=COMPRESSION_PROFILES.keys(), default="default",
+                        help="PNG compression profile.")
+    parser.add_argument("--indexed", action="store_true",
+                        help="Write palette PNGs for sheets with 256 colors or fewer.")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="MD Frame Editor command line tools.")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record timing spans while the command runs and write them as Chrome trace JSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    benchmarkParser = subparsers.add_parser("benchmark", help="Compare PNG compression profiles on a character.")
+    benchmarkParser.add_argument("directory", help="Directory holding the character's sheets.")
+    benchmarkParser.add_argument("--indexed", action="store_true", help="Benchmark indexed PNG output.")
+    benchmarkParser.add_argument("--repeat", type=int, default=3, help="Runs per profile, the best is kept.")
+    benchmarkParser.set_defaults(func=benchmarkCommand)
+
+    recompressParser = subparsers.add_parser("recompress", help="Re-encode a character's sheets in place.")
+    recompressParser.add_argument("directory", help="Directory holding the character's sheets.")
+    _addOutputOptions(recompressParser)
+    recompressParser.set_defaults(func=recompressCommand)
+
+    optimizeParser = subparsers.add_parser("optimize", help="Remove unused, duplicate and mirrored frames of a "
+                                                             "single sheet.")
+    optimizeParser.add_argument("frameData", help="FrameData.xml of the sheet.")
+    optimizeParser.add_argument("--output", help="Directory to write to, the sheet is rewritten in place if omitted.")
+    optimizeParser.add_argument("--mirror", action="store_true",
+                                help="First rewrite right facing directions that mirror the left facing ones as "
+                                     "flipped references.")
+    optimizeParser.add_argument("--no-trim", action="store_true", help="Write copies out in full.")
+    optimizeParser.add_argument("--no-collapse", action="store_true",
+                                help="Write all 8 directions even when they are identical.")
+    _addOutputOptions(optimizeParser)
+    optimizeParser.set_defaults(func=optimizeCommand)
+
+    convertParser = subparsers.add_parser("convert", help="Convert every sheet in a directory tree to the other "
+                                                          "format.")
+    convertParser.add_argument("directory", help="Directory to search for sheets.")
+    convertParser.add_argument("--to", choices=("multi", "single"), required=True,
+                               help="multi converts FrameData.xml sheets, single converts AnimData.xml sheets.")
+    convertParser.add_argument("--output", help="Directory to mirror the tree into, sheets are converted next to "
+                                                "their source if omitted.")
+    convertParser.add_argument("--workers", type=int, help="Processes to convert with, one per CPU if omitted.")
+    convertParser.add_argument("--force", action="store_true", help="Convert sheets that are unchanged since the "
+                                                                    "last run too.")
+    convertParser.add_argument("--no-trim", action="store_true", help="Write copies out in full.")
+    convertParser.add_argument("--no-collapse", action="store_true",
+                               help="Write all 8 directions even when they are identical.")
+    _addOutputOptions(convertParser)
+    convertParser.set_defaults(func=convertCommand)
+
+    validateParser = subparsers.add_parser("validate", help="Check every sheet in a directory tree for problems.")
+    validateParser.add_argument("directory", help="Directory to search for sheets.")
+    validateParser.add_argument("--format", choices=("json", "text"), default="json", help="Report format.")
+    validateParser.add_argument("--workers", type=int, help="Processes to check with, one per CPU if omitted.")
+    validateParser.add_argument("--strict", action="store_true", help="Fail on warnings too.")
+    validateParser.set_defaults(func=validateCommand)
+
+    indexParser = subparsers.add_parser("index", help="Index the characters of a collection into a library.")
+    indexParser.add_argument("directory", help="Root of the collection.")
+    indexParser.add_argument("--database", help="Library file, library.sqlite in the directory if omitted.")
+    indexParser.add_argument("--workers", type=int, help="Processes to read with, one per CPU if omitted.")
+    indexParser.add_argument("--force", action="store_true", help="Read characters again even if unchanged.")
+    indexParser.set_defaults(func=indexCommand)
+
+    queryParser = subparsers.add_parser("query", help="Find characters in an indexed collection.")
+    queryParser.add_argument("directory", help="Root of the collection, or a directory in it.")
+    queryParser.add_argument("--database", help="Library file, the nearest library.sqlite in the directory or "
+                                                   "above it if omitted.")
+    queryParser.add_argument("--action", help="Has an action with this name.")
+    queryParser.add_argument("--missing-action", help="Has no action with this name.")
+    queryParser.add_argument("--copy-of", help="Has an action that is a copy of this one.")
+    queryParser.add_argument("--frame-size", help="Uses this frame size, as WIDTHxHEIGHT.")
+    queryParser.add_argument("--format", choices=("single", "multi"), help="Only this sheet format.")
+    queryParser.add_argument("--json", action="store_true", help="Print the matches as JSON.")
+    queryParser.set_defaults(func=queryCommand)
+
+    profileParser = subparsers.add_parser("profile", help="Time loading a sheet, phase by phase.")
+    profileParser.add_argument("dataFile", help="FrameData.xml or AnimData.xml to load.")
+    profileParser.add_argument("--export", metavar="DIRECTORY",
+                               help="Also convert the sheet to the other format into this directory.")
+    profileParser.set_defaults(func=profileCommand)
+
+    args = parser.parse_args(argv)
+    if not args.trace:
+        return args.func(args)
+
+    # Only the spans of this process are recorded, not those of worker processes.
+    tracer.enabled = True
+    try:
+        return args.func(args)
+    finally:
+        tracer.writeChromeTrace(args.trace)
+        print(f"Trace of {len(tracer.records)} spans written to {args.trace}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import pyglet
+
+# Workers never need a window, also when they import this module fresh.
+pyglet.options['shadow_window'] = False
+
+from PIL import Image
+
+from export import (COMPRESSION_PROFILES, DEFAULT_STREAM_FRAMES, ExportError, FrameSource, MemoryBudget, SheetWriter,
+                    exportMultipleSheets, formatBytes)
+from sheetio import (SheetError, createAnimDataXML, createFrameDataXML, getFrameUniformity, importMultiSheet,
+                     loadSingleSheet, shadowImagePath, writeXML)
+
+MANIFEST_NAME = "convert-manifest.json"
+MANIFEST_VERSION = 1
+
+# Data file each format is found by, keyed on the format converted from.
+SOURCE_FILES = {"single": "FrameData.xml", "multi": "AnimData.xml"}
+MULTI_SHEET_SUFFIXES = ("-Anim.png", "-Offsets.png", "-Shadow.png")
+
+
+@dataclass
+class ConvertOptions:
+    target: str  # "multi" or "single".
+    trim: bool = True
+    collapse: bool = True
+    profile: str = "default"
+    indexed: bool = False
+
+    @property
+    def source(self) -> str:
+        return "single" if self.target == "multi" else "multi"
+
+
+@dataclass
+class ConversionResult:
+    source: str  # Data file, relative to the converted directory.
+    status: str  # "converted", "skipped" or "failed".
+    message: str = ""
+    contentHash: str = ""
+    outputs: List[str] = field(default_factory=list)
+    bytesWritten: int = 0
+    seconds: float = 0.0
+
+
+def findSheets(directory: str, options: ConvertOptions) -> List[str]:
+    """Every data file of the source format under the directory, relative to it."""
+    dataFile = SOURCE_FILES[options.source]
+    found = []
+    for dirPath, dirNames, fileNames in os.walk(directory):
+        dirNames.sort()
+        if dataFile in fileNames:
+            found.append(os.path.relpath(os.path.join(dirPath, dataFile), directory))
+
+    return found
+
+
+def _inputFiles(dataPath: str, options: ConvertOptions) -> List[str]:
+    """The files a conversion reads. Outputs of the other direction never match, so converting in place doesn't
+    invalidate the hash."""
+    dirName = os.path.dirname(dataPath)
+    if options.source == "single":
+        images = [name for name in ("Anim.png", "Offsets.png") if os.path.exists(os.path.join(dirName, name))]
+    else:
+        images = sorted(name for name in os.listdir(dirName) if name.endswith(MULTI_SHEET_SUFFIXES))
+
+    return [dataPath, *(os.path.join(dirName, name) for name in images)]
+
+
+def contentHash(dataPath: str, options: ConvertOptions) -> str:
+    """Hash of everything that decides the output: the data file, its sheets and the options."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(asdict(options), sort_keys=True).encode())
+
+    for path in _inputFiles(dataPath, options):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as file:
+            digest.update(hashlib.blake2b(file.read(), digest_size=16).digest())
+
+    return digest.hexdigest()
+
+
+def loadManifest(outputRoot: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(outputRoot, MANIFEST_NAME), encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+
+    return manifest.get("entries", {})
+
+
+def saveManifest(outputRoot: str, entries: Dict[str, dict]):
+    with open(os.path.join(outputRoot, MANIFEST_NAME), 'w', encoding='utf-8') as file:
+        json.dump({"version": MANIFEST_VERSION, "entries": entries}, file, indent=2, sort_keys=True)
+
+
+def convertSingleToMulti(dataPath: str, outputDir: str, options: ConvertOptions) -> SheetWriter:
+    loaded = loadSingleSheet(dataPath)
+    if not loaded.actionPts:
+        raise SheetError("Multi-sheets need the action points from Offsets.png.")
+
+    # Raises for groups whose directions have different durations, like the editor refuses to export them.
+    for group in loaded.groups:
+        getFrameUniformity(group)
+
+    writer = SheetWriter(options.indexed, COMPRESSION_PROFILES[options.profile])
+
+    # Several conversions run at once, so keep each one to a bounded amount of cropped frames.
+    source = FrameSource(loaded.sheet, loaded.actionPts, loaded.frameWidth, loaded.frameHeight,
+                         loaded.sheet.width // loaded.frameWidth, MemoryBudget(), DEFAULT_STREAM_FRAMES)
+
+    with Image.open(shadowImagePath()) as shadowImage:
+        shadowImage = shadowImage.convert('RGBA')
+
+    try:
+        groupSizes = exportMultipleSheets(outputDir, loaded.groups, source, shadowImage, writer, options.collapse,
+                                          streaming=True)
+    finally:
+        source.clear()
+
+    root = createAnimDataXML(loaded.groups, groupSizes, loaded.shadowSize, options.trim)
+    writeXML(root, os.path.join(outputDir, "AnimData.xml"))
+    return writer
+
+
+def convertMultiToSingle(dataPath: str, outputDir: str, options: ConvertOptions) -> SheetWriter:
+    imported = importMultiSheet(dataPath)
+
+    writer = SheetWriter(options.indexed, COMPRESSION_PROFILES[options.profile])
+    writer.save(imported.sheet, os.path.join(outputDir, "Anim.png"))
+    writer.save(imported.actionPts, os.path.join(outputDir, "Offsets.png"))
+
+    root, _ = createFrameDataXML(imported.groups, imported.frameWidth, imported.frameHeight, imported.shadowSize,
+                                 options.trim, options.collapse)
+    writeXML(root, os.path.join(outputDir, "FrameData.xml"))
+    return writer
+
+
+def convertSheet(directory: str, relativePath: str, outputRoot: str, options: ConvertOptions,
+                 hashValue: str) -> ConversionResult:
+    """Convert one sheet. Runs in a worker process, so failures are returned rather than raised."""
+    start = time.perf_counter()
+    dataPath = os.path.join(directory, relativePath)
+    outputDir = os.path.join(outputRoot, os.path.dirname(relativePath))
+
+    try:
+        os.makedirs(outputDir, exist_ok=True)
+        if options.target == "multi":
+            writer = convertSingleToMulti(dataPath, outputDir, options)
+            dataName = "AnimData.xml"
+        else:
+            writer = convertMultiToSingle(dataPath, outputDir, options)
+            dataName = "FrameData.xml"
+    except (SheetError, ExportError, OSError) as e:
+        return ConversionResult(relativePath, "failed", str(e), hashValue, seconds=time.perf_counter() - start)
+    except Exception as e:
+        # Keep one broken sheet from stopping the rest of the batch.
+        return ConversionResult(relativePath, "failed", f"{type(e).__name__}: {e}", hashValue,
+                                seconds=time.perf_counter() - start)
+
+    outputs = [os.path.join(outputDir, dataName), *(path for path, _ in writer.report)]
+    return ConversionResult(relativePath, "converted", writer.summary(), hashValue,
+                            [os.path.relpath(path, outputRoot) for path in outputs],
+                            sum(os.path.getsize(path) for path in outputs), time.perf_counter() - start)
+
+
+def _isUpToDate(entry: Optional[dict], hashValue: str, outputRoot: str) -> bool:
+    if not entry or entry.get("hash") != hashValue:
+        return False
+
+    return all(os.path.exists(os.path.join(outputRoot, path)) for path in entry.get("outputs", ()))
+
+
+def batchConvert(directory: str, options: ConvertOptions, outputRoot: Optional[str] = None,
+                 workers: Optional[int] = None, force: bool = False) -> List[ConversionResult]:
+    """Convert every sheet under the directory, mirroring its layout under outputRoot, in place if omitted.
+
+    Sheets whose inputs and options hash the same as in the manifest of the last run, and whose outputs still exist,
+    are skipped unless forced.
+    """
+    outputRoot = outputRoot or directory
+    os.makedirs(outputRoot, exist_ok=True)
+
+    manifest = loadManifest(outputRoot)
+    results: List[ConversionResult] = []
+    jobs = []
+
+    for relativePath in findSheets(directory, options):
+        try:
+            hashValue = contentHash(os.path.join(directory, relativePath), options)
+        except OSError as e:
+            results.append(ConversionResult(relativePath, "failed", str(e)))
+            continue
+
+        key = relativePath.replace(os.sep, "/")
+        if not force and _isUpToDate(manifest.get(key), hashValue, outputRoot):
+            results.append(ConversionResult(relativePath, "skipped", "Unchanged.", hashValue,
+                                            manifest[key]["outputs"]))
+        else:
+            jobs.append((relativePath, hashValue))
+
+    if jobs:
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(convertSheet, directory, relativePath, outputRoot, options, hashValue)
+                       for relativePath, hashValue in jobs]
+            results.extend(future.result() for future in futures)
+
+    for result in results:
+        key = result.source.replace(os.sep, "/")
+        if result.status == "converted":
+            manifest[key] = {"hash": result.contentHash, "outputs": result.outputs}
+        elif result.status == "failed":
+            # Try again next run.
+            manifest.pop(key, None)
+
+    saveManifest(outputRoot, manifest)
+
+    results.sort(key=lambda result: result.source)
+    return results
+
+
+def formatConversionReport(results: List[ConversionResult]) -> str:
+    lines = []
+    for result in results:
+        if result.status == "converted":
+            lines.append(f"converted {result.source}: {len(result.outputs)} files, {formatBytes(result.bytesWritten)} "
+                         f"in {result.seconds:.2f}s ({result.message})")
+        elif result.status == "failed":
+            lines.append(f"FAILED    {result.source}: {result.message}")
+
+    counts = {status: sum(1 for result in results if result.status == status)
+              for status in ("converted", "skipped", "failed")}
+    written = sum(result.bytesWritten for result in results)
+    lines.append(f"{counts['converted']} converted, {counts['skipped']} unchanged and skipped, {counts['failed']} "
+                 f"failed. {formatBytes(written)} written.")
+
+    return "\n".join(lines)
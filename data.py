@@ -1,6 +1,10 @@
+import bisect
+import hashlib
+import itertools
+import math
 from dataclasses import field, dataclass
 from enum import Enum
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
 
 VERSION = "1.4.3"
 
@@ -15,6 +19,9 @@ DOWN_RIGHT = 7
 
 FRAME_DATA = (DOWN, DOWN_LEFT, LEFT, UP_LEFT, UP, UP_RIGHT, RIGHT, DOWN_RIGHT)
 
+# Directions that face opposite ways horizontally, (source, mirror).
+MIRRORED_DIRECTIONS = ((LEFT, RIGHT), (UP_LEFT, UP_RIGHT), (DOWN_LEFT, DOWN_RIGHT))
+
 FD_STR = {
     DOWN: "DOWN",
     DOWN_LEFT: "DOWN LEFT",
@@ -27,6 +34,16 @@ FD_STR = {
 }
 
 
+# Bumped by every change to a frame, its offsets or a list of frames. Caches computed from frames are only used while it
+# is unchanged, so an edit that forgets invalidate can't leave them stale.
+_frameEdits = 0
+
+
+def _frameEdited():
+    global _frameEdits
+    _frameEdits += 1
+
+
 class LegacyAnimationActions(Enum):
     STOP = 0
     IDLE = 1
@@ -81,6 +98,12 @@ class Offset:
     x: int = 0  # XOffset
     y: int = 0  # YOffset
 
+    def __setattr__(self, name, value):
+        # Changing an offset, setting it while created is not a change.
+        if name in self.__dict__:
+            _frameEdited()
+        object.__setattr__(self, name, value)
+
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y
 
@@ -137,6 +160,11 @@ class AnimFrame:
         if not self.isDefaultCopy:
             self.reset()
 
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            _frameEdited()
+        object.__setattr__(self, name, value)
+
     def reset(self):
         self.defaultCopy = AnimFrame(self.idx, self.frameIndex, self.flip, self.duration,
                                      Offset(self.shadowOffset.x, self.shadowOffset.y),
@@ -148,9 +176,108 @@ class AnimFrame:
         return self != self.defaultCopy
 
 
+@dataclass
+class SequenceTimeline:
+    """Tick each frame of a sequence ends at, the running sum of the durations, so the frame shown at any tick is a
+    binary search away."""
+    ends: List[int]
+
+    @classmethod
+    def fromFrames(cls, frames: List[AnimFrame]) -> 'SequenceTimeline':
+        return cls(list(itertools.accumulate(max(frame.duration, 0) for frame in frames)))
+
+    @property
+    def length(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    def start(self, position: int) -> int:
+        return self.ends[position - 1] if position > 0 else 0
+
+    def frameAt(self, tick: float) -> int:
+        """Position of the frame shown at the tick, looping. Frames without a duration are never shown."""
+        if not self.length:
+            return 0
+
+        return bisect.bisect_right(self.ends, tick % self.length)
+
+    def nextChange(self, tick: float) -> float:
+        """Tick the frame shown at the tick ends at, infinity if no frame has a duration so nothing ever changes."""
+        if not self.length:
+            return math.inf
+
+        loopStart = tick - tick % self.length
+        return loopStart + self.ends[self.frameAt(tick)]
+
+
+def _editsFrames(method):
+    def edit(self, *args, **kwargs):
+        _frameEdited()
+        return method(self, *args, **kwargs)
+
+    return edit
+
+
+class FrameList(list):
+    """List of frames that counts its changes as frame edits."""
+    __setitem__ = _editsFrames(list.__setitem__)
+    __delitem__ = _editsFrames(list.__delitem__)
+    __iadd__ = _editsFrames(list.__iadd__)
+    __imul__ = _editsFrames(list.__imul__)
+    append = _editsFrames(list.append)
+    extend = _editsFrames(list.extend)
+    insert = _editsFrames(list.insert)
+    pop = _editsFrames(list.pop)
+    remove = _editsFrames(list.remove)
+    clear = _editsFrames(list.clear)
+    reverse = _editsFrames(list.reverse)
+    sort = _editsFrames(list.sort)
+
+
 @dataclass
 class AnimationSequence:
     frames: List[AnimFrame] = field(default_factory=list)
+    _fingerprint: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    _timeline: Optional[SequenceTimeline] = field(default=None, init=False, repr=False, compare=False)
+    _cachedAt: int = field(default=-1, init=False, repr=False, compare=False)  # _frameEdits the caches were made at.
+
+    def __setattr__(self, name, value):
+        if name == 'frames':
+            _frameEdited()
+            value = value if type(value) is FrameList else FrameList(value)
+        super().__setattr__(name, value)
+
+    def _validate(self):
+        if self._cachedAt != _frameEdits:
+            self.invalidate()
+            self._cachedAt = _frameEdits
+
+    @property
+    def content(self) -> Tuple:
+        """Everything about the frames that ends up in the frame data, read from the frames every time."""
+        return tuple((frame.frameIndex, int(frame.flip), frame.duration, frame.shadowOffset.x, frame.shadowOffset.y,
+                      frame.spriteOffset.x, frame.spriteOffset.y) for frame in self.frames)
+
+    @property
+    def fingerprint(self) -> bytes:
+        """Digest of the content. Cached until a frame is edited anywhere, or invalidate is called."""
+        self._validate()
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.blake2b(repr(self.content).encode(), digest_size=16).digest()
+
+        return self._fingerprint
+
+    @property
+    def timeline(self) -> SequenceTimeline:
+        """Cached like the fingerprint."""
+        self._validate()
+        if self._timeline is None:
+            self._timeline = SequenceTimeline.fromFrames(self.frames)
+
+        return self._timeline
+
+    def invalidate(self):
+        self._fingerprint = None
+        self._timeline = None
 
 
 @dataclass
@@ -165,6 +292,111 @@ class AnimGroup:
     modified: bool = field(compare=False, default=False)  # If it has been modified since loading.
 
 
+def isSequenceCollapsable(animGroup: AnimGroup):
+    ct = 0
+    first = animGroup.directions[0].fingerprint
+    for direction in animGroup.directions:
+        if direction.fingerprint == first:
+            ct += 1
+
+    if ct == 8:
+        # All 8 frames are the same.
+        return True
+
+    return False
+
+
+def groupFingerprint(animGroup: AnimGroup) -> Tuple:
+    """Groups with equal fingerprints write identical frame data, so one can be a CopyOf the other."""
+    return (animGroup.rushFrame, animGroup.hitFrame, animGroup.returnFrame,
+            tuple(sequence.fingerprint for sequence in animGroup.directions))
+
+
+class FrameUsageIndex:
+    """Reverse index of sheet frame index -> (group, direction, slot) positions that use it.
+
+    Built once from the groups, then kept current by calling updateSequence whenever a sequence is edited. Only slots
+    whose frame index changed touch the index, lookups are a dictionary access.
+    """
+
+    def __init__(self, groups: List[AnimGroup] = ()):
+        self._uses: Dict[int, Dict[Tuple[int, int, int], Tuple[AnimGroup, int, int]]] = {}
+        # Frame indexes of each sequence as they were last indexed, keyed by (group id, direction).
+        self._indexed: Dict[Tuple[int, int], List[int]] = {}
+
+        for group in groups:
+            self.updateGroup(group)
+
+    def __len__(self):
+        return len(self._uses)
+
+    def __contains__(self, frameIndex: int):
+        return frameIndex in self._uses
+
+    def __iter__(self):
+        return iter(self._uses)
+
+    def items(self):
+        for frameIndex, uses in self._uses.items():
+            yield frameIndex, list(uses.values())
+
+    def uses(self, frameIndex: int) -> List[Tuple[AnimGroup, int, int]]:
+        return list(self._uses.get(frameIndex, {}).values())
+
+    def count(self, frameIndex: int) -> int:
+        return len(self._uses.get(frameIndex, ()))
+
+    def _add(self, frameIndex: int, group: AnimGroup, direction: int, slot: int):
+        self._uses.setdefault(frameIndex, {})[(id(group), direction, slot)] = (group, direction, slot)
+
+    def _remove(self, frameIndex: int, group: AnimGroup, direction: int, slot: int):
+        uses = self._uses[frameIndex]
+        del uses[(id(group), direction, slot)]
+        if not uses:
+            del self._uses[frameIndex]
+
+    def updateSequence(self, group: AnimGroup, direction: int) -> Set[int]:
+        """Re-index one direction of a group. Returns the frame indexes whose usage changed."""
+        key = id(group), direction
+        old = self._indexed.get(key, [])
+        new = [frame.frameIndex for frame in group.directions[direction].frames]
+
+        changed = set()
+        for slot in range(max(len(old), len(new))):
+            oldIndex = old[slot] if slot < len(old) else None
+            newIndex = new[slot] if slot < len(new) else None
+            if oldIndex == newIndex:
+                continue
+
+            if oldIndex is not None:
+                self._remove(oldIndex, group, direction, slot)
+                changed.add(oldIndex)
+
+            if newIndex is not None:
+                self._add(newIndex, group, direction, slot)
+                changed.add(newIndex)
+
+        self._indexed[key] = new
+        return changed
+
+    def updateGroup(self, group: AnimGroup) -> Set[int]:
+        changed = set()
+        for direction in range(len(group.directions)):
+            changed |= self.updateSequence(group, direction)
+
+        return changed
+
+    def removeGroup(self, group: AnimGroup) -> Set[int]:
+        """Drop every use by a deleted group. Returns the frame indexes whose usage changed."""
+        changed = set()
+        for direction in range(len(group.directions)):
+            for slot, frameIndex in enumerate(self._indexed.pop((id(group), direction), [])):
+                self._remove(frameIndex, group, direction, slot)
+                changed.add(frameIndex)
+
+        return changed
+
+
 @dataclass
 class Rectangle:
     x: int
@@ -358,4 +590,25 @@ class ActionPoints:
         right = max(max(self.center.x, self.head.x), max(self.leftHand.x, self.rightHand.x)) + 1
         bottom = max(max(self.center.y, self.head.y), max(self.leftHand.y, self.rightHand.y)) + 1
 
-        return Rectangle(left, bottom, right-left, top-bottom)
\ No newline at end of file
+        return Rectangle(left, bottom, right-left, top-bottom)
+
+
+@dataclass
+class DuplicateTolerance:
+    """How far apart two frames may be and still be merged when packing a sheet."""
+    maxPixels: int = 0  # Pixels allowed to differ.
+    maxDelta: int = 0  # Largest channel difference that still counts as the same pixel.
+
+    @property
+    def enabled(self):
+        return self.maxPixels > 0 or self.maxDelta > 0
+
+
+@dataclass
+class NearDuplicate:
+    """A frame merged into a unique frame it is not identical to."""
+    imageIndex: int
+    uniqueIndex: int
+    flip: bool
+    differingPixels: int
+    maxDelta: int
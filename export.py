@@ -0,0 +1,406 @@
+import io
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from data import AnimGroup, AnimFrame, TLRectangle, isSequenceCollapsable
+from pixelbuffer import PixelBuffer
+from tracing import span
+from utils import centerAndApplyOffset, roundUpToMult, stampImage, stampImageBytes, toPaletteImage
+
+# Sheets written per group, in the order they are rendered.
+SHEET_LAYERS = ("Anim", "Offsets", "Shadow")
+
+# Frames kept cropped at once when streaming.
+DEFAULT_STREAM_FRAMES = 64
+
+# zlib's deflate state and PIL's output buffer while encoding a PNG, a generous round figure.
+PNG_ENCODER_BYTES = 512 * 1024
+
+
+class ExportError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class CompressionProfile:
+    name: str
+    compressLevel: int  # zlib level, 0-9.
+    optimize: bool  # Let PIL search for the smallest encoding, slow.
+
+
+COMPRESSION_PROFILES = {
+    "fast": CompressionProfile("Fast Iteration", 1, False),
+    "default": CompressionProfile("Default", 6, False),  # PIL's defaults.
+    "release": CompressionProfile("Release", 9, True),
+}
+
+
+def formatBytes(size: int) -> str:
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class SheetWriter:
+    """Encodes sheets to PNG with the output options of an export and records how each file was written."""
+
+    def __init__(self, indexed: bool = False, profile: CompressionProfile = COMPRESSION_PROFILES["default"]):
+        self.indexed = indexed  # Write palette PNGs when a sheet has few enough colors.
+        self.profile = profile
+        self.report: List[Tuple[str, str]] = []
+
+    def encode(self, image: Image.Image, fp: Union[str, BinaryIO]) -> str:
+        """Write the image as PNG, returning how it was encoded."""
+        mode = "RGBA"
+        if self.indexed:
+            paletteImage = toPaletteImage(image)
+            if paletteImage:
+                image = paletteImage
+                mode = f"indexed, {len(paletteImage.getpalette()) // 3} colors"
+            else:
+                mode = "RGBA, over 256 colors"
+
+        image.save(fp, "PNG", compress_level=self.profile.compressLevel, optimize=self.profile.optimize)
+        return mode
+
+    def save(self, image: Image.Image, path: str):
+        self.report.append((path, self.encode(image, path)))
+
+    def workingBytes(self, size: Tuple[int, int]) -> int:
+        """Most memory encoding an image of the size takes besides the image. Indexing holds copies of the pixels, the
+        sorted colors and an int64 palette index of each pixel."""
+        pixels = size[0] * size[1]
+        return PNG_ENCODER_BYTES + (pixels * 32 if self.indexed else 0)
+
+    def summary(self) -> str:
+        indexedCount = sum(1 for _, mode in self.report if mode.startswith("indexed"))
+        return f"{indexedCount} of {len(self.report)} files indexed"
+
+    def details(self) -> str:
+        """How each file was written, a line per file."""
+        return "\n".join(f"{os.path.basename(path)}: {mode}" for path, mode in self.report)
+
+
+def benchmarkProfiles(images: List[Image.Image], indexed: bool = False,
+                      repeat: int = 3) -> List[Tuple[CompressionProfile, float, int]]:
+    """Encode the images with every compression profile. Returns the best total encode time in seconds out of repeat
+    runs and the total bytes for each profile."""
+    results = []
+    for profile in COMPRESSION_PROFILES.values():
+        writer = SheetWriter(indexed, profile)
+        bestTime = None
+        totalBytes = 0
+
+        for _ in range(repeat):
+            totalBytes = 0
+            start = time.perf_counter()
+            for image in images:
+                stream = io.BytesIO()
+                writer.encode(image, stream)
+                totalBytes += stream.tell()
+
+            elapsed = time.perf_counter() - start
+            bestTime = elapsed if bestTime is None else min(bestTime, elapsed)
+
+        results.append((profile, bestTime, totalBytes))
+
+    return results
+
+
+def formatBenchmark(results: List[Tuple[CompressionProfile, float, int]]) -> str:
+    lines = [f"{'Profile':<16}{'Encode':>12}{'Size':>14}"]
+    for profile, seconds, size in results:
+        lines.append(f"{profile.name:<16}{seconds * 1000:>10.1f}ms{size:>12} B")
+
+    return "\n".join(lines)
+
+
+class MemoryBudget:
+    """Tracks the memory an export holds on top of the loaded sheets, enforcing an optional ceiling: cropped frames,
+    canvases, and estimates of the working memory of stamping shadows and encoding."""
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit  # 0 is unlimited.
+        self.current = 0
+        self.peak = 0
+
+    def fits(self, size: int) -> bool:
+        return not self.limit or self.current + size <= self.limit
+
+    def allocate(self, size: int, description: str):
+        if not self.fits(size):
+            raise ExportError(f"{description} needs {formatBytes(size)}, which exceeds the export memory limit of "
+                              f"{formatBytes(self.limit)} ({formatBytes(self.current)} already in use).")
+
+        self.current += size
+        self.peak = max(self.peak, self.current)
+
+    def release(self, size: int):
+        self.current -= size
+
+
+@dataclass
+class CroppedFrame:
+    bounds: TLRectangle  # Sprite bounds within the frame.
+    actionBounds: TLRectangle  # Action point bounds relative to the center of the frame.
+    image: Image.Image
+    actionImage: Image.Image
+
+    @property
+    def nbytes(self) -> int:
+        return (self.image.width * self.image.height + self.actionImage.width * self.actionImage.height) * 4
+
+    def flipped(self, bounds: TLRectangle) -> 'CroppedFrame':
+        """Mirrored copy, bounds being the flipped sprite bounds within the frame."""
+        return CroppedFrame(bounds, self.actionBounds.getFlip(), self.image.transpose(Image.FLIP_LEFT_RIGHT),
+                            self.actionImage.transpose(Image.FLIP_LEFT_RIGHT))
+
+
+def cropFrame(sheetImage: Image.Image, actionImage: Image.Image, index: int, frameWidth: int, frameHeight: int,
+              columns: int) -> Optional[CroppedFrame]:
+    """Crop a frame and its action points down to their contents. Returns None for frames with nothing in them."""
+    startX, startY = index % columns, index // columns
+    l, t = startX * frameWidth, startY * frameHeight
+    r, b = l + frameWidth, t + frameHeight
+
+    obounds = (l, t, r, b)
+    originalFrame = sheetImage.crop(obounds)
+    oActionFrame = actionImage.crop(obounds)
+
+    frameBox = originalFrame.getbbox()
+    actionBox = oActionFrame.getbbox()
+
+    # No bounds. Empty frame.
+    if not frameBox:
+        # If no action box, it shouldn't be output?
+        if not actionBox:
+            return None
+        else:
+            frameBox = (l, t, l + 1, b + 1)
+
+    bounds = TLRectangle.fromBounds(frameBox)
+    actionBounds = TLRectangle.fromBounds(actionBox)
+
+    return CroppedFrame(bounds, actionBounds + (-frameWidth // 2, -frameHeight // 2),
+                        originalFrame.crop(frameBox), oActionFrame.crop(actionBox))
+
+
+class FrameSource:
+    """Crops frames from the source sheets on demand, keeping them in a least recently used cache.
+
+    maxFrames of 0 keeps every frame once cropped. Cached frames are counted against the budget and evicted when
+    something else needs the room. Mirrored frames are kept apart from the originals and not counted in maxFrames, so
+    each frame is mirrored once per export. Only when the budget runs out of room with no original left to drop are
+    they evicted too, and mirrored again if used later.
+    """
+
+    def __init__(self, sheet: PixelBuffer, actionPts: PixelBuffer, frameWidth: int, frameHeight: int, columns: int,
+                 budget: MemoryBudget, maxFrames: int = 0):
+        # Views of the buffers, cropping only copies the frame itself.
+        self.sheetImage = sheet.toPIL()
+        self.actionImage = actionPts.toPIL()
+        self.frameWidth = frameWidth
+        self.frameHeight = frameHeight
+        self.columns = columns
+        self.budget = budget
+        self.maxFrames = maxFrames
+
+        self.cache: OrderedDict[int, Optional[CroppedFrame]] = OrderedDict()
+        self.flippedCache: OrderedDict[int, Optional[CroppedFrame]] = OrderedDict()
+        # Kept after eviction, they are small.
+        self.bounds: Dict[int, Optional[TLRectangle]] = {}
+        self.flippedBounds: Dict[int, Optional[TLRectangle]] = {}
+
+    def _evict(self, cache: OrderedDict):
+        _, frame = cache.popitem(last=False)
+        if frame:
+            self.budget.release(frame.nbytes)
+
+    def reserve(self, size: int, description: str):
+        """Allocate from the budget, dropping cached frames if needed to make room, originals first."""
+        while (self.cache or self.flippedCache) and not self.budget.fits(size):
+            self._evict(self.cache or self.flippedCache)
+
+        self.budget.allocate(size, description)
+
+    def get(self, index: int, flip: bool = False) -> Optional[CroppedFrame]:
+        cache = self.flippedCache if flip else self.cache
+        if index in cache:
+            cache.move_to_end(index)
+            return cache[index]
+
+        if flip:
+            original = self.get(index)
+            frame = original.flipped(self.getBounds(index, True)) if original else None
+        else:
+            frame = cropFrame(self.sheetImage, self.actionImage, index, self.frameWidth, self.frameHeight,
+                              self.columns)
+            self.bounds[index] = frame.bounds if frame else None
+
+            while self.cache and self.maxFrames and len(self.cache) >= self.maxFrames:
+                self._evict(self.cache)
+
+        if frame:
+            self.reserve(frame.nbytes, f"Frame {index}")
+
+        cache[index] = frame
+        return frame
+
+    def getBounds(self, index: int, flip: bool = False) -> Optional[TLRectangle]:
+        if index not in self.bounds:
+            self.get(index)
+
+        if not flip:
+            return self.bounds[index]
+
+        if index not in self.flippedBounds:
+            bounds = self.bounds[index]
+            self.flippedBounds[index] = (TLRectangle(self.frameWidth - bounds.right, bounds.y, bounds.width,
+                                                     bounds.height) if bounds else None)
+
+        return self.flippedBounds[index]
+
+    def preload(self, frameCount: int):
+        for index in range(frameCount):
+            self.get(index)
+
+    def clear(self):
+        for cache in (self.cache, self.flippedCache):
+            while cache:
+                self._evict(cache)
+
+
+def _pasteLayer(layer: str, canvas: Image.Image, cropped: CroppedFrame, frame: AnimFrame, startX: int, startY: int,
+                maxWidth: int, maxHeight: int):
+    """Paste a frame into the Anim or Offsets sheet. cropped is already mirrored if the frame is flipped."""
+    if layer == "Anim":
+        translatedRect = centerAndApplyOffset(maxWidth, maxHeight, cropped.bounds, frame.flip, frame.spriteOffset)
+
+        canvas.paste(cropped.image, (startX + int(translatedRect[0]), startY + int(translatedRect[1])))
+
+    elif layer == "Offsets":
+        actPtX = (maxWidth // 2) + frame.spriteOffset.x + cropped.actionBounds.x
+        actPtY = (maxHeight // 2) + frame.spriteOffset.y + cropped.actionBounds.y
+
+        canvas.paste(cropped.actionImage, (startX + actPtX, startY + actPtY))
+
+
+def exportMultipleSheets(filePath: str, groups: List[AnimGroup], source: FrameSource, shadowImage: Image.Image,
+                         writer: SheetWriter, collapse: bool, streaming: bool = False) -> Dict[str, Tuple[int, int]]:
+    """Write the Anim, Offsets and Shadow sheets of every group that isn't a copy. Returns the frame size of each
+    group. Empty frames get no shadow either.
+
+    When streaming, each sheet of a group is rendered and encoded on its own and released before the next one, so only
+    one canvas is alive at a time.
+    """
+    groupSizes: Dict[str, Tuple[int, int]] = {}
+
+    for animGroup in groups:
+        # Skip copies.
+        if animGroup.copyName != "":
+            continue
+
+        # Max amount of sequences.
+        maxSequence = 0
+
+        # Frames go counter clockwise, but now you want to go clockwise...?
+        directions = [animGroup.directions[0], *reversed(animGroup.directions[1:])]
+
+        maxWidth = maxHeight = 0
+
+        collapsed = False
+        if collapse:
+            collapsed = isSequenceCollapsable(animGroup)
+
+        with span("export.crop and bounds"):
+            # Search all frames in the animation for the bounds that will fit the separated sheet.
+            for sequence in directions:
+                # Determine the maximum bounds for all frames in the sequence.
+                maxSequence = max(maxSequence, len(sequence.frames))
+                for frame in sequence.frames:
+                    croppedRect = source.getBounds(frame.frameIndex)
+                    if not croppedRect:
+                        continue
+
+                    # Get the biggest frame size we need. Offsets are expanded by 2x to make it centerable.
+                    adjusted_width = croppedRect.width + abs(frame.spriteOffset.x) * 2
+                    adjusted_height = croppedRect.height + abs(frame.spriteOffset.y) * 2
+
+                    maxWidth = max(maxWidth, adjusted_width)
+                    maxHeight = max(maxHeight, adjusted_height)
+
+        # Round up the boxes to the nearest eighth.
+        maxWidth = int(roundUpToMult(maxWidth, 8))
+        maxHeight = int(roundUpToMult(maxHeight, 8))
+
+        groupSizes[animGroup.name] = (maxWidth, maxHeight)
+
+        if collapsed:
+            directionCount = 1
+        else:
+            directionCount = 8
+
+        canvasSize = (maxWidth * maxSequence, maxHeight * directionCount)
+        canvasBytes = canvasSize[0] * canvasSize[1] * 4
+
+        passes = [(layer,) for layer in SHEET_LAYERS] if streaming else [SHEET_LAYERS]
+
+        for layers in passes:
+            # The pasted canvases and encoding them, the shadow canvas is reserved with the stamping.
+            reserved = canvasBytes * sum(1 for layer in layers if layer != "Shadow") + writer.workingBytes(canvasSize)
+
+            # Now lets output the texture.
+            source.reserve(reserved, f"{animGroup.name} sheets")
+            canvases = {layer: Image.new("RGBA", canvasSize, (0, 0, 0, 0)) for layer in layers if layer != "Shadow"}
+            shadowPositions = []
+
+            with span("export.render"):
+                # Go over all sequences and frames.
+                for dirIdx, sequence in enumerate(directions):
+                    startY = dirIdx * maxHeight
+
+                    for frameIdx, frame in enumerate(sequence.frames):
+                        # Empty frames are not output.
+                        if not source.getBounds(frame.frameIndex):
+                            continue
+
+                        startX = (frameIdx * maxWidth)
+
+                        if "Shadow" in layers:
+                            shadowPtX = -(shadowImage.width // 2) + (maxWidth // 2) + frame.shadowOffset.x
+                            shadowPtY = -(shadowImage.height // 2) + (maxHeight // 2) + frame.shadowOffset.y
+                            shadowPositions.append((startX + shadowPtX, startY + shadowPtY))
+
+                        if canvases:
+                            cropped = source.get(frame.frameIndex, frame.flip)
+
+                            for layer, canvas in canvases.items():
+                                _pasteLayer(layer, canvas, cropped, frame, startX, startY, maxWidth, maxHeight)
+
+                    if collapsed:
+                        break
+
+            if "Shadow" in layers:
+                with span("export.shadows"):
+                    stampBytes = stampImageBytes(canvasSize, shadowImage.size, len(shadowPositions))
+                    source.reserve(stampBytes, f"{animGroup.name} shadows")
+                    canvases["Shadow"] = stampImage(canvasSize, shadowImage, shadowPositions)
+
+                    # Only the canvas outlives the stamping.
+                    source.budget.release(stampBytes - canvasBytes)
+                    reserved += canvasBytes
+
+            with span("export.encode"):
+                for layer, canvas in canvases.items():
+                    writer.save(canvas, f"{filePath}/{animGroup.name}-{layer}.png")
+
+            del canvases
+            source.budget.release(reserved)
+
+    return groupSizes
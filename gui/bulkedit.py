@@ -0,0 +1,102 @@
+from PySide6 import QtCore, QtWidgets
+
+
+class Ui_BulkEditDialog(object):
+    def setupUi(self, BulkEditDialog):
+        BulkEditDialog.setObjectName("BulkEditDialog")
+        BulkEditDialog.resize(360, 300)
+
+        self.verticalLayout = QtWidgets.QVBoxLayout(BulkEditDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+
+        self.formLayout = QtWidgets.QFormLayout()
+        self.formLayout.setObjectName("formLayout")
+
+        self.scopeLabel = QtWidgets.QLabel(BulkEditDialog)
+        self.scopeLabel.setObjectName("scopeLabel")
+        self.scopeComboBox = QtWidgets.QComboBox(BulkEditDialog)
+        self.scopeComboBox.setObjectName("scopeComboBox")
+        for _ in range(4):
+            self.scopeComboBox.addItem("")
+        self.formLayout.addRow(self.scopeLabel, self.scopeComboBox)
+
+        self.spriteLabel = QtWidgets.QLabel(BulkEditDialog)
+        self.spriteLabel.setObjectName("spriteLabel")
+        self.spriteLayout = QtWidgets.QHBoxLayout()
+        self.spriteLayout.setObjectName("spriteLayout")
+        self.spriteXSpinBox = QtWidgets.QSpinBox(BulkEditDialog)
+        self.spriteXSpinBox.setObjectName("spriteXSpinBox")
+        self.spriteXSpinBox.setRange(-999, 999)
+        self.spriteLayout.addWidget(self.spriteXSpinBox)
+        self.spriteYSpinBox = QtWidgets.QSpinBox(BulkEditDialog)
+        self.spriteYSpinBox.setObjectName("spriteYSpinBox")
+        self.spriteYSpinBox.setRange(-999, 999)
+        self.spriteLayout.addWidget(self.spriteYSpinBox)
+        self.formLayout.addRow(self.spriteLabel, self.spriteLayout)
+
+        self.shadowLabel = QtWidgets.QLabel(BulkEditDialog)
+        self.shadowLabel.setObjectName("shadowLabel")
+        self.shadowLayout = QtWidgets.QHBoxLayout()
+        self.shadowLayout.setObjectName("shadowLayout")
+        self.shadowXSpinBox = QtWidgets.QSpinBox(BulkEditDialog)
+        self.shadowXSpinBox.setObjectName("shadowXSpinBox")
+        self.shadowXSpinBox.setRange(-999, 999)
+        self.shadowLayout.addWidget(self.shadowXSpinBox)
+        self.shadowYSpinBox = QtWidgets.QSpinBox(BulkEditDialog)
+        self.shadowYSpinBox.setObjectName("shadowYSpinBox")
+        self.shadowYSpinBox.setRange(-999, 999)
+        self.shadowLayout.addWidget(self.shadowYSpinBox)
+        self.formLayout.addRow(self.shadowLabel, self.shadowLayout)
+
+        self.durationLabel = QtWidgets.QLabel(BulkEditDialog)
+        self.durationLabel.setObjectName("durationLabel")
+        self.durationScaleSpinBox = QtWidgets.QDoubleSpinBox(BulkEditDialog)
+        self.durationScaleSpinBox.setObjectName("durationScaleSpinBox")
+        self.durationScaleSpinBox.setRange(0.1, 10.0)
+        self.durationScaleSpinBox.setSingleStep(0.25)
+        self.durationScaleSpinBox.setValue(1.0)
+        self.formLayout.addRow(self.durationLabel, self.durationScaleSpinBox)
+
+        self.flipLabel = QtWidgets.QLabel(BulkEditDialog)
+        self.flipLabel.setObjectName("flipLabel")
+        self.flipComboBox = QtWidgets.QComboBox(BulkEditDialog)
+        self.flipComboBox.setObjectName("flipComboBox")
+        self.flipComboBox.addItem("", userData=None)
+        self.flipComboBox.addItem("", userData=True)
+        self.flipComboBox.addItem("", userData=False)
+        self.formLayout.addRow(self.flipLabel, self.flipComboBox)
+
+        self.remapLabel = QtWidgets.QLabel(BulkEditDialog)
+        self.remapLabel.setObjectName("remapLabel")
+        self.remapLineEdit = QtWidgets.QLineEdit(BulkEditDialog)
+        self.remapLineEdit.setObjectName("remapLineEdit")
+        self.formLayout.addRow(self.remapLabel, self.remapLineEdit)
+
+        self.verticalLayout.addLayout(self.formLayout)
+
+        self.buttonBox = QtWidgets.QDialogButtonBox(BulkEditDialog)
+        self.buttonBox.setObjectName("buttonBox")
+        self.buttonBox.setStandardButtons(QtWidgets.QDialogButtonBox.StandardButton.Apply |
+                                          QtWidgets.QDialogButtonBox.StandardButton.Close)
+        self.verticalLayout.addWidget(self.buttonBox)
+
+        self.retranslateUi(BulkEditDialog)
+        QtCore.QMetaObject.connectSlotsByName(BulkEditDialog)
+
+    def retranslateUi(self, BulkEditDialog):
+        _translate = QtCore.QCoreApplication.translate
+        BulkEditDialog.setWindowTitle(_translate("BulkEditDialog", "Bulk Edit Frames"))
+        self.scopeLabel.setText(_translate("BulkEditDialog", "Apply To"))
+        self.scopeComboBox.setItemText(0, _translate("BulkEditDialog", "Selected Frames"))
+        self.scopeComboBox.setItemText(1, _translate("BulkEditDialog", "Current Direction"))
+        self.scopeComboBox.setItemText(2, _translate("BulkEditDialog", "All Directions of the Action"))
+        self.scopeComboBox.setItemText(3, _translate("BulkEditDialog", "All Actions"))
+        self.spriteLabel.setText(_translate("BulkEditDialog", "Move Sprite X, Y"))
+        self.shadowLabel.setText(_translate("BulkEditDialog", "Move Shadow X, Y"))
+        self.durationLabel.setText(_translate("BulkEditDialog", "Scale Durations"))
+        self.flipLabel.setText(_translate("BulkEditDialog", "Flip"))
+        self.flipComboBox.setItemText(0, _translate("BulkEditDialog", "Unchanged"))
+        self.flipComboBox.setItemText(1, _translate("BulkEditDialog", "Flipped"))
+        self.flipComboBox.setItemText(2, _translate("BulkEditDialog", "Not Flipped"))
+        self.remapLabel.setText(_translate("BulkEditDialog", "Replace Frames"))
+        self.remapLineEdit.setPlaceholderText(_translate("BulkEditDialog", "4>7, 5>8"))
@@ -2,6 +2,7 @@ from PySide6 import QtCore, QtGui, QtWidgets
 from PySide6.QtCore import Qt
 
 from data import VERSION
+from gui.filmstrip import FILMSTRIP_HEIGHT, Filmstrip
 
 class ClickableSlider(QtWidgets.QSlider):
     """Used so Slider Tick positions can be manually clicked on."""
@@ -116,6 +117,15 @@ class Ui_MainWindow(object):
         self.frameSlider.setObjectName("frameSlider")
         self.horizontalLayout_11.addWidget(self.frameSlider)
         self.gridLayout.addLayout(self.horizontalLayout_11, 1, 0, 1, 1)
+        self.filmstripArea = QtWidgets.QScrollArea(self.verticalFrame_3)
+        self.filmstripArea.setFixedHeight(FILMSTRIP_HEIGHT + 18)
+        self.filmstripArea.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.filmstripArea.setHorizontalScrollBarPolicy(QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.filmstripArea.setObjectName("filmstripArea")
+        self.filmstrip = Filmstrip()
+        self.filmstrip.setObjectName("filmstrip")
+        self.filmstripArea.setWidget(self.filmstrip)
+        self.gridLayout.addWidget(self.filmstripArea, 2, 0, 1, 1)
         self.groupBox_6 = QtWidgets.QGroupBox(self.verticalFrame_3)
         self.groupBox_6.setMinimumSize(QtCore.QSize(0, 75))
         self.groupBox_6.setMaximumSize(QtCore.QSize(16777215, 75))
@@ -137,7 +147,7 @@ class Ui_MainWindow(object):
         self.animationSpeedSlider.setMinimumHeight(18)
         self.animationSpeedSlider.setObjectName("animationSpeedSlider")
         self.verticalLayout_9.addWidget(self.animationSpeedSlider)
-        self.gridLayout.addWidget(self.groupBox_6, 2, 0, 1, 1)
+        self.gridLayout.addWidget(self.groupBox_6, 3, 0, 1, 1)
         self.horizontalLayout_9.addWidget(self.verticalFrame_3)
         self.directionGroupBox = QtWidgets.QGroupBox(self.centralwidget)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Expanding)
@@ -346,6 +356,7 @@ class Ui_MainWindow(object):
         self.animationFrameList = QtWidgets.QListWidget(self.groupBox_3)
         self.animationFrameList.setMaximumSize(QtCore.QSize(16777215, 372))
         self.animationFrameList.setObjectName("animationFrameList")
+        self.animationFrameList.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
         self.gridLayout_4.addWidget(self.animationFrameList, 0, 0, 7, 2)
         self.frameDeleteButton = QtWidgets.QPushButton(self.groupBox_3)
         self.frameDeleteButton.setMaximumSize(QtCore.QSize(42, 42))
@@ -415,6 +426,10 @@ class Ui_MainWindow(object):
         self.menuRecent.setObjectName("menuRecent")
         self.menuExport = QtWidgets.QMenu(self.menuFile)
         self.menuExport.setObjectName("menuExport")
+        self.menuCompression = QtWidgets.QMenu(self.menuExport)
+        self.menuCompression.setObjectName("menuCompression")
+        self.menuEdit = QtWidgets.QMenu(self.menubar)
+        self.menuEdit.setObjectName("menuEdit")
         self.menuBatch = QtWidgets.QMenu(self.menubar)
         self.menuBatch.setObjectName("menuBatch")
         MainWindow.setMenuBar(self.menubar)
@@ -434,6 +449,8 @@ class Ui_MainWindow(object):
         self.actionSave_As.setObjectName("actionSave_As")
         self.actionAdd_Action_Copy = QtGui.QAction(MainWindow)
         self.actionAdd_Action_Copy.setObjectName("actionAdd_Action_Copy")
+        self.actionSprite_Library = QtGui.QAction(MainWindow)
+        self.actionSprite_Library.setObjectName("actionSprite_Library")
         self.actionTrim_Copies = QtGui.QAction(MainWindow)
         self.actionTrim_Copies.setCheckable(True)
         self.actionTrim_Copies.setChecked(True)
@@ -442,12 +459,41 @@ class Ui_MainWindow(object):
         self.actionCollapse_Singles.setCheckable(True)
         self.actionCollapse_Singles.setChecked(True)
         self.actionCollapse_Singles.setObjectName("actionCollapse_Singles")
+        self.actionNear_Duplicate_Tolerance = QtGui.QAction(MainWindow)
+        self.actionNear_Duplicate_Tolerance.setObjectName("actionNear_Duplicate_Tolerance")
         self.actionExportAll_Animations = QtGui.QAction(MainWindow)
         self.actionExportAll_Animations.setObjectName("actionExportAll_Animations")
         self.actionExportSingle_Animation = QtGui.QAction(MainWindow)
         self.actionExportSingle_Animation.setObjectName("actionExportSingle_Animation")
+        self.actionStreaming_Export = QtGui.QAction(MainWindow)
+        self.actionStreaming_Export.setCheckable(True)
+        self.actionStreaming_Export.setObjectName("actionStreaming_Export")
+        self.actionExport_Memory_Limit = QtGui.QAction(MainWindow)
+        self.actionExport_Memory_Limit.setObjectName("actionExport_Memory_Limit")
+        self.actionIndexed_PNG = QtGui.QAction(MainWindow)
+        self.actionIndexed_PNG.setCheckable(True)
+        self.actionIndexed_PNG.setObjectName("actionIndexed_PNG")
+        self.actionBenchmark_Compression = QtGui.QAction(MainWindow)
+        self.actionBenchmark_Compression.setObjectName("actionBenchmark_Compression")
+        self.actionOptimize_Sheet = QtGui.QAction(MainWindow)
+        self.actionOptimize_Sheet.setObjectName("actionOptimize_Sheet")
+        self.actionMirror_Directions = QtGui.QAction(MainWindow)
+        self.actionMirror_Directions.setObjectName("actionMirror_Directions")
+        self.actionPerformance = QtGui.QAction(MainWindow)
+        self.actionPerformance.setObjectName("actionPerformance")
+        self.actionBulk_Edit = QtGui.QAction(MainWindow)
+        self.actionBulk_Edit.setObjectName("actionBulk_Edit")
+        self.actionUndo_Bulk_Edit = QtGui.QAction(MainWindow)
+        self.actionUndo_Bulk_Edit.setEnabled(False)
+        self.actionUndo_Bulk_Edit.setObjectName("actionUndo_Bulk_Edit")
         self.menuExport.addAction(self.actionExportAll_Animations)
         self.menuExport.addAction(self.actionExportSingle_Animation)
+        self.menuExport.addSeparator()
+        self.menuExport.addAction(self.actionStreaming_Export)
+        self.menuExport.addAction(self.actionExport_Memory_Limit)
+        self.menuExport.addAction(self.actionIndexed_PNG)
+        self.menuExport.addAction(self.menuCompression.menuAction())
+        self.menuExport.addAction(self.actionBenchmark_Compression)
         self.menuFile.addAction(self.actionLoad)
         self.menuFile.addAction(self.menuRecent.menuAction())
         self.menuFile.addSeparator()
@@ -457,11 +503,22 @@ class Ui_MainWindow(object):
         self.menuFile.addAction(self.actionSave_As)
         self.menuFile.addAction(self.actionTrim_Copies)
         self.menuFile.addAction(self.actionCollapse_Singles)
+        self.menuFile.addAction(self.actionNear_Duplicate_Tolerance)
+        self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionMirror_Directions)
+        self.menuFile.addAction(self.actionOptimize_Sheet)
+        self.menuFile.addSeparator()
+        self.menuFile.addAction(self.actionPerformance)
         self.menuFile.addSeparator()
         self.menuFile.addAction(self.actionExit)
         self.menuFile.addSeparator()
+        self.menuEdit.addAction(self.actionUndo_Bulk_Edit)
+        self.menuEdit.addSeparator()
+        self.menuEdit.addAction(self.actionBulk_Edit)
         self.menuBatch.addAction(self.actionAdd_Action_Copy)
+        self.menuBatch.addAction(self.actionSprite_Library)
         self.menubar.addAction(self.menuFile.menuAction())
+        self.menubar.addAction(self.menuEdit.menuAction())
         self.menubar.addAction(self.menuBatch.menuAction())
 
         self.retranslateUi(MainWindow)
@@ -520,6 +577,8 @@ class Ui_MainWindow(object):
         self.menuFile.setTitle(_translate("MainWindow", "File"))
         self.menuRecent.setTitle(_translate("MainWindow", "Recent"))
         self.menuExport.setTitle(_translate("MainWindow", "Export"))
+        self.menuCompression.setTitle(_translate("MainWindow", "Compression"))
+        self.menuEdit.setTitle(_translate("MainWindow", "Edit"))
         self.menuBatch.setTitle(_translate("MainWindow", "Batch"))
         self.actionLoad.setText(_translate("MainWindow", "Open"))
         self.actionLoad.setShortcut(_translate("MainWindow", "Ctrl+O"))
@@ -529,7 +588,20 @@ class Ui_MainWindow(object):
         self.actionNone.setText(_translate("MainWindow", "None"))
         self.actionSave_As.setText(_translate("MainWindow", "Save As"))
         self.actionAdd_Action_Copy.setText(_translate("MainWindow", "Add Action Copy"))
+        self.actionSprite_Library.setText(_translate("MainWindow", "Sprite Library..."))
         self.actionTrim_Copies.setText(_translate("MainWindow", "Trim Copies"))
         self.actionCollapse_Singles.setText(_translate("MainWindow", "Collapse Singles"))
+        self.actionNear_Duplicate_Tolerance.setText(_translate("MainWindow", "Near-Duplicate Tolerance..."))
         self.actionExportAll_Animations.setText(_translate("MainWindow", "Multi-Animation Sheets"))
         self.actionExportSingle_Animation.setText(_translate("MainWindow", "Single Animation Sheet"))
+        self.actionStreaming_Export.setText(_translate("MainWindow", "Streaming Export"))
+        self.actionExport_Memory_Limit.setText(_translate("MainWindow", "Export Memory Limit..."))
+        self.actionIndexed_PNG.setText(_translate("MainWindow", "Indexed PNG When Possible"))
+        self.actionBenchmark_Compression.setText(_translate("MainWindow", "Benchmark Compression..."))
+        self.actionOptimize_Sheet.setText(_translate("MainWindow", "Optimize Sheet"))
+        self.actionMirror_Directions.setText(_translate("MainWindow", "Mirror Directions..."))
+        self.actionPerformance.setText(_translate("MainWindow", "Performance..."))
+        self.actionBulk_Edit.setText(_translate("MainWindow", "Bulk Edit Frames..."))
+        self.actionBulk_Edit.setShortcut(_translate("MainWindow", "Ctrl+B"))
+        self.actionUndo_Bulk_Edit.setText(_translate("MainWindow", "Undo Bulk Edit"))
+        self.actionUndo_Bulk_Edit.setShortcut(_translate("MainWindow", "Ctrl+Z"))
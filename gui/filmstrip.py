@@ -0,0 +1,166 @@
+import bisect
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PySide6 import QtCore, QtGui, QtWidgets
+
+FILMSTRIP_HEIGHT = 40
+TICK_WIDTH = 4  # Pixels per tick of duration.
+MIN_CELL_WIDTH = 6
+
+# (sheet frame index, flipped, duration) of every cell.
+FilmstripFrame = Tuple[int, bool, int]
+
+
+class Filmstrip(QtWidgets.QWidget):
+    """Every frame of a sequence side by side, as wide as it lasts. The strip is composited into one cached image:
+    an edit only draws the cells that changed, the rest is copied over, shifted if widths before it changed."""
+    frameClicked = QtCore.Signal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.frames: List[FilmstripFrame] = []
+        self.starts: List[int] = [0]  # x of every cell, and the total width last.
+        self.current = -1
+        self.imageSource: Optional[Callable[[int], Optional[QtGui.QImage]]] = None
+        self.thumbnails: Dict[Tuple[int, bool, int], QtGui.QImage] = {}
+        self.strip = self._emptyStrip(1)
+        self.setFixedSize(1, FILMSTRIP_HEIGHT)
+
+    @staticmethod
+    def cellWidth(duration: int) -> int:
+        return max(MIN_CELL_WIDTH, duration * TICK_WIDTH)
+
+    @staticmethod
+    def _emptyStrip(width: int) -> QtGui.QImage:
+        image = QtGui.QImage(max(width, 1), FILMSTRIP_HEIGHT, QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(QtCore.Qt.GlobalColor.transparent)
+        return image
+
+    def setImageSource(self, source: Callable[[int], Optional[QtGui.QImage]]):
+        """Source of the full size image of a sheet frame. Thumbnails are cached until clear is called."""
+        self.imageSource = source
+
+    def clear(self):
+        self.thumbnails.clear()
+        self.setFrames([])
+
+    def cellRect(self, position: int) -> QtCore.QRect:
+        return QtCore.QRect(self.starts[position], 0, self.starts[position + 1] - self.starts[position],
+                            FILMSTRIP_HEIGHT)
+
+    def positionAt(self, x: float) -> int:
+        return min(max(bisect.bisect_right(self.starts, x) - 1, 0), len(self.frames) - 1)
+
+    def setFrames(self, frames: List[FilmstripFrame]):
+        old, oldStarts = self.frames, self.starts
+        prefix = 0
+        while prefix < min(len(old), len(frames)) and old[prefix] == frames[prefix]:
+            prefix += 1
+
+        if prefix == len(old) == len(frames):
+            return
+
+        suffix = 0
+        while suffix < min(len(old), len(frames)) - prefix and old[-1 - suffix] == frames[-1 - suffix]:
+            suffix += 1
+
+        self.frames = list(frames)
+        self.starts = [0, *itertools.accumulate(self.cellWidth(duration) for _, _, duration in self.frames)]
+        changed = range(prefix, len(self.frames) - suffix)
+
+        if self.starts == oldStarts:
+            # Same layout, only draw over the cells that changed.
+            painter = QtGui.QPainter(self.strip)
+            for position in changed:
+                self._drawCell(painter, position)
+            painter.end()
+
+            if changed:
+                self.update(self.cellRect(changed[0]).united(self.cellRect(changed[-1])))
+            return
+
+        strip = self._emptyStrip(self.starts[-1])
+        painter = QtGui.QPainter(strip)
+        # Cells before and after the changed ones look the same, they may only have moved. Copying a width of 0
+        # would copy the whole image.
+        if prefix:
+            painter.drawImage(0, 0, self.strip, 0, 0, oldStarts[prefix], FILMSTRIP_HEIGHT)
+        if suffix:
+            oldX, newX = oldStarts[len(old) - suffix], self.starts[len(self.frames) - suffix]
+            painter.drawImage(newX, 0, self.strip, oldX, 0, oldStarts[-1] - oldX, FILMSTRIP_HEIGHT)
+
+        for position in changed:
+            self._drawCell(painter, position)
+        painter.end()
+
+        self.strip = strip
+        self.current = min(self.current, len(self.frames) - 1)
+        self.setFixedSize(max(self.starts[-1], 1), FILMSTRIP_HEIGHT)
+        self.update()
+
+    def setCurrent(self, position: int):
+        if position == self.current:
+            return
+
+        if 0 <= self.current < len(self.frames):
+            self.update(self.cellRect(self.current))
+
+        self.current = position
+        if 0 <= position < len(self.frames):
+            rect = self.cellRect(position)
+            self.update(rect)
+
+            area = self.parentWidget().parentWidget() if self.parentWidget() else None
+            if isinstance(area, QtWidgets.QScrollArea):
+                area.ensureVisible(rect.center().x(), rect.center().y(), rect.width() // 2 + 8, 0)
+
+    def _thumbnail(self, frameIndex: int, flip: bool, width: int) -> Optional[QtGui.QImage]:
+        key = frameIndex, flip, width
+        if key not in self.thumbnails:
+            image = self.imageSource(frameIndex) if self.imageSource else None
+            if image is None or image.isNull():
+                return None
+
+            # Nearest neighbour keeps the pixel art readable. Scaling copies the image, the source may be a view.
+            image = image.scaled(width - 2, FILMSTRIP_HEIGHT - 2, QtCore.Qt.AspectRatioMode.KeepAspectRatio,
+                                 QtCore.Qt.TransformationMode.FastTransformation)
+            self.thumbnails[key] = image.mirrored(True, False) if flip else image
+
+        return self.thumbnails[key]
+
+    def _drawCell(self, painter: QtGui.QPainter, position: int):
+        frameIndex, flip, _ = self.frames[position]
+        rect = self.cellRect(position)
+
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode.CompositionMode_Source)
+        painter.fillRect(rect, self.palette().color(QtGui.QPalette.ColorRole.Base))
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode.CompositionMode_SourceOver)
+
+        thumbnail = self._thumbnail(frameIndex, flip, rect.width())
+        if thumbnail is not None:
+            painter.drawImage(rect.x() + (rect.width() - thumbnail.width()) // 2,
+                              (FILMSTRIP_HEIGHT - thumbnail.height()) // 2, thumbnail)
+
+        painter.setPen(self.palette().color(QtGui.QPalette.ColorRole.Mid))
+        painter.drawLine(rect.right(), 0, rect.right(), FILMSTRIP_HEIGHT - 1)
+
+    def paintEvent(self, event: QtGui.QPaintEvent):
+        painter = QtGui.QPainter(self)
+        rect = event.rect()
+        painter.drawImage(rect, self.strip, rect)
+
+        if 0 <= self.current < len(self.frames):
+            painter.setPen(QtGui.QPen(self.palette().color(QtGui.QPalette.ColorRole.Highlight), 2))
+            painter.drawRect(self.cellRect(self.current).adjusted(1, 1, -1, -1))
+
+    def mousePressEvent(self, event: QtGui.QMouseEvent):
+        if event.button() == QtCore.Qt.MouseButton.LeftButton and self.frames:
+            self.frameClicked.emit(self.positionAt(event.position().x()))
+            event.accept()
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent):
+        # Dragging scrubs.
+        if event.buttons() & QtCore.Qt.MouseButton.LeftButton and self.frames:
+            self.frameClicked.emit(self.positionAt(event.position().x()))
+            event.accept()
@@ -0,0 +1,113 @@
+from PySide6 import QtCore, QtWidgets
+
+
+class Ui_SpriteLibrary(object):
+    def setupUi(self, SpriteLibrary):
+        SpriteLibrary.setObjectName("SpriteLibrary")
+        SpriteLibrary.resize(720, 480)
+
+        self.verticalLayout = QtWidgets.QVBoxLayout(SpriteLibrary)
+        self.verticalLayout.setObjectName("verticalLayout")
+
+        self.label = QtWidgets.QLabel(SpriteLibrary)
+        self.label.setObjectName("label")
+        self.label.setWordWrap(True)
+        self.verticalLayout.addWidget(self.label)
+
+        self.directoryFrame = QtWidgets.QHBoxLayout()
+        self.directoryFrame.setObjectName("directoryFrame")
+        self.directoryLineEdit = QtWidgets.QLineEdit(SpriteLibrary)
+        self.directoryLineEdit.setObjectName("directoryLineEdit")
+        self.directoryFrame.addWidget(self.directoryLineEdit)
+        self.openDirectory = QtWidgets.QPushButton(SpriteLibrary)
+        self.openDirectory.setObjectName("openDirectory")
+        self.directoryFrame.addWidget(self.openDirectory)
+        self.indexButton = QtWidgets.QPushButton(SpriteLibrary)
+        self.indexButton.setObjectName("indexButton")
+        self.directoryFrame.addWidget(self.indexButton)
+        self.verticalLayout.addLayout(self.directoryFrame)
+
+        self.filterFrame = QtWidgets.QHBoxLayout()
+        self.filterFrame.setObjectName("filterFrame")
+        self.actionLayout = QtWidgets.QVBoxLayout()
+        self.actionLayout.setObjectName("actionLayout")
+        self.label_2 = QtWidgets.QLabel(SpriteLibrary)
+        self.label_2.setObjectName("label_2")
+        self.actionLayout.addWidget(self.label_2)
+        self.actionLineEdit = QtWidgets.QLineEdit(SpriteLibrary)
+        self.actionLineEdit.setObjectName("actionLineEdit")
+        self.actionLayout.addWidget(self.actionLineEdit)
+        self.filterFrame.addLayout(self.actionLayout)
+        self.copyLayout = QtWidgets.QVBoxLayout()
+        self.copyLayout.setObjectName("copyLayout")
+        self.label_3 = QtWidgets.QLabel(SpriteLibrary)
+        self.label_3.setObjectName("label_3")
+        self.copyLayout.addWidget(self.label_3)
+        self.copyLineEdit = QtWidgets.QLineEdit(SpriteLibrary)
+        self.copyLineEdit.setObjectName("copyLineEdit")
+        self.copyLayout.addWidget(self.copyLineEdit)
+        self.filterFrame.addLayout(self.copyLayout)
+        self.frameSizeLayout = QtWidgets.QVBoxLayout()
+        self.frameSizeLayout.setObjectName("frameSizeLayout")
+        self.label_4 = QtWidgets.QLabel(SpriteLibrary)
+        self.label_4.setObjectName("label_4")
+        self.frameSizeLayout.addWidget(self.label_4)
+        self.frameSizeLineEdit = QtWidgets.QLineEdit(SpriteLibrary)
+        self.frameSizeLineEdit.setObjectName("frameSizeLineEdit")
+        self.frameSizeLayout.addWidget(self.frameSizeLineEdit)
+        self.filterFrame.addLayout(self.frameSizeLayout)
+        self.formatLayout = QtWidgets.QVBoxLayout()
+        self.formatLayout.setObjectName("formatLayout")
+        self.label_5 = QtWidgets.QLabel(SpriteLibrary)
+        self.label_5.setObjectName("label_5")
+        self.formatLayout.addWidget(self.label_5)
+        self.formatComboBox = QtWidgets.QComboBox(SpriteLibrary)
+        self.formatComboBox.setObjectName("formatComboBox")
+        self.formatComboBox.addItem("", userData=None)
+        self.formatComboBox.addItem("", userData="single")
+        self.formatComboBox.addItem("", userData="multi")
+        self.formatLayout.addWidget(self.formatComboBox)
+        self.filterFrame.addLayout(self.formatLayout)
+        self.searchButton = QtWidgets.QPushButton(SpriteLibrary)
+        self.searchButton.setObjectName("searchButton")
+        self.filterFrame.addWidget(self.searchButton, 0, QtCore.Qt.AlignmentFlag.AlignBottom)
+        self.verticalLayout.addLayout(self.filterFrame)
+
+        self.resultsTree = QtWidgets.QTreeWidget(SpriteLibrary)
+        self.resultsTree.setObjectName("resultsTree")
+        self.resultsTree.setColumnCount(6)
+        self.resultsTree.setRootIsDecorated(False)
+        self.resultsTree.setSortingEnabled(True)
+        self.verticalLayout.addWidget(self.resultsTree)
+
+        self.statusLabel = QtWidgets.QLabel(SpriteLibrary)
+        self.statusLabel.setObjectName("statusLabel")
+        self.verticalLayout.addWidget(self.statusLabel)
+
+        self.retranslateUi(SpriteLibrary)
+        QtCore.QMetaObject.connectSlotsByName(SpriteLibrary)
+
+    def retranslateUi(self, SpriteLibrary):
+        _translate = QtCore.QCoreApplication.translate
+        SpriteLibrary.setWindowTitle(_translate("SpriteLibrary", "Sprite Library"))
+        self.label.setText(_translate("SpriteLibrary",
+                                      "Index every FrameData.xml and AnimData.xml in a folder and its subfolders, then "
+                                      "search them. Indexing again only reads characters that changed.\n"
+                                      "Double click a result to open it."))
+        self.openDirectory.setText(_translate("SpriteLibrary", "..."))
+        self.indexButton.setText(_translate("SpriteLibrary", "Index"))
+        self.label_2.setText(_translate("SpriteLibrary", "Has Action"))
+        self.label_3.setText(_translate("SpriteLibrary", "Copy Of"))
+        self.label_4.setText(_translate("SpriteLibrary", "Frame Size"))
+        self.frameSizeLineEdit.setPlaceholderText(_translate("SpriteLibrary", "32x32"))
+        self.label_5.setText(_translate("SpriteLibrary", "Format"))
+        self.formatComboBox.setItemText(0, _translate("SpriteLibrary", "Any"))
+        self.formatComboBox.setItemText(1, _translate("SpriteLibrary", "Single Sheet"))
+        self.formatComboBox.setItemText(2, _translate("SpriteLibrary", "Multi-Sheet"))
+        self.searchButton.setText(_translate("SpriteLibrary", "Search"))
+        self.resultsTree.setHeaderLabels([_translate("SpriteLibrary", "Path"),
+                                          _translate("SpriteLibrary", "Format"),
+                                          _translate("SpriteLibrary", "Frame Size"),
+                                          _translate("SpriteLibrary", "Actions"),
+                                          _translate("SpriteLibrary", "Frames"),
+                                          _translate("SpriteLibrary", "Matched")])
@@ -0,0 +1,51 @@
+from PySide6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_PerformanceDialog(object):
+    def setupUi(self, PerformanceDialog):
+        PerformanceDialog.setObjectName("PerformanceDialog")
+        PerformanceDialog.resize(640, 420)
+
+        self.verticalLayout = QtWidgets.QVBoxLayout(PerformanceDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+
+        self.recordCheckbox = QtWidgets.QCheckBox(PerformanceDialog)
+        self.recordCheckbox.setObjectName("recordCheckbox")
+        self.verticalLayout.addWidget(self.recordCheckbox)
+
+        self.summaryText = QtWidgets.QPlainTextEdit(PerformanceDialog)
+        self.summaryText.setObjectName("summaryText")
+        self.summaryText.setReadOnly(True)
+        self.summaryText.setLineWrapMode(QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap)
+        self.summaryText.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.SystemFont.FixedFont))
+        self.verticalLayout.addWidget(self.summaryText)
+
+        self.buttonFrame = QtWidgets.QHBoxLayout()
+        self.buttonFrame.setObjectName("buttonFrame")
+        self.refreshButton = QtWidgets.QPushButton(PerformanceDialog)
+        self.refreshButton.setObjectName("refreshButton")
+        self.buttonFrame.addWidget(self.refreshButton)
+        self.resetButton = QtWidgets.QPushButton(PerformanceDialog)
+        self.resetButton.setObjectName("resetButton")
+        self.buttonFrame.addWidget(self.resetButton)
+        self.saveTraceButton = QtWidgets.QPushButton(PerformanceDialog)
+        self.saveTraceButton.setObjectName("saveTraceButton")
+        self.buttonFrame.addWidget(self.saveTraceButton)
+        self.buttonFrame.addStretch()
+        self.closeButton = QtWidgets.QPushButton(PerformanceDialog)
+        self.closeButton.setObjectName("closeButton")
+        self.buttonFrame.addWidget(self.closeButton)
+        self.verticalLayout.addLayout(self.buttonFrame)
+
+        self.retranslateUi(PerformanceDialog)
+        QtCore.QMetaObject.connectSlotsByName(PerformanceDialog)
+
+    def retranslateUi(self, PerformanceDialog):
+        _translate = QtCore.QCoreApplication.translate
+        PerformanceDialog.setWindowTitle(_translate("PerformanceDialog", "Performance"))
+        self.recordCheckbox.setText(_translate("PerformanceDialog",
+                                               "Record timings of loading, importing, exporting and saving"))
+        self.refreshButton.setText(_translate("PerformanceDialog", "Refresh"))
+        self.resetButton.setText(_translate("PerformanceDialog", "Reset"))
+        self.saveTraceButton.setText(_translate("PerformanceDialog", "Save Chrome Trace..."))
+        self.closeButton.setText(_translate("PerformanceDialog", "Close"))
@@ -0,0 +1,100 @@
+from collections import deque
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+# Samples kept per statistic, a few seconds at typical refresh rates.
+HUD_SAMPLES = 240
+
+# Seconds between redraws of the overlay text, laying text out every paint would skew the paint times it shows.
+HUD_REFRESH = 0.25
+
+
+class RollingTimes:
+    """The last few durations in seconds, for averages and percentiles."""
+
+    def __init__(self, samples: int = HUD_SAMPLES):
+        self.values = deque(maxlen=samples)
+
+    def add(self, seconds: float):
+        self.values.append(seconds)
+
+    def clear(self):
+        self.values.clear()
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def mean(self) -> float:
+        return sum(self.values) / len(self.values) if self.values else 0.0
+
+    @property
+    def longest(self) -> float:
+        return max(self.values, default=0.0)
+
+    def percentiles(self, *percents: float) -> List[float]:
+        if not self.values:
+            return [0.0] * len(percents)
+
+        return [float(value) for value in np.percentile(np.fromiter(self.values, float), percents)]
+
+
+class PreviewStats:
+    """Timings of the preview widget shown by its overlay: how often and how long it paints, and how closely
+    animation playback keeps to the durations of the frames."""
+
+    def __init__(self):
+        self.frameIntervals = RollingTimes()
+        self.paintTimes = RollingTimes()
+        self.playbackLateness = RollingTimes()
+        self.lastPaint: Optional[float] = None
+        self.lastScheduled = 0.0
+        self.lastActual = 0.0
+
+    def reset(self):
+        self.frameIntervals.clear()
+        self.paintTimes.clear()
+        self.playbackLateness.clear()
+        self.lastPaint = None
+        self.lastScheduled = self.lastActual = 0.0
+
+    def recordPaint(self, start: float, end: float):
+        if self.lastPaint is not None:
+            self.frameIntervals.add(start - self.lastPaint)
+
+        self.lastPaint = start
+        self.paintTimes.add(end - start)
+
+    def recordPlayback(self, scheduled: float, actual: float):
+        """A playback frame meant to show for scheduled seconds was replaced after actual seconds."""
+        self.lastScheduled = scheduled
+        self.lastActual = actual
+        self.playbackLateness.add(actual - scheduled)
+
+    @property
+    def fps(self) -> float:
+        mean = self.frameIntervals.mean
+        return 1 / mean if mean else 0.0
+
+    def lines(self, textureCount: int, textureBytes: int) -> List[str]:
+        p50, p95, p99 = (value * 1000 for value in self.paintTimes.percentiles(50, 95, 99))
+        lines = [f"FPS {self.fps:.1f}",
+                 f"Paint p50 {p50:.2f}ms  p95 {p95:.2f}ms  p99 {p99:.2f}ms",
+                 f"Textures {textureCount}, {textureBytes / (1024 * 1024):.1f} MiB"]
+
+        if self.playbackLateness:
+            lines.append(f"Frame {self.lastScheduled * 1000:.1f}ms scheduled, {self.lastActual * 1000:.1f}ms actual")
+            lines.append(f"Late mean {self.playbackLateness.mean * 1000:+.2f}ms  "
+                         f"worst {self.playbackLateness.longest * 1000:+.2f}ms")
+        else:
+            lines.append("No playback timings yet")
+
+        return lines
+
+
+def textureMemory(textures: Iterable) -> tuple:
+    """Count and estimated bytes of the distinct uploaded textures, regions count as their owner, 4 bytes a pixel."""
+    textures = {id(owner): owner for owner in (getattr(texture, 'owner', None) or texture for texture in textures)}
+
+    return len(textures), sum(texture.width * texture.height * 4 for texture in textures.values())
@@ -0,0 +1,409 @@
+import os
+import sqlite3
+import time
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+LIBRARY_NAME = "library.sqlite"
+LIBRARY_VERSION = 1
+
+DATA_FORMATS = {"FrameData.xml": "single", "AnimData.xml": "multi"}
+MULTI_SHEET_SUFFIXES = ("-Anim.png", "-Offsets.png", "-Shadow.png")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    format TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    frameWidth INTEGER,
+    frameHeight INTEGER,
+    shadowSize INTEGER,
+    sheetWidth INTEGER,
+    sheetHeight INTEGER,
+    sheetBytes INTEGER,
+    frameCount INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS actions (
+    characterId INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL COLLATE NOCASE,
+    actionIndex INTEGER,
+    copyOf TEXT COLLATE NOCASE,
+    frameWidth INTEGER,
+    frameHeight INTEGER,
+    sequences INTEGER,
+    frames INTEGER,
+    duration INTEGER
+);
+CREATE INDEX IF NOT EXISTS actionsCharacter ON actions (characterId);
+CREATE INDEX IF NOT EXISTS actionsName ON actions (name);
+CREATE INDEX IF NOT EXISTS actionsCopyOf ON actions (copyOf);
+CREATE INDEX IF NOT EXISTS actionsFrameSize ON actions (frameWidth, frameHeight);
+CREATE INDEX IF NOT EXISTS charactersFrameSize ON characters (frameWidth, frameHeight);
+"""
+
+
+@dataclass
+class ActionRecord:
+    name: str
+    index: Optional[int]
+    copyOf: Optional[str]
+    frameWidth: Optional[int] = None  # Multi-sheets only, single sheets share the character's.
+    frameHeight: Optional[int] = None
+    sequences: int = 0
+    frames: int = 0
+    duration: int = 0  # Of the first direction.
+
+
+@dataclass
+class CharacterRecord:
+    path: str
+    format: str  # "single" or "multi".
+    mtime: int
+    files: int
+    frameWidth: Optional[int] = None
+    frameHeight: Optional[int] = None
+    shadowSize: Optional[int] = None
+    sheetWidth: Optional[int] = None
+    sheetHeight: Optional[int] = None
+    sheetBytes: int = 0
+    frameCount: int = 0
+    actions: List[ActionRecord] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class IndexResult:
+    scanned: int
+    updated: int
+    removed: int
+    failed: int
+    seconds: float
+
+    def summary(self) -> str:
+        return (f"{self.scanned} characters scanned in {self.seconds:.2f}s: {self.updated} indexed, "
+                f"{self.scanned - self.updated} unchanged, {self.removed} removed, {self.failed} unreadable.")
+
+
+@dataclass
+class LibraryEntry:
+    path: str
+    format: str
+    frameWidth: Optional[int]
+    frameHeight: Optional[int]
+    actionCount: int
+    frameCount: int
+    sheetBytes: int
+    error: Optional[str]
+    matchedActions: List[str]  # Actions that matched the action filters of the query.
+
+    @property
+    def frameSize(self) -> str:
+        return f"{self.frameWidth}x{self.frameHeight}" if self.frameWidth else "per action"
+
+
+def libraryPath(directory: str) -> str:
+    return os.path.join(directory, LIBRARY_NAME)
+
+
+def findLibrary(directory: str) -> Optional[str]:
+    """Library of the collection a directory is in, searching up from it."""
+    directory = os.path.abspath(directory)
+    while True:
+        path = libraryPath(directory)
+        if os.path.exists(path):
+            return path
+
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+
+        directory = parent
+
+
+def openLibrary(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != LIBRARY_VERSION:
+        # Only an index, rebuild it rather than migrating.
+        connection.executescript("DROP TABLE IF EXISTS actions; DROP TABLE IF EXISTS characters;")
+        connection.execute(f"PRAGMA user_version = {LIBRARY_VERSION}")
+
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def _sourceFiles(dirName: str, dataName: str, fileNames: List[str]) -> List[str]:
+    """The data file and the images a character is read from."""
+    if DATA_FORMATS[dataName] == "single":
+        images = [name for name in ("Anim.png", "Offsets.png") if name in fileNames]
+    else:
+        images = [name for name in fileNames if name.endswith(MULTI_SHEET_SUFFIXES)]
+
+    return [os.path.join(dirName, name) for name in (dataName, *images)]
+
+
+def _characterState(dirName: str, dataName: str, fileNames: List[str]) -> Tuple[str, int, int]:
+    """Format, latest modification time and file count of a character."""
+    files = _sourceFiles(dirName, dataName, fileNames)
+    return DATA_FORMATS[dataName], max(os.stat(path).st_mtime_ns for path in files), len(files)
+
+
+def findCharacters(directory: str) -> Dict[str, Tuple[str, int, int]]:
+    """Path, format, latest modification time and file count of every character under the directory."""
+    found = {}
+    for dirPath, dirNames, fileNames in os.walk(os.path.abspath(directory)):
+        for dataName in DATA_FORMATS:
+            if dataName in fileNames:
+                found[os.path.join(dirPath, dataName)] = _characterState(dirPath, dataName, fileNames)
+
+    return found
+
+
+def _int(element: Optional[ElementTree.Element]) -> Optional[int]:
+    if element is None or element.text is None:
+        return None
+
+    try:
+        return int(element.text)
+    except ValueError:
+        return None
+
+
+def _readSingle(record: CharacterRecord, root: ElementTree.Element):
+    record.frameWidth = _int(root.find("FrameWidth"))
+    record.frameHeight = _int(root.find("FrameHeight"))
+
+    dirName = os.path.dirname(record.path)
+    sheetPath = os.path.join(dirName, "Anim.png")
+    if os.path.exists(sheetPath):
+        # Only reads the header.
+        with Image.open(sheetPath) as image:
+            record.sheetWidth, record.sheetHeight = image.size
+
+        record.sheetBytes = sum(os.path.getsize(os.path.join(dirName, name)) for name in ("Anim.png", "Offsets.png")
+                                if os.path.exists(os.path.join(dirName, name)))
+        if record.frameWidth and record.frameHeight:
+            record.frameCount = ((record.sheetWidth // record.frameWidth) *
+                                 (record.sheetHeight // record.frameHeight))
+
+    for anim in root.find("Anims"):
+        sequences = anim.findall("Sequences/AnimSequence")
+        frames = sequences[0].findall("AnimFrame") if sequences else []
+        record.actions.append(ActionRecord(anim.findtext("Name", ""), _int(anim.find("Index")),
+                                           anim.findtext("CopyOf") or None, sequences=len(sequences),
+                                           frames=len(frames),
+                                           duration=sum(_int(frame.find("Duration")) or 0 for frame in frames)))
+
+
+def _readMulti(record: CharacterRecord, root: ElementTree.Element):
+    dirName = os.path.dirname(record.path)
+    for anim in root.find("Anims"):
+        name = anim.findtext("Name", "")
+        durations = [_int(duration) or 0 for duration in anim.findall("Durations/Duration")]
+        action = ActionRecord(name, _int(anim.find("Index")), anim.findtext("CopyOf") or None,
+                              _int(anim.find("FrameWidth")), _int(anim.find("FrameHeight")),
+                              frames=len(durations), duration=sum(durations))
+        record.actions.append(action)
+
+        if action.copyOf:
+            continue
+
+        sheetPath = os.path.join(dirName, f"{name}-Anim.png")
+        if os.path.exists(sheetPath):
+            with Image.open(sheetPath) as image:
+                width, height = image.size
+
+            if action.frameWidth and action.frameHeight:
+                action.sequences = height // action.frameHeight
+                record.frameCount += (width // action.frameWidth) * action.sequences
+
+        for suffix in MULTI_SHEET_SUFFIXES:
+            layerPath = os.path.join(dirName, f"{name}{suffix}")
+            if os.path.exists(layerPath):
+                record.sheetBytes += os.path.getsize(layerPath)
+
+
+def readCharacter(path: str, format: str, mtime: int, files: int) -> CharacterRecord:
+    """Read what the library keeps of a character. Runs in a worker process, failures are recorded on the record."""
+    record = CharacterRecord(path, format, mtime, files)
+    try:
+        root = ElementTree.parse(path).getroot()
+        if root.find("Anims") is None:
+            raise ValueError("No Anims element.")
+
+        record.shadowSize = _int(root.find("ShadowSize"))
+        if format == "single":
+            _readSingle(record, root)
+        else:
+            _readMulti(record, root)
+    except Exception as e:
+        # Keep one broken character from stopping the scan, it is stored with its error and read again once changed.
+        record.actions.clear()
+        record.error = f"{type(e).__name__}: {e}"
+
+    return record
+
+
+def _storeCharacter(connection: sqlite3.Connection, record: CharacterRecord):
+    connection.execute("DELETE FROM actions WHERE characterId IN (SELECT id FROM characters WHERE path = ?)",
+                       (record.path,))
+    connection.execute("DELETE FROM characters WHERE path = ?", (record.path,))
+
+    cursor = connection.execute(
+        "INSERT INTO characters (path, format, mtime, files, frameWidth, frameHeight, shadowSize, sheetWidth, "
+        "sheetHeight, sheetBytes, frameCount, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (record.path, record.format, record.mtime, record.files, record.frameWidth, record.frameHeight,
+         record.shadowSize, record.sheetWidth, record.sheetHeight, record.sheetBytes, record.frameCount,
+         record.error))
+
+    connection.executemany(
+        "INSERT INTO actions (characterId, position, name, actionIndex, copyOf, frameWidth, frameHeight, sequences, "
+        "frames, duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(cursor.lastrowid, position, action.name, action.index, action.copyOf, action.frameWidth, action.frameHeight,
+          action.sequences, action.frames, action.duration) for position, action in enumerate(record.actions)])
+
+
+def _underRoot(root: str) -> Tuple[str, tuple]:
+    """Condition limiting characters to a directory. Not LIKE, paths may contain its wildcards."""
+    prefix = os.path.join(os.path.abspath(root), "")
+    return "substr(c.path, 1, ?) = ?", (len(prefix), prefix)
+
+
+def indexCollection(directory: str, database: Optional[str] = None, workers: Optional[int] = None,
+                    force: bool = False) -> IndexResult:
+    """Bring the library of a directory up to date. Only characters whose files changed since the last run are read
+    again, in parallel. Characters that no longer exist are dropped."""
+    start = time.perf_counter()
+    found = findCharacters(directory)
+
+    with openLibrary(database or libraryPath(directory)) as connection:
+        condition, parameters = _underRoot(directory)
+        known = {path: (mtime, files) for path, mtime, files in
+                 connection.execute(f"SELECT c.path, c.mtime, c.files FROM characters c WHERE {condition}",
+                                    parameters)}
+
+        stale = [(path, format, mtime, files) for path, (format, mtime, files) in found.items()
+                 if force or known.get(path) != (mtime, files)]
+        removed = [path for path in known if path not in found]
+
+        records = []
+        if stale:
+            with ProcessPoolExecutor(workers) as executor:
+                records = list(executor.map(readCharacter, *zip(*stale), chunksize=16))
+
+        for record in records:
+            _storeCharacter(connection, record)
+
+        for path in removed:
+            connection.execute("DELETE FROM actions WHERE characterId IN (SELECT id FROM characters WHERE path = ?)",
+                               (path,))
+            connection.execute("DELETE FROM characters WHERE path = ?", (path,))
+
+    connection.close()
+
+    return IndexResult(len(found), len(records), len(removed), sum(1 for record in records if record.error),
+                       time.perf_counter() - start)
+
+
+def refreshCharacters(connection: sqlite3.Connection, paths: List[str]) -> int:
+    """Read the indexed characters at the paths again if their files changed, and drop the ones that are gone. Only
+    their own directories are looked at, characters added since the collection was indexed are not found. Returns how
+    many were updated."""
+    updated = 0
+    for path in paths:
+        row = connection.execute("SELECT mtime, files FROM characters WHERE path = ?", (path,)).fetchone()
+        dirName, dataName = os.path.split(path)
+        if os.path.exists(path):
+            format, mtime, files = _characterState(dirName, dataName, os.listdir(dirName))
+            if row == (mtime, files):
+                continue
+
+            _storeCharacter(connection, readCharacter(path, format, mtime, files))
+        elif row is not None:
+            connection.execute("DELETE FROM actions WHERE characterId IN (SELECT id FROM characters WHERE path = ?)",
+                               (path,))
+            connection.execute("DELETE FROM characters WHERE path = ?", (path,))
+
+        updated += 1
+
+    connection.commit()
+    return updated
+
+
+def parseFrameSize(text: str) -> Tuple[int, int]:
+    """'32x48' to (32, 48)."""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def queryLibrary(connection: sqlite3.Connection, root: Optional[str] = None, action: Optional[str] = None,
+                 missingAction: Optional[str] = None, copyOf: Optional[str] = None,
+                 frameSize: Optional[Tuple[int, int]] = None, format: Optional[str] = None,
+                 includeErrors: bool = True) -> List[LibraryEntry]:
+    """Characters matching every filter given. Action names compare case insensitively.
+
+    frameSize matches the frame size of single sheets and the frame size of any action of multi-sheets.
+    """
+    conditions = []
+    parameters = []
+    actionConditions = []  # Conditions on a single action, each has to hold for one of the character's actions.
+    actionParameters = []
+
+    if root:
+        condition, rootParameters = _underRoot(root)
+        conditions.append(condition)
+        parameters.extend(rootParameters)
+
+    if format:
+        conditions.append("c.format = ?")
+        parameters.append(format)
+
+    if not includeErrors:
+        conditions.append("c.error IS NULL")
+
+    if missingAction:
+        conditions.append("NOT EXISTS (SELECT 1 FROM actions a WHERE a.characterId = c.id AND a.name = ?)")
+        parameters.append(missingAction)
+
+    if action:
+        actionConditions.append("a.name = ?")
+        actionParameters.append(action)
+
+    if copyOf:
+        actionConditions.append("a.copyOf = ?")
+        actionParameters.append(copyOf)
+
+    for condition, parameter in zip(actionConditions, actionParameters):
+        conditions.append(f"EXISTS (SELECT 1 FROM actions a WHERE a.characterId = c.id AND {condition})")
+        parameters.append(parameter)
+
+    if frameSize:
+        conditions.append("((c.frameWidth = ? AND c.frameHeight = ?) OR EXISTS (SELECT 1 FROM actions a WHERE "
+                          "a.characterId = c.id AND a.frameWidth = ? AND a.frameHeight = ?))")
+        parameters.extend(frameSize * 2)
+
+        actionConditions.append("(a.frameWidth = ? AND a.frameHeight = ?)")
+        actionParameters.extend(frameSize)
+
+    # Report the actions that made a character match, for example which ones copy Idle.
+    matched = " OR ".join(actionConditions) or "0"
+    query = (f"SELECT c.path, c.format, c.frameWidth, c.frameHeight, c.frameCount, c.sheetBytes, c.error, "
+             f"(SELECT COUNT(*) FROM actions a WHERE a.characterId = c.id), "
+             f"(SELECT group_concat(a.name, '\n') FROM actions a WHERE a.characterId = c.id AND ({matched})) "
+             f"FROM characters c {'WHERE ' + ' AND '.join(conditions) if conditions else ''} ORDER BY c.path")
+
+    entries = []
+    for path, format, width, height, frameCount, sheetBytes, error, actionCount, names in connection.execute(
+            query, actionParameters + parameters):
+        entries.append(LibraryEntry(path, format, width, height, actionCount, frameCount or 0, sheetBytes or 0, error,
+                                    names.split("\n") if names else []))
+
+    return entries
@@ -1,17 +1,17 @@
 from __future__ import annotations
 
 import copy
+import logging
 import math
+import multiprocessing
 import os
-import pathlib
 import sys
+import time
 import traceback
 import xml.etree.ElementTree as ElementTree
-from collections import defaultdict
 from functools import partial
 from typing import Optional, Tuple, Set, Union, Literal
 import pyglet
-from PIL import Image, ImageDraw
 
 pyglet.options.com_mta = False
 import warnings
@@ -20,38 +20,62 @@ warnings.simplefilter("ignore", UserWarning)
 sys.coinit_flags = 2
 
 from PySide6 import QtCore, QtWidgets, QtGui
-from PySide6.QtCore import QSettings, QFileInfo
+from PySide6.QtCore import QSettings, QFileInfo, QStandardPaths
 from PySide6.QtGui import QWheelEvent, QPixmap, QImage, QKeyEvent, QSurfaceFormat
 from PySide6.QtWidgets import QFileDialog, QListWidgetItem, QInputDialog
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
 from pyglet.gl import *
 from pyglet.math import clamp
 
+from bulkedit import (SCOPE_ALL, SCOPE_DIRECTION, SCOPE_GROUP, SCOPE_SELECTION, BulkEdit, BulkEditRecord,
+                      applyBulkEdit, dropTouching, parseFrameRemap)
 from data import *
 from gui.batchadd import Ui_BatchCreateAction
+from gui.bulkedit import Ui_BulkEditDialog
 from gui.editor import Ui_MainWindow
-from utils import (TopLeftGrid, Camera, checkDuplicateImages, roundUpToMult, centerAndApplyOffset,
-                   getActionPointsFromImage, getActionPointsFromPILImage, getShadowLocationFromPILImage,
-                   createPlusImage, overlapColors)
+from gui.library import Ui_SpriteLibrary
+from gui.performance import Ui_PerformanceDialog
+from export import (COMPRESSION_PROFILES, DEFAULT_STREAM_FRAMES, ExportError, FrameSource, MemoryBudget,
+                    SheetWriter, benchmarkProfiles, exportMultipleSheets, formatBenchmark, formatBytes)
+from hud import HUD_REFRESH, PreviewStats, textureMemory
+from library import (LIBRARY_NAME, findCharacters, findLibrary, indexCollection, openLibrary, parseFrameSize,
+                     queryLibrary, refreshCharacters)
+from optimize import applyMirroredDirections, findMirroredDirections, optimizeSheet
+from pixelbuffer import PixelBuffer, copyReport, resetCopyStats
+from sheetio import (SheetError, createAnimDataXML, createBaseAnimGroupXML, createFrameDataXML,
+                     createMultiSheetFrameData, createSingleSheetFrameData, getFrameUniformity, importMultiSheet,
+                     parseAnimGroups, parseFrameDimensions, shadowImagePath, writeXML)
+from tracing import span, traced, tracer
+from utils import TopLeftGrid, Camera, getActionPointsFromImage, createPlusImage
+
+log = logging.getLogger(__name__)
 
 pyglet.image.Texture.default_min_filter = GL_NEAREST
 pyglet.image.Texture.default_mag_filter = GL_NEAREST
 
 
 class LoadedSheetFrame(QListWidgetItem):
-    def __init__(self, text, idx, image, label, editor: AnimationEditor):
+    def __init__(self, text, idx, image: QImage, label, editor: AnimationEditor):
         super().__init__(text)
-        self.image: pyglet.image.ImageData = image
         self.label = label
         self.editor = editor
         self.idx = idx
 
-        data = self.image.get_image_data().get_data('RGBA', -self.image.width * 4)
-        self.qim = QImage(data, image.width, image.height, QImage.Format.Format_RGBA8888).scaled(self.label.width(),
-                                                                                                 self.label.height(),
-                                                                                    QtCore.Qt.AspectRatioMode.KeepAspectRatio)
+        # Image may be a view into the sheet buffer, scaling gives us our own copy.
+        self.qim = image.scaled(self.label.width(), self.label.height(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
         self.pix = QPixmap.fromImage(self.qim)
 
+    def updateUsage(self, uses: List[Tuple[AnimGroup, int, int]]):
+        """Show how many animation frames use this sheet frame, and where in the tooltip."""
+        if uses:
+            self.setText(f"Frame {self.idx} ({len(uses)} uses)")
+            self.setToolTip("\n".join(f"{group.name} {FD_STR[direction]} #{slot}" for group, direction, slot in uses))
+            self.setData(QtCore.Qt.ItemDataRole.ForegroundRole, None)
+        else:
+            self.setText(f"Frame {self.idx} (unused)")
+            self.setToolTip("Not used by any animation.")
+            self.setForeground(QtGui.QBrush(QtCore.Qt.GlobalColor.gray))
+
     # Define the double-click event handler
     def mouseDoubleClickEvent(self, event):
         self.editor.addNewAnimationFrame(self.idx)
@@ -174,6 +198,11 @@ class PygletWidget(QOpenGLWidget):
 
         self.elapsed = 0
 
+        # Overlay with frame and playback timings, toggled with H.
+        self.stats = PreviewStats()
+        self.showHud = False
+        self.hudUpdated = 0.0
+
         self.setFocusPolicy(QtCore.Qt.FocusPolicy.StrongFocus)
 
     def keyPressEvent(self, event: QKeyEvent):
@@ -185,6 +214,18 @@ class PygletWidget(QOpenGLWidget):
         elif event.key() == QtCore.Qt.Key.Key_S:
             if self.editor.shadow:
                 self.editor.shadow.visible = not self.editor.shadow.visible
+                self.editor.refreshCompass()
+        elif event.key() == QtCore.Qt.Key.Key_D:
+            self.editor.toggleCompass()
+        elif event.key() == QtCore.Qt.Key.Key_N:
+            self.editor.cycleOnionSkin()
+        elif event.key() == QtCore.Qt.Key.Key_T:
+            self.editor.onionTint = not self.editor.onionTint
+            self.editor.updateOnionSkin()
+        elif event.key() == QtCore.Qt.Key.Key_H:
+            self.showHud = not self.showHud
+            self.stats.reset()
+            self.hudUpdated = 0.0
 
     def wheelEvent(self, event: QWheelEvent):
         super().wheelEvent(event)
@@ -212,11 +253,28 @@ class PygletWidget(QOpenGLWidget):
         self.update()
 
     def paintGL(self):
+        start = time.perf_counter()
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
         with self.camera:
             self.batch.draw()
 
+        if self.showHud:
+            # CPU time spent issuing the draws, the GPU finishes them later.
+            self.stats.recordPaint(start, time.perf_counter())
+            self._drawHud(start)
+
+    def _drawHud(self, now: float):
+        if now - self.hudUpdated >= HUD_REFRESH:
+            self.hudUpdated = now
+            self.hudLabel.text = "\n".join(self.stats.lines(*self.editor.textureMemory()))
+            self.hudLabel.position = 8, self.height() - 8, 0
+            self.hudBackground.position = 4, self.height() - self.hudLabel.content_height - 12
+            self.hudBackground.width = self.hudLabel.content_width + 8
+            self.hudBackground.height = self.hudLabel.content_height + 8
+
+        self.hudBatch.draw()
+
     def resizeGL(self, width, height):
         self.projection = pyglet.math.Mat4.orthogonal_projection(0, width, 0, height, -255, 255)
 
@@ -234,6 +292,9 @@ class PygletWidget(QOpenGLWidget):
             self.editor.sprite.position = self.editor.getSpritePosition()
             self.editor.shadow.position = self.editor.getShadowPosition()
 
+        self.editor.refreshCompass()
+        self.editor.updateOnionSkin()
+
     def initializeGL(self):
         """Call anything that needs a context to be created."""
         self._projection_matrix = pyglet.math.Mat4()
@@ -241,6 +302,13 @@ class PygletWidget(QOpenGLWidget):
 
         self.batch = pyglet.graphics.Batch()
 
+        # Drawn after the camera is reset, so it stays in the corner of the widget.
+        self.hudBatch = pyglet.graphics.Batch()
+        self.hudBackground = pyglet.shapes.Rectangle(0, 0, 1, 1, color=(0, 0, 0, 160), batch=self.hudBatch,
+                                                     group=pyglet.graphics.Group(0))
+        self.hudLabel = pyglet.text.Label("", font_size=9, multiline=True, width=360, anchor_y='top',
+                                          batch=self.hudBatch, group=pyglet.graphics.Group(1))
+
         try:
             self._default_program = pyglet.graphics.shader.ShaderProgram(
                 pyglet.graphics.shader.Shader(self._default_vertex_source, 'vertex'),
@@ -333,53 +401,50 @@ class BatchAddImplementation:
             collapse = self.editor.ui.actionCollapse_Singles.isChecked()
 
             ct = 0
-            for dirpath, dirnames, filenames in os.walk(self.ui.directoryLineEdit.text()):
-                for filename in filenames:
-                    if filename == "FrameData.xml":
-                        fileName = os.path.join(dirpath, filename)
-                        data = ElementTree.parse(fileName)
-
-                        root = data.getroot()
-
-                        animsEl = root.find("Anims")
-
-                        exists = False
-                        write = False
-                        for actionAnim in animsEl:
-                            for animEl in actionAnim:
-                                if animEl.tag == "Name":
-                                    # Found one...
-                                    if animEl.text.lower() == useAction.name.lower():
-                                        exists = True
-
-                                        if overwrite:
-                                            # Clear existing anim.
-                                            actionAnim.clear()
-                                            if self.editor.createBaseAnimGroupXML(actionAnim, useAction.name, groupIdx,
-                                                                                  copyAction,
-                                                                                  trim=not fulldata,
-                                                                                  copyName=copyAction.name):
-                                                self.editor.createSingleSheetFrameData(actionAnim, copyAction, collapse)
-
-                                            write = True
-                                        else:
-                                            break
-
-                        if not exists:
-                            animEl = ElementTree.SubElement(animsEl, "Anim")
-                            if self.editor.createBaseAnimGroupXML(animEl, useAction.name, groupIdx, copyAction,
-                                                                  trim=not fulldata,
-                                                                  copyName=copyAction.name):
-                                self.editor.createSingleSheetFrameData(animEl, copyAction, collapse)
-                            write = True
-
-                        if write:
-                            ElementTree.indent(root)
-
-                            tree = ElementTree.ElementTree(root)
-                            tree.write(fileName, encoding='utf-8', xml_declaration=True)
-
-                            ct += 1
+            for fileName in self._targetFiles(self.ui.directoryLineEdit.text(), useAction.name, overwrite):
+                data = ElementTree.parse(fileName)
+
+                root = data.getroot()
+
+                animsEl = root.find("Anims")
+
+                exists = False
+                write = False
+                for actionAnim in animsEl:
+                    for animEl in actionAnim:
+                        if animEl.tag == "Name":
+                            # Found one...
+                            if animEl.text.lower() == useAction.name.lower():
+                                exists = True
+
+                                if overwrite:
+                                    # Clear existing anim.
+                                    actionAnim.clear()
+                                    if self.editor.createBaseAnimGroupXML(actionAnim, useAction.name, groupIdx,
+                                                                          copyAction,
+                                                                          trim=not fulldata,
+                                                                          copyName=copyAction.name):
+                                        self.editor.createSingleSheetFrameData(actionAnim, copyAction, collapse)
+
+                                    write = True
+                                else:
+                                    break
+
+                if not exists:
+                    animEl = ElementTree.SubElement(animsEl, "Anim")
+                    if self.editor.createBaseAnimGroupXML(animEl, useAction.name, groupIdx, copyAction,
+                                                          trim=not fulldata,
+                                                          copyName=copyAction.name):
+                        self.editor.createSingleSheetFrameData(animEl, copyAction, collapse)
+                    write = True
+
+                if write:
+                    ElementTree.indent(root)
+
+                    tree = ElementTree.ElementTree(root)
+                    tree.write(fileName, encoding='utf-8', xml_declaration=True)
+
+                    ct += 1
 
             error_dialog = QtWidgets.QMessageBox()
             error_dialog.setWindowTitle("Complete")
@@ -387,6 +452,24 @@ class BatchAddImplementation:
             error_dialog.setText(f"Operation completed with {ct} changes.")
             error_dialog.exec()
 
+    def _targetFiles(self, directory: str, actionName: str, overwrite: bool) -> List[str]:
+        """FrameData.xml files under the directory the action has to be written to, looked up in the library of the
+        collection. Indexed characters whose files changed since are read again, finding new ones is left to Index."""
+        connection = openLibrary(self.editor.libraryDatabase(directory))
+        indexed = [entry.path for entry in queryLibrary(connection, directory, format="single")]
+        if not indexed:
+            connection.close()
+            self.editor.ui.statusBar.showMessage("This collection is not in the Sprite Library, index it there to skip "
+                                                 "the characters that already have the action.", 10000)
+            return [path for path, (format, _, _) in findCharacters(directory).items() if format == "single"]
+
+        refreshCharacters(connection, indexed)
+        entries = queryLibrary(connection, directory, missingAction=None if overwrite else actionName, format="single",
+                               includeErrors=False)
+        connection.close()
+
+        return [entry.path for entry in entries]
+
     def finalizeClick(self, button):
         role = self.ui.finalizeButtonBox.buttonRole(button)
         if role == QtWidgets.QDialogButtonBox.ButtonRole.ApplyRole:
@@ -415,13 +498,168 @@ class BatchAddImplementation:
         self.ui.directoryLineEdit.setText(directory)
 
 
-REDUCE_RUSH_FRAMES = False
+class LibraryImplementation:
+    def __init__(self, window: QtWidgets.QWidget, editor: AnimationEditor, ui: 'Ui_SpriteLibrary'):
+        self.window = window
+        self.ui = ui
+        self.editor = editor
+
+        self.ui.openDirectory.clicked.connect(lambda: self.openDirectory())
+        self.ui.indexButton.clicked.connect(lambda: self.index())
+        self.ui.searchButton.clicked.connect(lambda: self.search())
+        for lineEdit in (self.ui.actionLineEdit, self.ui.copyLineEdit, self.ui.frameSizeLineEdit):
+            lineEdit.returnPressed.connect(lambda: self.search())
+
+        self.ui.resultsTree.itemDoubleClicked.connect(self.openResult)
+
+    def openDirectory(self):
+        directory = QFileDialog.getExistingDirectory(self.window, "Select Collection Directory")
+
+        if directory:
+            self.ui.directoryLineEdit.setText(directory)
+
+    def index(self):
+        directory = self.ui.directoryLineEdit.text()
+        if not directory or not os.path.isdir(directory):
+            self.ui.statusLabel.setText("Select a directory to index.")
+            return
+
+        self.ui.statusLabel.setText("Indexing... this may take a moment.")
+        self.editor.app.processEvents()
+
+        result = indexCollection(directory, self.editor.libraryDatabase(directory))
+        self.ui.statusLabel.setText(result.summary())
+
+        self.search(result.summary())
+
+    def search(self, status: str = ""):
+        directory = self.ui.directoryLineEdit.text()
+        database = self.editor.libraryDatabase(directory) if directory else None
+        if not database or not os.path.exists(database):
+            self.ui.statusLabel.setText("No library for this directory yet, index it first.")
+            return
+
+        frameSize = None
+        if self.ui.frameSizeLineEdit.text():
+            try:
+                frameSize = parseFrameSize(self.ui.frameSizeLineEdit.text())
+            except ValueError:
+                self.ui.statusLabel.setText("Frame size must be given as WIDTHxHEIGHT, for example 32x32.")
+                return
+
+        connection = openLibrary(database)
+        entries = queryLibrary(connection, directory, self.ui.actionLineEdit.text() or None, None,
+                               self.ui.copyLineEdit.text() or None, frameSize, self.ui.formatComboBox.currentData())
+        connection.close()
+
+        self.ui.resultsTree.setSortingEnabled(False)
+        self.ui.resultsTree.clear()
+        for entry in entries:
+            item = QtWidgets.QTreeWidgetItem([os.path.relpath(entry.path, directory), entry.format, entry.frameSize])
+            item.setData(0, QtCore.Qt.ItemDataRole.UserRole, entry.path)
+            item.setToolTip(0, entry.path)
+            item.setData(3, QtCore.Qt.ItemDataRole.DisplayRole, entry.actionCount)
+            item.setData(4, QtCore.Qt.ItemDataRole.DisplayRole, entry.frameCount)
+
+            if entry.error:
+                item.setText(5, entry.error)
+                for column in range(6):
+                    item.setForeground(column, QtGui.QBrush(QtCore.Qt.GlobalColor.red))
+            else:
+                item.setText(5, ", ".join(entry.matchedActions))
+
+            self.ui.resultsTree.addTopLevelItem(item)
+
+        self.ui.resultsTree.setSortingEnabled(True)
+        self.ui.resultsTree.resizeColumnToContents(0)
+
+        matches = f"{len(entries)} characters found."
+        self.ui.statusLabel.setText(f"{status} {matches}" if status else matches)
+
+    def openResult(self, item: QtWidgets.QTreeWidgetItem):
+        path = item.data(0, QtCore.Qt.ItemDataRole.UserRole)
+        if path.endswith("AnimData.xml"):
+            self.editor.importMultipleSheets(path)
+        else:
+            self.editor.loadSheet(path)
+
+
+class PerformanceImplementation:
+    def __init__(self, window: QtWidgets.QWidget, editor: AnimationEditor, ui: 'Ui_PerformanceDialog'):
+        self.window = window
+        self.ui = ui
+        self.editor = editor
+
+        self.ui.recordCheckbox.setChecked(tracer.enabled)
+        self.ui.recordCheckbox.toggled.connect(self.setRecording)
+        self.ui.refreshButton.clicked.connect(lambda: self.refresh())
+        self.ui.resetButton.clicked.connect(lambda: self.reset())
+        self.ui.saveTraceButton.clicked.connect(lambda: self.saveTrace())
+        self.ui.closeButton.clicked.connect(lambda: self.window.hide())
+
+        self.refresh()
+
+    def setRecording(self, enabled: bool):
+        tracer.enabled = enabled
+        self.editor.settings.setValue('recordTimings', enabled)
+
+    def refresh(self):
+        if not tracer.enabled and not tracer.records:
+            self.ui.summaryText.setPlainText("Recording is off. Turn it on, then load, import, export or save.")
+            return
+
+        self.ui.summaryText.setPlainText(tracer.formatSummary())
+
+    def reset(self):
+        tracer.reset()
+        self.refresh()
+
+    def saveTrace(self):
+        fileName, _ = QFileDialog.getSaveFileName(self.window, "Save Chrome Trace", "trace.json", "Trace (*.json)")
+
+        if fileName:
+            tracer.writeChromeTrace(fileName)
+
+
+class BulkEditImplementation:
+    scopes = (SCOPE_SELECTION, SCOPE_DIRECTION, SCOPE_GROUP, SCOPE_ALL)  # In the order of the scope combo box.
+
+    def __init__(self, window: QtWidgets.QWidget, editor: AnimationEditor, ui: 'Ui_BulkEditDialog'):
+        self.window = window
+        self.ui = ui
+        self.editor = editor
+
+        self.ui.buttonBox.button(QtWidgets.QDialogButtonBox.StandardButton.Apply).clicked.connect(
+            lambda: self.apply())
+        self.ui.buttonBox.rejected.connect(lambda: self.window.hide())
+
+    def apply(self):
+        try:
+            edit = BulkEdit((self.ui.spriteXSpinBox.value(), self.ui.spriteYSpinBox.value()),
+                            (self.ui.shadowXSpinBox.value(), self.ui.shadowYSpinBox.value()),
+                            self.ui.durationScaleSpinBox.value(), self.ui.flipComboBox.currentData(),
+                            parseFrameRemap(self.ui.remapLineEdit.text()))
+        except ValueError as e:
+            self.editor.createErrorPopup(str(e))
+            return
+
+        if edit.empty:
+            self.editor.ui.statusBar.showMessage("Nothing to change.", 5000)
+            return
+
+        if self.editor.applyBulkEdit(self.scopes[self.ui.scopeComboBox.currentIndex()], edit):
+            self.window.hide()
 
 
 class AnimationEditor:
     shadowImage: Optional[pyglet.image.AbstractImage]
     sprite: Optional[pyglet.sprite.Sprite]
     animationSpeedSliderValues = (0.1, 0.25, 0.5, 1, 2)
+    # Cell of each direction around the compass preview, in the order of the direction buttons.
+    compassLayout = ((0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1))
+    maxOnionFrames = 3
+    onionOpacity = 128  # Of the nearest frames, further ones fade out.
+    onionTints = ((255, 128, 128), (128, 255, 128))  # Frames before and after, when tinting.
     maxRecent = 5
 
     def __init__(self, app: QtWidgets.QApplication, window: QtWidgets.QMainWindow, ui: Ui_MainWindow):
@@ -430,21 +668,62 @@ class AnimationEditor:
         self.window = window
         self.ui = ui
         self.groups: List[AnimGroup] = []
+        self.frameUsage = FrameUsageIndex()
+        self.loadedSheetItems: dict[int, LoadedSheetFrame] = {}
         self.fileName = ''
         self.loadedTree: Optional[ElementTree] = None
         self.batchAddImplem: Optional[BatchAddImplementation] = None
+        self.libraryWindow: Optional[QtWidgets.QWidget] = None
+        self.libraryImplem: Optional[LibraryImplementation] = None
+        self.performanceWindow: Optional[QtWidgets.QWidget] = None
+        self.performanceImplem: Optional[PerformanceImplementation] = None
+        self.bulkEditWindow: Optional[QtWidgets.QWidget] = None
+        self.bulkEditImplem: Optional[BulkEditImplementation] = None
+        self.bulkUndo: List[BulkEditRecord] = []  # Most recent last.
+        self.uploadedTextures: dict[int, pyglet.image.Texture] = {}  # Given to sprites, keyed by owning texture.
 
         self.settings = QSettings('MDFrameEditor', 'Frame Editor')
         self.recentFiles: object | list = self.settings.value('recent', [])
 
         self.enableTrim = self.settings.value('trim', True, bool)
         self.enableCollapse = self.settings.value('collapse', True, bool)
+        self.enableStreaming = self.settings.value('streamExport', False, bool)
+        self.exportMemoryLimit = self.settings.value('exportMemoryLimit', 0, int)  # In MB, 0 is unlimited.
+        self.duplicateTolerance = DuplicateTolerance(self.settings.value('nearDuplicatePixels', 0, int),
+                                                     self.settings.value('nearDuplicateDelta', 0, int))
 
         self.ui.actionCollapse_Singles.setChecked(self.enableCollapse)
         self.ui.actionTrim_Copies.setChecked(self.enableTrim)
+        self.ui.actionStreaming_Export.setChecked(self.enableStreaming)
+        self.ui.actionIndexed_PNG.setChecked(self.settings.value('indexedPng', False, bool))
 
         self.ui.actionCollapse_Singles.changed.connect(lambda: self.saveCollapse())
         self.ui.actionTrim_Copies.changed.connect(lambda: self.saveTrim())
+        self.ui.actionStreaming_Export.changed.connect(lambda: self.saveStreaming())
+        self.ui.actionIndexed_PNG.changed.connect(
+            lambda: self.settings.setValue('indexedPng', self.ui.actionIndexed_PNG.isChecked()))
+        self.ui.actionExport_Memory_Limit.triggered.connect(lambda: self.setExportMemoryLimit())
+        self.ui.actionNear_Duplicate_Tolerance.triggered.connect(lambda: self.setDuplicateTolerance())
+
+        self.compressionProfile = self.settings.value('compressionProfile', 'default', str)
+        tracer.enabled = self.settings.value('recordTimings', False, bool)
+        if self.compressionProfile not in COMPRESSION_PROFILES:
+            self.compressionProfile = 'default'
+
+        self.compressionActions = QtGui.QActionGroup(self.window)
+        for key, profile in COMPRESSION_PROFILES.items():
+            action = QtGui.QAction(profile.name, self.window, checkable=True)
+            action.setChecked(key == self.compressionProfile)
+            action.triggered.connect(lambda checked=False, k=key: self.setCompressionProfile(k))
+            self.compressionActions.addAction(action)
+            self.ui.menuCompression.addAction(action)
+
+        self.ui.actionBenchmark_Compression.triggered.connect(lambda: self.benchmarkCompression())
+        self.ui.actionOptimize_Sheet.triggered.connect(lambda: self.optimizeSheet())
+        self.ui.actionMirror_Directions.triggered.connect(lambda: self.mirrorDirections())
+        self.ui.actionPerformance.triggered.connect(lambda: self.openPerformance())
+        self.ui.actionBulk_Edit.triggered.connect(lambda: self.openBulkEdit())
+        self.ui.actionUndo_Bulk_Edit.triggered.connect(lambda: self.undoBulkEdit())
 
         self.ui.actionExit.triggered.connect(lambda: self.exitApplication())
 
@@ -461,22 +740,28 @@ class AnimationEditor:
         self.scale = 2.0  # default sprite scaling.
 
         self.animSpeed = 1 / 60
+        self.playbackScheduled = 0.0  # Seconds the frame being shown was scheduled for.
+        self.playbackStart = 0.0  # perf_counter at tick 0 of the playing sequence.
+        self.playbackPosition = 0  # Position in the sequence of the frame playback shows.
+
+        # Sequences edited through the spinboxes since the last rendered frame, see _queueSequenceEdit.
+        self.pendingEdits: dict[tuple[int, int], tuple[AnimGroup, int]] = {}
+        self.pendingRedraw = False
+        self.editsScheduled = False
+
+        self.sheetBuffer: Optional[PixelBuffer] = None
         self.sheetImage: Optional[pyglet.image.ImageData] = None
         self.imageGrid: Optional[TopLeftGrid] = None
 
+        self.actionPtBuffer: Optional[PixelBuffer] = None
         self.actionPtImage: Optional[pyglet.image.ImageData] = None
         self.actionGrid: Optional[TopLeftGrid] = None
         self.actionPoints: dict[int, ActionPoints] = {}
 
-        if getattr(sys, 'frozen', False):
-            app_dir = pathlib.Path(sys._MEIPASS)
-        else:
-            app_dir = pathlib.Path(__file__).resolve().parent
-
-        shadow_image_path = app_dir / "shadow.png"
-        self.shadowImage = pyglet.image.load(shadow_image_path)
+        self.shadowImage = pyglet.image.load(shadowImagePath())
         self.shadowImage.anchor_x = self.shadowImage.width // 2
         self.shadowImage.anchor_y = self.shadowImage.height // 2
+        self.shadowBuffer = PixelBuffer.fromImageData(self.shadowImage)
 
         self.sprite = None
         self.shadow: Optional[pyglet.sprite.Sprite] = None
@@ -492,6 +777,20 @@ class AnimationEditor:
 
         self.apSprites = []
 
+        # Parents of the preview of the current direction and of the compass of all directions, one is hidden.
+        self.singlePreview = pyglet.graphics.Group()
+        self.compassPreview = pyglet.graphics.Group()
+        self.compassPreview.visible = False
+        self.showCompass = False
+        self.compassSprites: List[pyglet.sprite.Sprite] = []
+        self.compassShadows: List[pyglet.sprite.Sprite] = []
+
+        # Frames around the current one drawn faintly behind it, toggled with N.
+        self.onionFrames = 0
+        self.onionTint = False
+        self.onionGroup = pyglet.graphics.Group(0, parent=self.singlePreview)
+        self.onionSprites: List[pyglet.sprite.Sprite] = []
+
         self.currentDirection = 0
         self.animating = False
         self.newWindow = None
@@ -557,6 +856,9 @@ class AnimationEditor:
         self.ui.mirroredCheckbox.clicked.connect(lambda: self.flipChanged())
 
         self.ui.frameSlider.valueChanged.connect(lambda: self.sliderChange())
+        self.ui.frameSlider.valueChanged.connect(self.ui.filmstrip.setCurrent)
+        self.ui.filmstrip.setImageSource(self._frameQImage)
+        self.ui.filmstrip.frameClicked.connect(self.ui.frameSlider.setValue)
         self.ui.frameDuplicateButton.clicked.connect(lambda: self.duplicateFrame())
         self.ui.frameDeleteButton.clicked.connect(lambda: self.deleteSelectedFrames())
 
@@ -576,7 +878,8 @@ class AnimationEditor:
 
         self.ui.defaultFrameButton.clicked.connect(lambda: self.defaultFrameClick())
 
-        self.ui.menuBatch.triggered.connect(lambda: self.openBatchAdd())
+        self.ui.actionAdd_Action_Copy.triggered.connect(lambda: self.openBatchAdd())
+        self.ui.actionSprite_Library.triggered.connect(lambda: self.openSpriteLibrary())
 
         self.ui.returnPointButton.clicked.connect(lambda: self.setReturnPoint())
         self.ui.hitPointButton.clicked.connect(lambda: self.setHitPoint())
@@ -636,12 +939,277 @@ class AnimationEditor:
             self.newWindow.setWindowTitle("Batch Add Action")
         self.newWindow.show()
 
+    def openSpriteLibrary(self):
+        if not self.libraryWindow:
+            self.libraryWindow = QtWidgets.QWidget()
+            ui = Ui_SpriteLibrary()
+            ui.setupUi(self.libraryWindow)
+            self.libraryImplem = LibraryImplementation(self.libraryWindow, self, ui)
+        self.libraryWindow.show()
+
+    def openPerformance(self):
+        if not self.performanceWindow:
+            self.performanceWindow = QtWidgets.QWidget()
+            ui = Ui_PerformanceDialog()
+            ui.setupUi(self.performanceWindow)
+            self.performanceImplem = PerformanceImplementation(self.performanceWindow, self, ui)
+        else:
+            self.performanceImplem.refresh()
+        self.performanceWindow.show()
+
+    def openBulkEdit(self):
+        if not self.bulkEditWindow:
+            self.bulkEditWindow = QtWidgets.QWidget()
+            ui = Ui_BulkEditDialog()
+            ui.setupUi(self.bulkEditWindow)
+            self.bulkEditImplem = BulkEditImplementation(self.bulkEditWindow, self, ui)
+        self.bulkEditWindow.show()
+
+    def _bulkTargets(self, scope: str) -> List[Tuple[AnimGroup, int, List[AnimFrame]]]:
+        if scope == SCOPE_ALL:
+            groups = self.groups
+        elif self.currentAnimGroup is None:
+            return []
+        elif scope == SCOPE_GROUP:
+            groups = [self.currentAnimGroup]
+        elif scope == SCOPE_DIRECTION:
+            return [(self.currentAnimGroup, self.currentDirection, self.currentSequence.frames)]
+        else:
+            return [(self.currentAnimGroup, self.currentDirection,
+                     [item.animFrame for item in self.ui.animationFrameList.selectedItems()])]
+
+        return [(group, direction, sequence.frames) for group in groups
+                for direction, sequence in enumerate(group.directions)]
+
+    def applyBulkEdit(self, scope: str, edit: BulkEdit) -> bool:
+        """Apply the edit to every frame in scope as one change: the views refresh once and it undoes in one step."""
+        if self.imageGrid is None:
+            self.ui.statusBar.showMessage("Load a sheet to edit its frames.", 5000)
+            return False
+
+        # Edits of single values still waiting for the next frame are refreshed first, the views refresh once after.
+        self._applyQueuedEdits()
+
+        try:
+            record = applyBulkEdit(self._bulkTargets(scope), edit, len(self.imageGrid))
+        except ValueError as e:
+            self.createErrorPopup(str(e))
+            return False
+
+        if not record.frames:
+            self.ui.statusBar.showMessage("No frames were changed.", 5000)
+            return False
+
+        self.bulkUndo.append(record)
+        self.ui.actionUndo_Bulk_Edit.setEnabled(True)
+        self._refreshAfterBulkEdit(record, notify=True)
+        self.ui.statusBar.showMessage(f"Changed {len(record.frames)} frames: {record.description}.", 5000)
+        return True
+
+    def undoBulkEdit(self):
+        if not self.bulkUndo:
+            return
+
+        self._applyQueuedEdits()
+        record = self.bulkUndo.pop()
+        record.undo()
+        self.ui.actionUndo_Bulk_Edit.setEnabled(bool(self.bulkUndo))
+        self._refreshAfterBulkEdit(record)
+        self.ui.statusBar.showMessage(f"Undid {record.description}.", 5000)
+
+    def _dropBulkUndo(self, group: AnimGroup):
+        """Called by every edit of the group that isn't a bulk edit, see dropTouching."""
+        if dropTouching(self.bulkUndo, group):
+            self.ui.actionUndo_Bulk_Edit.setEnabled(bool(self.bulkUndo))
+
+    def _refreshAfterBulkEdit(self, record: BulkEditRecord, notify: bool = False):
+        # An undo can come after the action was deleted, its frames aren't indexed anymore.
+        live = {id(group) for group in self.groups}
+        frameIndexes = set()
+        for group, direction in record.sequences:
+            if id(group) in live:
+                frameIndexes |= self.frameUsage.updateSequence(group, direction)
+        self._updateFrameUsage(frameIndexes)
+
+        # Undo restores the modified flags, only a new edit marks actions as modified.
+        if notify:
+            for group, _, _ in record.groups:
+                self._notifyChanges(group)
+
+        for item in self._getActionListItems():
+            item.updateText()
+
+        if self.currentAnimGroup:
+            for item in self._getFrameListItems():
+                item.updateText()
+
+        self._updateFilmstrip()
+
+        if self.currentAnimFrame:
+            self.setAnimFrameValues(self.currentAnimFrame)
+
+        if not self.animating:
+            self.setAnimation()
+
     def saveTrim(self):
         self.settings.setValue('trim', self.ui.actionTrim_Copies.isChecked())
 
     def saveCollapse(self):
         self.settings.setValue('collapse', self.ui.actionCollapse_Singles.isChecked())
 
+    def saveStreaming(self):
+        self.settings.setValue('streamExport', self.ui.actionStreaming_Export.isChecked())
+
+    def setCompressionProfile(self, key: str):
+        self.compressionProfile = key
+        self.settings.setValue('compressionProfile', key)
+
+    def libraryDatabase(self, directory: str) -> str:
+        """Library a collection was indexed into with 'cli.py index', or else the one in the cache directory. The
+        editor never writes into a collection on its own, the cached library holds any number of them."""
+        library = findLibrary(directory)
+        if library:
+            return library
+
+        cacheDir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation),
+                                'MDFrameEditor')
+        os.makedirs(cacheDir, exist_ok=True)
+        return os.path.join(cacheDir, LIBRARY_NAME)
+
+    def _createSheetWriter(self) -> SheetWriter:
+        return SheetWriter(self.ui.actionIndexed_PNG.isChecked(), COMPRESSION_PROFILES[self.compressionProfile])
+
+    def benchmarkCompression(self):
+        """Encode the loaded sheets with every compression profile and show how long it took and how big they are."""
+        if not self.sheetBuffer:
+            self.ui.statusBar.showMessage("Load a sheet to benchmark.", 5000)
+            return
+
+        images = [buffer.toPIL() for buffer in (self.sheetBuffer, self.actionPtBuffer) if buffer]
+
+        self.ui.statusBar.showMessage("Benchmarking... this may take a moment.", 5000)
+        self.app.processEvents()
+
+        results = benchmarkProfiles(images, self.ui.actionIndexed_PNG.isChecked())
+
+        dialog = QtWidgets.QMessageBox(self.window)
+        dialog.setWindowTitle("Compression Benchmark")
+        dialog.setIcon(QtWidgets.QMessageBox.Icon.Information)
+        dialog.setText(f"<pre>{formatBenchmark(results)}</pre>")
+        dialog.exec()
+
+    def setExportMemoryLimit(self):
+        value, ok = QInputDialog.getInt(self.window, 'Export Memory Limit',
+                                        'Maximum memory used by a multi-sheet export in MB. 0 for no limit.',
+                                        self.exportMemoryLimit, 0, 1024 * 1024)
+        if ok:
+            self.exportMemoryLimit = value
+            self.settings.setValue('exportMemoryLimit', value)
+
+    def setDuplicateTolerance(self):
+        maxPixels, ok = QInputDialog.getInt(self.window, 'Near-Duplicate Tolerance',
+                                            'When importing multi-sheets, merge frames that differ in at most this '
+                                            'many pixels. 0 to only merge identical frames.',
+                                            self.duplicateTolerance.maxPixels, 0, 1024 * 1024)
+        if not ok:
+            return
+
+        maxDelta, ok = QInputDialog.getInt(self.window, 'Near-Duplicate Tolerance',
+                                           'Color difference per channel still counted as the same pixel.',
+                                           self.duplicateTolerance.maxDelta, 0, 255)
+        if not ok:
+            return
+
+        self.duplicateTolerance = DuplicateTolerance(maxPixels, maxDelta)
+        self.settings.setValue('nearDuplicatePixels', maxPixels)
+        self.settings.setValue('nearDuplicateDelta', maxDelta)
+
+    def _confirmNearDuplicates(self, merges: List[str]) -> bool:
+        """Preview merges of frames that aren't identical before applying them."""
+        dialog = QtWidgets.QMessageBox(self.window)
+        dialog.setWindowTitle("Near-Duplicate Frames")
+        dialog.setIcon(QtWidgets.QMessageBox.Icon.Question)
+        dialog.setText(f"{len(merges)} frames are close enough to another frame to be merged. Merge them?")
+        dialog.setDetailedText("\n".join(merges))
+        dialog.setStandardButtons(QtWidgets.QMessageBox.StandardButton.Yes | QtWidgets.QMessageBox.StandardButton.No)
+        return dialog.exec() == QtWidgets.QMessageBox.StandardButton.Yes
+
+    def optimizeSheet(self):
+        """Remove unused frames and merge duplicate and mirrored frames of the loaded sheet, then save and reload it."""
+        if not self.singleLoaded:
+            self.ui.statusBar.showMessage("Optimizing only works on a loaded single sheet.", 5000)
+            return
+
+        result = QtWidgets.QMessageBox.question(self.window, 'Optimize Sheet',
+                                                "This rewrites Anim.png, Offsets.png and the frame data, including "
+                                                "any unsaved changes. Continue?")
+        if result != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+
+        dirName = os.path.dirname(self.fileName)
+        sizeBefore = sum(os.path.getsize(os.path.join(dirName, name)) for name in ("Anim.png", "Offsets.png")
+                         if os.path.exists(os.path.join(dirName, name)))
+
+        try:
+            optimized = optimizeSheet(self.groups, self.sheetBuffer, self.actionPtBuffer, self.frameWidth,
+                                      self.frameHeight)
+        except SheetError as e:
+            self.createErrorPopup(str(e))
+            return
+
+        writer = self._createSheetWriter()
+        writer.save(optimized.sheet.toPIL(), os.path.join(dirName, "Anim.png"))
+        if optimized.actionPts:
+            writer.save(optimized.actionPts.toPIL(), os.path.join(dirName, "Offsets.png"))
+
+        self._saveFrameData()
+
+        sizeAfter = sum(os.path.getsize(path) for path, _ in writer.report)
+
+        self.loadSheet(self.fileName)
+
+        self._showWriteReport(f"{optimized.summary()} Pixels {formatBytes(optimized.bytesBefore)} -> "
+                              f"{formatBytes(optimized.bytesAfter)}, files {formatBytes(sizeBefore)} -> "
+                              f"{formatBytes(sizeAfter)}.", writer)
+
+    def mirrorDirections(self):
+        """Find right facing directions that mirror the left facing ones and offer to reference the flipped frames."""
+        if not self.sheetBuffer:
+            self.ui.statusBar.showMessage("Load a sheet to find mirrored directions.", 5000)
+            return
+
+        mirrors = findMirroredDirections(self.groups, self.sheetBuffer, self.actionPtBuffer, self.frameWidth,
+                                         self.frameHeight)
+        if not mirrors:
+            self.ui.statusBar.showMessage("No mirrored directions found.", 5000)
+            return
+
+        report = "\n".join(str(mirror) for mirror in mirrors)
+        result = QtWidgets.QMessageBox.question(self.window, 'Mirror Directions',
+                                                f"{report}\n\nRewrite these directions as flipped references to "
+                                                f"the frames they mirror?")
+        if result != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+
+        for mirror in mirrors:
+            self._dropBulkUndo(mirror.group)
+        applyMirroredDirections(mirrors)
+
+        self._rebuildFrameUsage()
+
+        for item in self._getActionListItems():
+            item.updateText()
+
+        for item in self._getFrameListItems():
+            item.updateText()
+
+        if self.currentAnimFrame and not self.animating:
+            self.setAnimFrameValues(self.currentAnimFrame)
+            self.setAnimation()
+
+        self.ui.statusBar.showMessage(f"Rewrote {len(mirrors)} directions. Optimize Sheet drops the frames no "
+                                      f"longer used.", 10000)
+
     def defaultFrameClick(self):
         if self.currentSequence:
             item: AnimFrameItem = self.ui.animationFrameList.currentItem()
@@ -657,6 +1225,8 @@ class AnimationEditor:
 
                 item.updateText()
 
+                self._sequenceEdited()
+
                 if not self.animating:
                     self.setAnimFrameValues(selectedAnimFrame)
 
@@ -673,27 +1243,14 @@ class AnimationEditor:
 
             self._saveFrameData(fileName)
 
+    @traced("save")
     def _saveFrameData(self, fileName=None):
         collapse = self.ui.actionCollapse_Singles.isChecked()
-        existingRoot = self.loadedTree.getroot()
-
-        root = ElementTree.Element("AnimData")
-
-        ElementTree.SubElement(root, "FrameWidth").text = str(self.frameWidth)
-        ElementTree.SubElement(root, "FrameHeight").text = str(self.frameHeight)
-        ElementTree.SubElement(root, "ShadowSize").text = str(self.shadowSize)
-
-        animsEl = ElementTree.SubElement(root, "Anims")
-
         trim = self.ui.actionTrim_Copies.isChecked()
 
-        for groupAnim in self.groups:
-            animEl = ElementTree.SubElement(animsEl, "Anim")
-            if self.createBaseAnimGroupXML(animEl, groupAnim.name, groupAnim.idx, groupAnim, trim=trim,
-                                           copyName=groupAnim.copyName):
-                self.createSingleSheetFrameData(animEl, groupAnim, collapse)
-
-        ElementTree.indent(root)
+        with span("save.build xml"):
+            root, elidedFrames = createFrameDataXML(self.groups, self.frameWidth, self.frameHeight, self.shadowSize,
+                                                    trim, collapse)
 
         if not fileName:
             # Use loaded file name
@@ -704,130 +1261,46 @@ class AnimationEditor:
                 item.animGroup.modified = False
                 item.updateText()
 
-        tree = ElementTree.ElementTree(root)
-        tree.write(fileName, encoding='utf-8', xml_declaration=True)
-
-    def isSequenceCollapsable(self, animGroup: AnimGroup):
-        ct = 0
-        first = animGroup.directions[0].frames
-        for direction in animGroup.directions:
-            if direction.frames == first:
-                ct += 1
+        with span("save.write xml"):
+            writeXML(root, fileName)
 
-        if ct == 8:
-            # All 8 frames are the same.
-            return True
+        if elidedFrames:
+            self.ui.statusBar.showMessage(f"Saved. {elidedFrames} frames written as copies of identical actions.", 5000)
 
-        return False
+    def isSequenceCollapsable(self, animGroup: AnimGroup):
+        return isSequenceCollapsable(animGroup)
 
     def createBaseAnimGroupXML(self, animEl: ElementTree.Element, name: str, index: int, group: AnimGroup,
                                trim=False, copyName="", size=None) -> bool:
-        ElementTree.SubElement(animEl, "Name").text = name
-
-        if index != -1:
-            ElementTree.SubElement(animEl, "Index").text = str(index)
-
-        if trim:
-            if copyName:
-                ElementTree.SubElement(animEl, "CopyOf").text = str(copyName)
-                return False
-
-        if size:
-            ElementTree.SubElement(animEl, "FrameWidth").text = str(size[0])
-            ElementTree.SubElement(animEl, "FrameHeight").text = str(size[1])
-
-        if group.rushFrame != -1:
-            ElementTree.SubElement(animEl, "RushFrame").text = str(group.rushFrame)
-
-        if group.hitFrame != -1:
-            ElementTree.SubElement(animEl, "HitFrame").text = str(group.hitFrame)
-
-        if group.returnFrame != -1:
-            ElementTree.SubElement(animEl, "ReturnFrame").text = str(group.returnFrame)
-
-        return True
+        return createBaseAnimGroupXML(animEl, name, index, group, trim, copyName, size)
 
     def createSingleSheetFrameData(self, animEl: ElementTree.Element, group: AnimGroup, collapse):
-        sequencesEle = ElementTree.SubElement(animEl, "Sequences")
-
-        isCollapsable = False
-        if collapse:
-            isCollapsable = self.isSequenceCollapsable(group)
-
-        for sequence in group.directions:
-            seqEle = ElementTree.SubElement(sequencesEle, "AnimSequence")
+        return createSingleSheetFrameData(animEl, group, collapse)
 
-            for frame in sequence.frames:
-                frameEle = ElementTree.SubElement(seqEle, "AnimFrame")
-
-                ElementTree.SubElement(frameEle, "FrameIndex").text = str(frame.frameIndex)
-                ElementTree.SubElement(frameEle, "Duration").text = str(frame.duration)
-                ElementTree.SubElement(frameEle, "HFlip").text = str(int(frame.flip))
-                spriteOff = ElementTree.SubElement(frameEle, "Sprite")
-                ElementTree.SubElement(spriteOff, "XOffset").text = str(frame.spriteOffset.x)
-                ElementTree.SubElement(spriteOff, "YOffset").text = str(frame.spriteOffset.y)
-                shadowOff = ElementTree.SubElement(frameEle, "Shadow")
-                ElementTree.SubElement(shadowOff, "XOffset").text = str(frame.shadowOffset.x)
-                ElementTree.SubElement(shadowOff, "YOffset").text = str(frame.shadowOffset.y)
-
-            # Stop after writing a frame if we are collapsing it.
-            if isCollapsable:
-                break
-
-        return True
+    def _showWriteReport(self, text: str, writer: SheetWriter):
+        """Tell the files were written, with how each was encoded in the details."""
+        dialog = QtWidgets.QMessageBox(self.window)
+        dialog.setWindowTitle("Complete")
+        dialog.setIcon(QtWidgets.QMessageBox.Icon.Information)
+        dialog.setText(f"{text} {writer.summary()}.")
+        dialog.setDetailedText(writer.details())
+        dialog.exec()
 
     def createErrorPopup(self, text: str):
         return QtWidgets.QMessageBox.critical(self.window, 'Error', text, QtWidgets.QMessageBox.StandardButton.Ok)
 
     def _getFrameUniformity(self, group: AnimGroup) -> Union[Set[Tuple], Literal[False]]:
-        uniformDurations: Set[Tuple] = set()
-        for sequence in group.directions:
-            durations = tuple([frame.duration for frame in sequence.frames])
-            if not durations:  # Ignore empty sequences?
-                continue
-
-            uniformDurations.add(durations)
-
-            if len(uniformDurations) > 1:
-                # Check if frame count differs between directions.
-                firstLength = len(next(iter(uniformDurations), ()))
-                for t in uniformDurations:
-                    if len(t) != firstLength:
-                        sFrameCount = ""
-                        for idx, subseq in enumerate(group.directions):
-                            sFrameCount += f"{FD_STR[idx]}: {len(subseq.frames)} Frames\n"
-                        self.createErrorPopup(
-                            f"Could not save AnimData.xml. All directions for animation {group.name} must all be the "
-                            f"same number of frames.\n{sFrameCount}")
-                        return False
-
-                sDurations = ""
-                for idx, sequence2 in enumerate(group.directions):
-                    frameDurations = [fr.duration for fr in sequence2.frames]
-                    sDurations += f"{FD_STR[idx]}: {tuple(frameDurations)} - Total: ({sum(frameDurations)})\n"
-
-                # If frame counts are fine, then the durations are messed up.
-                self.createErrorPopup(
-                    f"Could not save AnimData.xml. Duration values for {group.name} must match for all directions for "
-                    f"each frame.\n{sDurations}")
-                return False
-
-        return uniformDurations
+        try:
+            return getFrameUniformity(group)
+        except SheetError as e:
+            self.createErrorPopup(str(e))
+            return False
 
     def createMultiSheetFrameData(self, animEl: ElementTree.Element, group: AnimGroup):
-        """This essentially just includes the durations of each frame. Limited in that durations are set for the whole
-        animation regardless of direction."""
-        uniformDurations = self._getFrameUniformity(group)
-        if not uniformDurations:
+        if self._getFrameUniformity(group) is False:
             return False
 
-        durationEle = ElementTree.SubElement(animEl, "Durations")
-
-        for durations in uniformDurations:
-            for value in durations:
-                ElementTree.SubElement(durationEle, "Duration").text = str(value)
-
-        return True
+        return createMultiSheetFrameData(animEl, group)
 
     def frameIndexChanged(self):
         item: AnimFrameItem = self.ui.animationFrameList.currentItem()
@@ -840,12 +1313,7 @@ class AnimationEditor:
 
                 item.updateText()
 
-                self._notifyChanges()
-
-                if not self.animating:
-                    self.openGLWidget.makeCurrent()
-
-                    self._setAnimFrameDisplay(item.animFrame)
+                self._queueSequenceEdit()
 
     def _moveFrame(self, rowDir: int):
         currentPos = self.ui.animationFrameList.currentRow()
@@ -868,6 +1336,8 @@ class AnimationEditor:
             newPos], self.currentSequence.frames[currentPos]
         newItem.animFrame.idx, swapItem.animFrame.idx = swapItem.animFrame.idx, newItem.animFrame.idx
 
+        self._sequenceEdited()
+
         self.clearCopyGroup()
 
         self.ui.frameSlider.setValue(item.animFrame.idx)
@@ -887,6 +1357,7 @@ class AnimationEditor:
                 self.currentAnimGroup.directions[self.currentDirection] = self.copiedSequence
                 self.currentAnimFrame = self.copiedSequence.frames[0]
                 self.copiedSequence = None
+                self._sequenceEdited()
                 self.setSequenceList()
                 self.ui.animationFrameList.setCurrentRow(0)
                 self.setAnimFrameValues(self.currentAnimFrame)
@@ -943,6 +1414,10 @@ class AnimationEditor:
                 taken = self.ui.actionListWidget.takeItem(row)
                 del taken
 
+                # Deleted actions are not saved, and their frames no longer count as used.
+                self.groups[:] = [group for group in self.groups if group is not current.animGroup]
+                self._updateFrameUsage(self.frameUsage.removeGroup(current.animGroup))
+
                 pyglet.clock.unschedule(self._playingAnimation)
                 self.animating = False
                 self.currentAnimFrame = None
@@ -996,6 +1471,8 @@ class AnimationEditor:
                 existingGroup.hitFrame = selectedGroup.hitFrame
                 existingGroup.returnFrame = selectedGroup.returnFrame
                 existingGroup.directions = copy.deepcopy(selectedGroup.directions)
+                self._dropBulkUndo(existingGroup)
+                self._updateFrameUsage(self.frameUsage.updateGroup(existingGroup))
 
                 for item in self._getActionListItems():
                     if item.animGroup.name.lower() == name.lower():
@@ -1011,6 +1488,7 @@ class AnimationEditor:
                                   selectedGroup.returnFrame, copy.deepcopy(selectedGroup.directions))
                 group.copyName = selectedGroup.name
                 self.groups.append(group)
+                self._updateFrameUsage(self.frameUsage.updateGroup(group))
                 item = AnimGroupItem(group, self)
                 self.ui.actionListWidget.addItem(item)
 
@@ -1051,24 +1529,29 @@ class AnimationEditor:
             item = AnimGroupItem(group, self)
             self.ui.actionListWidget.addItem(item)
 
-    def _notifyChanges(self):
+    def _notifyChanges(self, animGroup: Optional[AnimGroup] = None):
         """Set action as changed if an action has been modified."""
-        if self.currentAnimGroup:
-            for sequences in self.currentAnimGroup.directions:
+        animGroup = animGroup or self.currentAnimGroup
+        if animGroup:
+            for sequences in animGroup.directions:
                 for frame in sequences.frames:
                     if frame.changed:
                         for item in self._getActionListItems():
-                            if item.animGroup == self.currentAnimGroup:
-                                if self.currentAnimGroup.modified is False:
-                                    self.currentAnimGroup.modified = True
+                            if item.animGroup is animGroup:
+                                if animGroup.modified is False:
+                                    animGroup.modified = True
                                     item.updateText()
                                 return
 
     def changeAnimationSpeed(self):
         newSpeed = self.animationSpeedSliderValues[self.ui.animationSpeedSlider.value()]
 
+        tick = self._playbackTick()
         self.animSpeed = (1 / 60.0) / newSpeed
 
+        if self.animating:
+            self.seekPlayback(tick)
+
         self.ui.animationSpeedLabel.setText(f"{newSpeed}x")
 
     def durationChanged(self):
@@ -1077,11 +1560,12 @@ class AnimationEditor:
             if item:
                 animFrame = item.animFrame
                 value = self.ui.durationSpinBox.value()
-                animFrame.duration = value
+                if animFrame.duration != value:
+                    animFrame.duration = value
 
-                self.clearCopyGroup()
+                    self.clearCopyGroup()
 
-                self._notifyChanges()
+                    self._queueSequenceEdit(redraw=False)
 
     def flipChanged(self):
         if self.currentSequence:
@@ -1094,10 +1578,7 @@ class AnimationEditor:
 
                     self.clearCopyGroup()
 
-                    if not self.animating:
-                        self.setAnimation()
-
-                    self._notifyChanges()
+                    self._queueSequenceEdit()
 
     def spriteOffsetChanged(self):
         if self.currentSequence:
@@ -1114,10 +1595,7 @@ class AnimationEditor:
 
                     self.clearCopyGroup()
 
-                    if not self.animating:
-                        self.setAnimation()
-
-                    self._notifyChanges()
+                    self._queueSequenceEdit()
 
     def shadowOffsetChanged(self):
         if self.currentSequence:
@@ -1134,10 +1612,7 @@ class AnimationEditor:
 
                     self.clearCopyGroup()
 
-                    if not self.animating:
-                        self.setAnimation()
-
-                    self._notifyChanges()
+                    self._queueSequenceEdit()
 
     def duplicateFrame(self):
         """Duplicate the selected frame in the Animation Sequence List"""
@@ -1158,16 +1633,20 @@ class AnimationEditor:
                 self._addAnimFrame(animFrame)
 
     def deleteSelectedFrames(self):
-        """Delete the selected frame in the Animation Sequence List"""
+        """Delete the selected frames in the Animation Sequence List"""
         if self.currentSequence:
-            item: AnimFrameItem = self.ui.animationFrameList.currentItem()
-            if item:
-                for frame in list(self.currentSequence.frames):
-                    if frame == item.animFrame:
-                        self.currentSequence.frames.remove(frame)
+            items: List[AnimFrameItem] = self.ui.animationFrameList.selectedItems()
+            if items:
+                # By identity, frames with the same values compare equal.
+                selected = {id(item.animFrame) for item in items}
+                self.currentSequence.frames[:] = [frame for frame in self.currentSequence.frames
+                                                  if id(frame) not in selected]
 
-                self.ui.animationFrameList.takeItem(self.ui.animationFrameList.row(item))
-                del item
+                for item in items:
+                    self.ui.animationFrameList.takeItem(self.ui.animationFrameList.row(item))
+                del items
+
+                self._sequenceEdited()
 
                 self.clearCopyGroup()
 
@@ -1178,13 +1657,18 @@ class AnimationEditor:
                 self._updateAnimFrameWidgets()
 
     def sliderChange(self):
-        if not self.animating:
-            if self.currentSequence:
-                if self.currentSequence.frames:
-                    self.ui.animationFrameList.setCurrentRow(self.ui.frameSlider.value())
-                    self.currentAnimFrame = self.currentSequence.frames[self.ui.frameSlider.value()]
-                    self.setAnimFrameValues(self.currentAnimFrame)
-                    self.setAnimation()
+        if self.animating:
+            # Dragged by hand rather than moved by playback.
+            if self.currentSequence and self.ui.frameSlider.value() != self.playbackPosition:
+                self.seekPlayback(self.currentSequence.timeline.start(self.ui.frameSlider.value()))
+            return
+
+        if self.currentSequence:
+            if self.currentSequence.frames:
+                self.ui.animationFrameList.setCurrentRow(self.ui.frameSlider.value())
+                self.currentAnimFrame = self.currentSequence.frames[self.ui.frameSlider.value()]
+                self.setAnimFrameValues(self.currentAnimFrame)
+                self.setAnimation()
 
     def setDirection(self, direction):
         if direction == self.currentDirection:
@@ -1219,6 +1703,7 @@ class AnimationEditor:
         self.currentAnimFrame = None
 
         self.ui.animationFrameList.clear()
+        self.ui.filmstrip.setFrames([])
 
         self.ui.frameIndexSpinBox.blockSignals(True)
         self.ui.frameIndexSpinBox.setValue(0)
@@ -1255,8 +1740,23 @@ class AnimationEditor:
             item = AnimFrameItem(animFrame, self)
             self.ui.animationFrameList.addItem(item)
 
+        self._updateFilmstrip()
         self._updateAnimFrameWidgets()
 
+    def _updateFilmstrip(self):
+        frames = self.currentSequence.frames if self.currentSequence else []
+        self.ui.filmstrip.setFrames([(frame.frameIndex, bool(frame.flip), frame.duration) for frame in frames])
+        self.ui.filmstrip.setCurrent(self.ui.frameSlider.value())
+
+    def _frameQImage(self, frameIndex: int) -> Optional[QImage]:
+        """View of a frame in the sheet buffer."""
+        if self.imageGrid is None or not 0 <= frameIndex < len(self.imageGrid):
+            return None
+
+        width, height = self.imageGrid.item_width, self.imageGrid.item_height
+        column, row = frameIndex % self.imageGrid.columns, frameIndex // self.imageGrid.columns
+        return self.sheetBuffer.toQImage(column * width, row * height, width, height)
+
     def _updateAnimFrameWidgets(self):
         self.ui.frameSlider.setMaximum(max(0, len(self.currentSequence.frames) - 1))
         self.ui.frameSlider.setValue(0)
@@ -1310,30 +1810,40 @@ class AnimationEditor:
             else:
                 self.loadSheet(fileName)
 
+    @traced("load")
     def loadSheet(self, fileName):
         dirName = os.path.dirname(fileName)
 
-        try:
-            sheetImage = pyglet.image.load(f"{dirName}/Anim.png")
-        except FileNotFoundError:
-            self.ui.statusBar.showMessage("Failed to find Anim.png.", 5000)
-            return
+        resetCopyStats()
 
-        try:
-            actionPtImage = pyglet.image.load(f"{dirName}/Offsets.png")
-        except FileNotFoundError:
-            actionPtImage = None
-            self.ui.statusBar.showMessage("Failed to find Offsets file... skipping.", 5000)
+        with span("load.decode"):
+            try:
+                sheetBuffer = PixelBuffer.load(f"{dirName}/Anim.png")
+            except FileNotFoundError:
+                self.ui.statusBar.showMessage("Failed to find Anim.png.", 5000)
+                return
+
+            try:
+                actionPtBuffer = PixelBuffer.load(f"{dirName}/Offsets.png")
+            except FileNotFoundError:
+                actionPtBuffer = None
+                self.ui.statusBar.showMessage("Failed to find Offsets file... skipping.", 5000)
 
         self.clear()
 
         self.singleLoaded = True
 
-        self.sheetImage = sheetImage  # Do this after clear. Try block above so we don't clear loaded if fail loading.
-        self.actionPtImage = actionPtImage
+        # Do this after clear. Try block above so we don't clear loaded if fail loading.
+        self.sheetBuffer = sheetBuffer
+        self.actionPtBuffer = actionPtBuffer
+        with span("load.texture upload"):
+            self.sheetImage = sheetBuffer.toImageData()
+            self.actionPtImage = actionPtBuffer.toImageData() if actionPtBuffer else None
 
         self._parse(fileName)
 
+        log.debug("Load copies: %s", copyReport())
+
         if self.batchAddImplem:
             self.batchAddImplem.loadedFrameData()
 
@@ -1352,20 +1862,65 @@ class AnimationEditor:
     def _addAnimFrame(self, animFrame: AnimFrame):
         self.currentSequence.frames.append(animFrame)
 
+        self._sequenceEdited()
+
         item = AnimFrameItem(animFrame, self)
         self.ui.animationFrameList.addItem(item)
 
         self._updateAnimFrameWidgets()
 
-    @staticmethod
-    def adjustOffset(rushFrame: int, frameNum: int, rushOffset: Offset, frameOffset: Offset):
-        """Calculation to truncate rush frames."""
-        if frameNum > rushFrame:
-            diff = frameOffset - rushOffset
+    def _rebuildFrameUsage(self):
+        self.frameUsage = FrameUsageIndex(self.groups)
+        self._updateFrameUsage(self.loadedSheetItems.keys())
 
-            final = rushOffset + (diff // 3)
-            return final
+    def _updateFrameUsage(self, frameIndexes):
+        for idx in frameIndexes:
+            item = self.loadedSheetItems.get(idx)
+            if item:
+                item.updateUsage(self.frameUsage.uses(idx))
 
+    def _sequenceEdited(self):
+        """Refresh what is derived from the current sequence after its frames were edited."""
+        if self.currentAnimGroup:
+            self.currentAnimGroup.directions[self.currentDirection].invalidate()
+            self._dropBulkUndo(self.currentAnimGroup)
+            self._updateFrameUsage(self.frameUsage.updateSequence(self.currentAnimGroup, self.currentDirection))
+            self._updateFilmstrip()
+
+    def _queueSequenceEdit(self, redraw: bool = True):
+        """Like _sequenceEdited for edits of single values, which spinboxes send many of while held or dragged. The
+        caches of the sequence are cleared right away, so saving and playback see the edit, the rest is applied once
+        for all edits before the preview renders its next frame."""
+        if not self.currentAnimGroup:
+            return
+
+        self.currentAnimGroup.directions[self.currentDirection].invalidate()
+        self._dropBulkUndo(self.currentAnimGroup)
+
+        # Keyed by identity, groups compare by value. Applies to the right sequence even if another was opened since.
+        self.pendingEdits[id(self.currentAnimGroup), self.currentDirection] = (self.currentAnimGroup,
+                                                                              self.currentDirection)
+        self.pendingRedraw = self.pendingRedraw or redraw
+
+        if not self.editsScheduled:
+            self.editsScheduled = True
+            pyglet.clock.schedule_once(self._applyQueuedEdits, 0)
+
+    def _applyQueuedEdits(self, dt=0):
+        edits, self.pendingEdits = self.pendingEdits, {}
+        redraw, self.pendingRedraw = self.pendingRedraw, False
+        self.editsScheduled = False
+
+        for animGroup, direction in edits.values():
+            self._updateFrameUsage(self.frameUsage.updateSequence(animGroup, direction))
+            self._notifyChanges(animGroup)
+
+        self._updateFilmstrip()
+
+        if redraw and not self.animating:
+            self.setAnimation()
+
+    @traced("thumbnails")
     def _addFramesFromGrid(self):
         self.ui.frameIndexSpinBox.setMaximum(len(self.imageGrid) - 1)
 
@@ -1376,12 +1931,19 @@ class AnimationEditor:
             if self.actionPoints:
                 if idx not in self.actionPoints:
                     continue
-            item = LoadedSheetFrame(f"Frame {idx}", idx, image, self.ui.sheetFramePicture, self)
+
+            column, row = idx % self.imageGrid.columns, idx // self.imageGrid.columns
+            qimage = self.sheetBuffer.toQImage(column * image.width, row * image.height, image.width, image.height)
+
+            item = LoadedSheetFrame(f"Frame {idx}", idx, qimage, self.ui.sheetFramePicture, self)
             self.ui.loadedSheetFrameList.addItem(item)
+            self.loadedSheetItems[idx] = item
 
+    @traced("load.parse")
     def _parse(self, fileName):
         try:
-            self.loadedTree = ElementTree.parse(fileName)
+            with span("load.parse xml"):
+                self.loadedTree = ElementTree.parse(fileName)
         except ElementTree.ParseError:
             self.ui.statusBar.showMessage("Failed to parse animations XML data.", 5000)
             return
@@ -1389,11 +1951,9 @@ class AnimationEditor:
         root = self.loadedTree.getroot()
 
         try:
-            width = int(root.find("FrameWidth").text)
-            height = int(root.find("FrameHeight").text)
-            shadowSize = int(root.find("ShadowSize").text)
-        except AttributeError:
-            self.ui.statusBar.showMessage("Unable to determine dimensions of XML data.", 5000)
+            width, height, shadowSize = parseFrameDimensions(root)
+        except SheetError as e:
+            self.ui.statusBar.showMessage(str(e), 5000)
             return
 
         if self.sheetImage.width % width != 0 or self.sheetImage.height % height != 0:
@@ -1424,150 +1984,41 @@ class AnimationEditor:
                                           rows=self.sheetImage.height // height,
                                           columns=self.sheetImage.width // width)
 
-            actionCenter = self.actionGrid[0].width // 2, self.actionGrid[0].height // 2
-            for idx, actImg in enumerate(self.actionGrid):
-                actImg: pyglet.image.ImageDataRegion
-                actionPointLoc = getActionPointsFromImage(actImg)
+            with span("load.action points"):
+                actionCenter = self.actionGrid[0].width // 2, self.actionGrid[0].height // 2
+                for idx, actImg in enumerate(self.actionGrid):
+                    actImg: pyglet.image.ImageDataRegion
+                    actionPointLoc = getActionPointsFromImage(actImg)
 
-                if actionPointLoc[0] and actionPointLoc[1] and actionPointLoc[2]:
-                    center = actionPointLoc[1]
-                    head = center
-                    if actionPointLoc[3]:
-                        head = actionPointLoc[3]
+                    if actionPointLoc[0] and actionPointLoc[1] and actionPointLoc[2]:
+                        center = actionPointLoc[1]
+                        head = center
+                        if actionPointLoc[3]:
+                            head = actionPointLoc[3]
 
-                    leftHand = actionPointLoc[0]
-                    rightHand = actionPointLoc[2]
+                        leftHand = actionPointLoc[0]
+                        rightHand = actionPointLoc[2]
 
-                    self.actionPoints[idx] = ActionPoints(leftHand, center, rightHand, head)
+                        self.actionPoints[idx] = ActionPoints(leftHand, center, rightHand, head)
 
-                    # Position relative to 0, 0.
-                    self.actionPoints[idx].add(Offset(-actionCenter[0], -actionCenter[1]))
+                        # Position relative to 0, 0.
+                        self.actionPoints[idx].add(Offset(-actionCenter[0], -actionCenter[1]))
 
 
-                else:
-                    self.actionGrid = None
-                    break
+                    else:
+                        self.actionGrid = None
+                        break
 
         self._addFramesFromGrid()
 
-        self.groups = []
-        copies = []
-        copyGroups = []
-        for actionAnim in anims:
-            actionIdx = -1
-            rushFrame = -1
-            hitFrame = -1
-            returnFrame = -1
-            sequences = []
-            copyName = ''
-            for actionElement in actionAnim:
-                if actionElement.tag == "Name":
-                    name = actionElement.text
-                elif actionElement.tag == "Index":
-                    actionIdx = int(actionElement.text)
-                elif actionElement.tag == "CopyOf":
-                    copyName = actionElement.text
-                elif actionElement.tag == "RushFrame":
-                    rushFrame = int(actionElement.text)
-                elif actionElement.tag == "HitFrame":
-                    hitFrame = int(actionElement.text)
-                elif actionElement.tag == "ReturnFrame":
-                    returnFrame = int(actionElement.text)
-                elif actionElement.tag == "Sequences":
-                    sequences = []
-                    for sequenceElement in actionElement:
-                        frameSeqIdx = 0
-                        frames = []
-                        for animSequences in sequenceElement:
-                            for frame in animSequences:
-                                if frame.tag == "FrameIndex":
-                                    frameIndex = int(frame.text)
-
-                                elif frame.tag == "Sprite":
-                                    spriteOffset = Offset(*[int(offset.text) for offset in frame])
-
-                                elif frame.tag == "Shadow":
-                                    shadowOffset = Offset(*[int(offset.text) for offset in frame])
-
-                                elif frame.tag == "HFlip":
-                                    try:
-                                        hflip = int(frame.text)
-                                    except ValueError:
-                                        hflip = int(bool(frame.text))
-
-                                elif frame.tag == "Duration":
-                                    duration = int(frame.text)
-
-                            frames.append(
-                                AnimFrame(frameSeqIdx, frameIndex, hflip, duration, shadowOffset, spriteOffset))
-                            frameSeqIdx += 1
-
-                            if REDUCE_RUSH_FRAMES:
-                                if rushFrame > -1:
-                                    frame2 = frameSeqIdx - 1
-                                    # print(frame2, rushFrame, name, frames)
-                                    if frame2 > rushFrame:
-                                        # print("NAME", name)
-                                        # print("FRAME!", name, self.adjustOffset(rushFrame, frame2, 
-                                        # frames[rushFrame].spriteOffset, spriteOffset))
-
-                                        frames[frame2].spriteOffset = self.adjustOffset(rushFrame, frame2,
-                                                                                        frames[rushFrame].spriteOffset,
-                                                                                        spriteOffset)
-                                        frames[frame2].shadowOffset = self.adjustOffset(rushFrame, frame2,
-                                                                                        frames[rushFrame].shadowOffset,
-                                                                                        shadowOffset)
-
-                        sequence = AnimationSequence(frames)
-                        sequences.append(sequence)
-
-            if copyName:
-                group = AnimGroup(actionIdx, name, copyName=copyName)
-                copyGroups.append(group)
-            else:
-                if len(sequences) == 1:
-                    print(f"Warning: {name} only has 1 sequence. Duplicating for all directions.")
-                    for i in range(7):
-                        newSequence = copy.deepcopy(sequences[0])
-                        sequences.append(newSequence)
-
-                elif len(sequences) == 0:
-                    print(f"Warning: {name} no sequences found. Generating empty sequences.")
-                    for i in range(8):
-                        sequences.append(AnimationSequence())
-
-                group = AnimGroup(actionIdx, name, rushFrame, hitFrame, returnFrame, sequences)
-            group.width = width
-            group.height = height
-            self.groups.append(group)
-            item = AnimGroupItem(group, self)
-            self.ui.actionListWidget.addItem(item)
-
-        # Unfortunately copy actions can come before the action they need to copy? Check after we have parsed all 
-        # actions.
-        # Some copy actions don't even have action indexes... Indexes currently have no use.
-        for groups in copyGroups:
-            name, copyName = groups.name, groups.copyName
-            # Find copy group
-            found = False
-            for currentGroup in self.groups:
-                if currentGroup.name == copyName:
-                    found = currentGroup
-                    break
-
-            if found:
-                # Find destination group.
-                for currentGroup in self.groups:
-                    if currentGroup.name == name:
-                        group = copy.deepcopy(found)
-                        currentGroup.rushFrame = group.rushFrame
-                        currentGroup.hitFrame = group.hitFrame
-                        currentGroup.returnFrame = group.returnFrame
-                        currentGroup.directions = group.directions
+        with span("load.anim groups"):
+            self.groups = parseAnimGroups(anims, width, height)
+            for group in self.groups:
+                item = AnimGroupItem(group, self)
+                self.ui.actionListWidget.addItem(item)
 
-            else:
-                print(f"Copy {name} not found")
-                continue
+        with span("load.frame usage"):
+            self._rebuildFrameUsage()
 
         self.ui.statusBar.showMessage("Frame data and images loaded successfully.", 3000)
 
@@ -1584,12 +2035,24 @@ class AnimationEditor:
     def clear(self):
         """Clear everything so we can load a new sprite."""
         self.singleLoaded = None
+        self.sheetBuffer = None
         self.sheetImage = None
+        self.actionPtBuffer = None
         self.actionPtImage = None
         self.imageGrid: Optional[TopLeftGrid] = None
         self.actionGrid: Optional[TopLeftGrid] = None
+        self.uploadedTextures.clear()
         self.actionPoints.clear()
         self.groups.clear()
+        self.frameUsage = FrameUsageIndex()
+        self.loadedSheetItems.clear()
+
+        # Edits of the sheet being closed.
+        pyglet.clock.unschedule(self._applyQueuedEdits)
+        self.pendingEdits.clear()
+        self.pendingRedraw = self.editsScheduled = False
+        self.bulkUndo.clear()
+        self.ui.actionUndo_Bulk_Edit.setEnabled(False)
 
         pyglet.clock.unschedule(self._playingAnimation)
         self.animating = False
@@ -1605,15 +2068,25 @@ class AnimationEditor:
             self.sprite = None
             self.shadow = None
 
+        for sprite in self.compassSprites + self.compassShadows + self.onionSprites:
+            sprite.delete()
+        self.compassSprites.clear()
+        self.compassShadows.clear()
+        self.onionSprites.clear()
+
         self.ui.loadedSheetFrameList.clear()
         self.ui.animationFrameList.clear()
         self.ui.actionListWidget.clear()
 
         self.ui.sheetFramePicture.clear()
+        self.ui.filmstrip.clear()
 
     def getSpritePosition(self):
-        return ((self.openGLWidget.width() // 2) + (self.currentAnimFrame.spriteOffset.x * self.scale),
-                (self.openGLWidget.height() // 3) + (-self.currentAnimFrame.spriteOffset.y * self.scale), 0)
+        return self._framePosition(self.currentAnimFrame)
+
+    def _framePosition(self, animFrame: AnimFrame):
+        return ((self.openGLWidget.width() // 2) + (animFrame.spriteOffset.x * self.scale),
+                (self.openGLWidget.height() // 3) + (-animFrame.spriteOffset.y * self.scale), 0)
 
     def getShadowPosition(self):
         return ((self.openGLWidget.width() // 2) + (self.currentAnimFrame.shadowOffset.x * self.scale),
@@ -1641,30 +2114,199 @@ class AnimationEditor:
                 0)
         return lh, cent, rh, head
 
+    def textureMemory(self) -> tuple:
+        """Count and estimated bytes of the textures uploaded for the loaded sheet and preview."""
+        return textureMemory(self.uploadedTextures.values())
+
+    def _trackTexture(self, image):
+        """Note the texture a sprite will upload for the image, for textureMemory. Returns the image."""
+        texture = image.get_texture()
+        owner = getattr(texture, 'owner', None) or texture
+        self.uploadedTextures[id(owner)] = owner
+        return image
+
+    def _scheduleAnimationFrame(self, delay: float):
+        self.playbackScheduled = delay
+        pyglet.clock.schedule_once(self._playingAnimation, delay)
+
+    def _playbackTick(self) -> float:
+        """Ticks played since playback started, from the clock, so late callbacks don't add up to drift."""
+        # Rounded so seeking to the start of a frame doesn't land a hair before it.
+        return round((time.perf_counter() - self.playbackStart) / self.animSpeed, 6)
+
+    def seekPlayback(self, tick: float):
+        """Continue playback from the tick of the current sequence."""
+        self.playbackStart = time.perf_counter() - tick * self.animSpeed
+
+        if self.animating:
+            pyglet.clock.unschedule(self._playingAnimation)
+            self._playingAnimation(0)
+
     def _playingAnimation(self, dt):
-        self.openGLWidget.makeCurrent()
+        if self.openGLWidget.showHud and dt:
+            self.openGLWidget.stats.recordPlayback(self.playbackScheduled, dt)
+
+        if not self.currentSequence or not self.currentSequence.frames:
+            return
 
+        timeline = self.currentSequence.timeline
+        if not timeline.length:
+            # Nothing has a duration yet, check again once something might.
+            self._scheduleAnimationFrame(self.animSpeed)
+            return
+
+        tick = self._playbackTick()
+        position = timeline.frameAt(tick)
+
+        self.openGLWidget.makeCurrent()
+        self.currentAnimFrame = self.currentSequence.frames[position]
         self._setAnimFrameDisplay(self.currentAnimFrame)
 
-        self.ui.frameSlider.setValue(self.currentAnimFrame.idx)
+        self.playbackPosition = position
+        self.ui.frameSlider.setValue(position)
+
+        nextChange = timeline.nextChange(tick)
+        if self.showCompass:
+            nextChange = min(nextChange, self._updateCompass(tick))
+
+        self._scheduleAnimationFrame((nextChange - tick) * self.animSpeed)
+
+    def _previewTick(self) -> float:
+        """Tick of the current sequence on display."""
+        if self.animating:
+            return self._playbackTick()
 
-        existingFrame = self.currentAnimFrame
+        if not self.currentSequence or not self.currentSequence.frames:
+            return 0
+
+        return self.currentSequence.timeline.start(self.ui.frameSlider.value())
+
+    def toggleCompass(self):
+        """Switch the preview between the current direction and all 8 directions of the group around a compass."""
+        self.showCompass = not self.showCompass
+        self.singlePreview.visible = not self.showCompass
+        self.compassPreview.visible = self.showCompass
+
+        self.refreshCompass()
+
+    def refreshCompass(self):
+        if self.showCompass:
+            self._updateCompass(self._previewTick())
+
+    def _updateCompass(self, tick: float) -> float:
+        """Show the frame every direction of the current group has at the tick, the directions share the clock of
+        the current one. Returns the earliest tick one of them changes frames at."""
+        nextChange = math.inf
+        if not self.currentAnimGroup or self.imageGrid is None:
+            for sprite in self.compassSprites + self.compassShadows:
+                sprite.visible = False
+            return nextChange
+
+        self.openGLWidget.makeCurrent()
+
+        if not self.compassSprites:
+            for _ in self.compassLayout:
+                shadow = pyglet.sprite.Sprite(self._trackTexture(self.shadowImage), batch=self.openGLWidget.batch,
+                                              group=pyglet.graphics.Group(0, parent=self.compassPreview))
+                shadow.scale = self.scale
+                self.compassShadows.append(shadow)
+
+                sprite = pyglet.sprite.Sprite(self._trackTexture(self.imageGrid[0]), batch=self.openGLWidget.batch,
+                                              group=pyglet.graphics.Group(1, parent=self.compassPreview))
+                sprite.scale = self.scale
+                self.compassSprites.append(sprite)
+
+        cellSize = max(self.imageGrid.item_width, self.imageGrid.item_height) * self.scale
+        centerX, centerY = self.openGLWidget.width() // 2, self.openGLWidget.height() // 2
+        showShadows = self.shadow.visible if self.shadow else True
+        directions = self.currentAnimGroup.directions
+
+        for direction, (column, row) in enumerate(self.compassLayout):
+            sprite, shadow = self.compassSprites[direction], self.compassShadows[direction]
+            sequence = directions[direction] if direction < len(directions) else None
+            if sequence is None or not sequence.frames:
+                sprite.visible = shadow.visible = False
+                continue
+
+            timeline = sequence.timeline
+            animFrame = sequence.frames[timeline.frameAt(tick)]
+            nextChange = min(nextChange, timeline.nextChange(tick))
+
+            x, y = centerX + column * cellSize, centerY + row * cellSize
+            sprite.image = self._frameImage(animFrame)
+            sprite.position = (x + animFrame.spriteOffset.x * self.scale, y - animFrame.spriteOffset.y * self.scale, 0)
+            shadow.position = (x + animFrame.shadowOffset.x * self.scale, y - animFrame.shadowOffset.y * self.scale, 0)
+            sprite.visible = True
+            shadow.visible = showShadows
+
+        return nextChange
+
+    def cycleOnionSkin(self):
+        """Show none, then 1 up to maxOnionFrames frames on either side of the current one."""
+        self.onionFrames = (self.onionFrames + 1) % (self.maxOnionFrames + 1)
+        self.updateOnionSkin()
+
+    def _onionNeighbours(self) -> List[Tuple[AnimFrame, Tuple[int, int, int, int]]]:
+        """Frames around the current one to draw faintly, with their color."""
+        if self.animating or not self.onionFrames or not self.currentSequence or self.imageGrid is None:
+            return []
+
+        frames = self.currentSequence.frames
+        position = next((idx for idx, frame in enumerate(frames) if frame is self.currentAnimFrame), None)
+        if position is None:
+            return []
+
+        neighbours = []
+        for distance in range(1, self.onionFrames + 1):
+            opacity = self.onionOpacity * (self.onionFrames - distance + 1) // self.onionFrames
+            for step, tint in zip((-distance, distance), self.onionTints):
+                if 0 <= position + step < len(frames):
+                    red, green, blue = tint if self.onionTint else (255, 255, 255)
+                    neighbours.append((frames[position + step], (red, green, blue, opacity)))
+
+        return neighbours
+
+    def updateOnionSkin(self):
+        """Place the onion skin sprites on the frames around the current one. Sprites are reused, so edits only move
+        them, and they all draw from the sheet as one texture, so they batch into a single draw however many
+        there are."""
+        neighbours = self._onionNeighbours()
+        if not neighbours and not self.onionSprites:
+            return
+
+        self.openGLWidget.makeCurrent()
 
-        nextFrame = self.currentAnimFrame.idx + 1
-        if nextFrame > len(self.currentSequence.frames) - 1:
-            nextFrame = 0
+        if neighbours:
+            textures = self._trackTexture(self.imageGrid.get_texture_sequence())
+            while len(self.onionSprites) < len(neighbours):
+                sprite = pyglet.sprite.Sprite(textures[0], batch=self.openGLWidget.batch, group=self.onionGroup)
+                sprite.scale = self.scale
+                self.onionSprites.append(sprite)
+
+            for sprite, (animFrame, color) in zip(self.onionSprites, neighbours):
+                image = textures[animFrame.frameIndex]
+                if animFrame.flip:
+                    image = image.get_transform(flip_x=True)
+                image.anchor_x = image.width // 2
+                image.anchor_y = image.height // 2
 
-        self.currentAnimFrame = self.currentSequence.frames[nextFrame]
+                sprite.image = image
+                sprite.position = self._framePosition(animFrame)
+                sprite.color = color
+                sprite.visible = True
 
-        pyglet.clock.schedule_once(self._playingAnimation, self.animSpeed * existingFrame.duration)
+        for sprite in self.onionSprites[len(neighbours):]:
+            sprite.visible = False
 
     def playAnimation(self):
         if self.currentAnimFrame:
             self.animating = not self.animating
             pyglet.clock.unschedule(self._playingAnimation)
+            self.updateOnionSkin()
 
             if self.animating:
-                pyglet.clock.schedule_once(self._playingAnimation, self.animSpeed * self.currentAnimFrame.duration)
+                # Start at the beginning of the frame on display.
+                self.seekPlayback(self.currentSequence.timeline.start(self.ui.frameSlider.value()))
             else:
                 self.sliderChange()
 
@@ -1679,38 +2321,44 @@ class AnimationEditor:
 
                     firstIdx = self.currentAnimGroup.directions[self.currentDirection].frames[0].frameIndex
 
-                    self.shadow = pyglet.sprite.Sprite(self.shadowImage, x=shadowPos[0], y=shadowPos[1],
-                                                       batch=self.openGLWidget.batch, group=pyglet.graphics.Group(0))
+                    self.shadow = pyglet.sprite.Sprite(self._trackTexture(self.shadowImage),
+                                                       x=shadowPos[0], y=shadowPos[1],
+                                                       batch=self.openGLWidget.batch,
+                                                       group=pyglet.graphics.Group(0, parent=self.singlePreview))
                     self.shadow.scale = self.scale
 
-                    self.sprite = pyglet.sprite.Sprite(self.imageGrid[firstIdx], x=spritePos[0], y=spritePos[1],
-                                                       batch=self.openGLWidget.batch, group=pyglet.graphics.Group(1))
+                    self.sprite = pyglet.sprite.Sprite(self._trackTexture(self.imageGrid[firstIdx]),
+                                                       x=spritePos[0], y=spritePos[1],
+                                                       batch=self.openGLWidget.batch,
+                                                       group=pyglet.graphics.Group(1, parent=self.singlePreview))
                     self.sprite.scale = self.scale
 
                 if not self.leftHand:
                     if self.actionPoints:
                         lhPos, centPos, rhPos, headPos = self.getActionPointPositions()
+                        marker = self._trackTexture(self.actionPointMarker)
 
-                        self.leftHand = pyglet.sprite.Sprite(self.actionPointMarker, x=lhPos[0], y=lhPos[1],
+                        self.leftHand = pyglet.sprite.Sprite(marker, x=lhPos[0], y=lhPos[1],
                                                              batch=self.openGLWidget.batch,
-                                                             group=pyglet.graphics.Group(2))
+                                                             group=pyglet.graphics.Group(2, parent=self.singlePreview))
                         self.leftHand.color = (255, 0, 0)
                         self.leftHand.scale = self.scale
 
-                        self.center = pyglet.sprite.Sprite(self.actionPointMarker, x=centPos[0], y=centPos[1],
+                        self.center = pyglet.sprite.Sprite(marker, x=centPos[0], y=centPos[1],
                                                            batch=self.openGLWidget.batch,
-                                                           group=pyglet.graphics.Group(3))
+                                                           group=pyglet.graphics.Group(3, parent=self.singlePreview))
                         self.center.color = (0, 255, 0)
                         self.center.scale = self.scale
 
-                        self.rightHand = pyglet.sprite.Sprite(self.actionPointMarker, x=rhPos[0], y=rhPos[1],
+                        self.rightHand = pyglet.sprite.Sprite(marker, x=rhPos[0], y=rhPos[1],
                                                               batch=self.openGLWidget.batch,
-                                                              group=pyglet.graphics.Group(2))
+                                                              group=pyglet.graphics.Group(2, parent=self.singlePreview))
                         self.rightHand.color = (0, 0, 255)
                         self.rightHand.scale = self.scale
 
-                        self.head = pyglet.sprite.Sprite(self.actionPointMarker, x=headPos[0], y=headPos[1],
-                                                         batch=self.openGLWidget.batch, group=pyglet.graphics.Group(2))
+                        self.head = pyglet.sprite.Sprite(marker, x=headPos[0], y=headPos[1],
+                                                         batch=self.openGLWidget.batch,
+                                                         group=pyglet.graphics.Group(2, parent=self.singlePreview))
                         self.head.color = (0, 0, 0)
                         self.head.scale = self.scale
 
@@ -1724,15 +2372,22 @@ class AnimationEditor:
 
                     self._setAnimFrameDisplay(animFrame)
 
+                if not self.animating:
+                    self.refreshCompass()
+                    self.updateOnionSkin()
+
+    def _frameImage(self, animFrame: AnimFrame):
+        image = self._trackTexture(self.imageGrid[animFrame.frameIndex])
+        if animFrame.flip:
+            image = image.get_texture().get_transform(flip_x=True)
+            image.anchor_x = image.width // 2
+            image.anchor_y = image.height // 2
+
+        return image
+
     def _setAnimFrameDisplay(self, animFrame: AnimFrame):
         if self.sprite:
-            image = self.imageGrid[animFrame.frameIndex]
-            if animFrame.flip:
-                image = image.get_texture().get_transform(flip_x=True)
-                image.anchor_x = image.width // 2
-                image.anchor_y = image.height // 2
-
-            self.sprite.image = image
+            self.sprite.image = self._frameImage(animFrame)
 
             self.sprite.position = self.getSpritePosition()
             self.shadow.position = self.getShadowPosition()
@@ -1744,369 +2399,63 @@ class AnimationEditor:
                 self.rightHand.position = rhPos
                 self.head.position = headPos
 
+    @traced("import")
     def importMultipleSheets(self, fileName):
-        dirName = os.path.dirname(fileName)
-
-        try:
-            self.loadedTree = ElementTree.parse(fileName)
-        except ElementTree.ParseError:
-            self.ui.statusBar.showMessage("Failed to parse animations XML data.", 5000)
-            return
+        self.ui.statusBar.showMessage("Processing... this may take a moment.", 5000)
 
-        root = self.loadedTree.getroot()
+        self.app.processEvents()
 
-        anims = root.find('Anims')
-        if anims is None:
-            self.ui.statusBar.showMessage("Unable to find any Animation XML data.", 5000)
-            return
+        resetCopyStats()
 
         try:
-            shadowSize = int(root.find("ShadowSize").text)
-        except AttributeError:
-            self.ui.statusBar.showMessage("Unable to determine dimensions of XML data.", 5000)
-            return
+            imported = importMultiSheet(fileName, self.duplicateTolerance, self._confirmNearDuplicates)
+        except SheetError as e:
+            return self.createErrorPopup(str(e))
 
         self.clear()
 
         self.singleLoaded = False
 
-        self.ui.statusBar.showMessage("Processing... this may take a moment.", 5000)
-
-        self.app.processEvents()
-
-        self.groups = []
-        copyGroups = []
-        collapsedAnims = []
-        maxWidth = 0
-        maxHeight = 0
-        frames = []
-        framesToSequence = []
-        for actionAnim in anims:
-            name = "Unknown"
-            actionIdx = -1
-            rushFrame = -1
-            hitFrame = -1
-            returnFrame = -1
-            copyName = ''
-            frameHeight = 0
-            frameWidth = 0
-            durations = []
-            for actionElement in actionAnim:
-                if actionElement.tag == "Name":
-                    name = actionElement.text
-                elif actionElement.tag == "Index":
-                    actionIdx = int(actionElement.text)
-                elif actionElement.tag == "CopyOf":
-                    copyName = actionElement.text
-                elif actionElement.tag == "RushFrame":
-                    rushFrame = int(actionElement.text)
-                elif actionElement.tag == "HitFrame":
-                    hitFrame = int(actionElement.text)
-                elif actionElement.tag == "ReturnFrame":
-                    returnFrame = int(actionElement.text)
-                elif actionElement.tag == "FrameWidth":
-                    frameWidth = int(actionElement.text)
-                elif actionElement.tag == "FrameHeight":
-                    frameHeight = int(actionElement.text)
-                elif actionElement.tag == "Durations":
-                    durations = []
-                    for durationElement in actionElement:
-                        try:
-                            durationValue = int(durationElement.text)
-                        except ValueError:
-                            return self.createErrorPopup(
-                                f"{name} animation has an invalid duration value. Cannot be {durationElement.text}")
-
-                        if durationValue <= 0:
-                            return self.createErrorPopup(
-                                f"{name} animation has invalid duration value. Cannot be {durationValue}")
-
-                        durations.append(durationValue)
-
-            # After all checks, lets create some data.
-            if copyName:
-                group = AnimGroup(actionIdx, name, copyName=copyName)
-                copyGroups.append(group)
-                self.groups.append(group)
-                item = AnimGroupItem(group, self)
-                self.ui.actionListWidget.addItem(item)
-                continue
-
-            animFile = f"{name}-Anim.png"
-            animImagePath = os.path.join(dirName, animFile)
-            if not os.path.exists(animImagePath):
-                return self.createErrorPopup(f"{animFile} not found.")
-
-            offsetFile = f"{name}-Offsets.png"
-            offsetImagePath = os.path.join(dirName, offsetFile)
-            if not os.path.exists(animImagePath):
-                return self.createErrorPopup(f"{offsetFile} not found.")
-
-            shadowFile = f"{name}-Shadow.png"
-            shadowImagePath = os.path.join(dirName, shadowFile)
-            if not os.path.exists(animImagePath):
-                return self.createErrorPopup(f"{shadowFile} not found.")
-
-            animImage = Image.open(animImagePath)
-            offsetImage = Image.open(offsetImagePath)
-            shadowImage = Image.open(shadowImagePath)
-
-            if (shadowImage.width != animImage.width or shadowImage.height != animImage.height or
-                    animImage.width != offsetImage.width or animImage.height != offsetImage.height or
-                    offsetImage.width != animImage.width or offsetImage.height != animImage.height):
-                return self.createErrorPopup(f"Dimensions of Anims, Shadows, and Offsets do not match for {name}.")
-
-            if frameWidth == 0 or frameHeight == 0:
-                return self.createErrorPopup(f"Could not find frame dimensions for {name}.")
-
-            if animImage.width % frameWidth != 0 or animImage.height % frameHeight != 0:
-                return self.createErrorPopup(f"Animation must be divisible by frame dimensions for {name}.")
-
-            frameXCount = animImage.width // frameWidth
-            sequenceCount = frameYCount = animImage.height // frameHeight
-
-            if len(durations) != frameXCount:
-                return self.createErrorPopup("Amount of frame duration does not match number of frames.")
-
-            if sequenceCount != 1 and sequenceCount != 8:
-                return self.createErrorPopup(f"Frame count is not 1 or 8 for {name}.")
-
-            group = AnimGroup(actionIdx, name, rushFrame, hitFrame, returnFrame)
-            self.groups.append(group)
+        self.loadedTree = imported.tree
+        self.groups = imported.groups
+        for group in self.groups:
             item = AnimGroupItem(group, self)
             self.ui.actionListWidget.addItem(item)
 
-            for i in range(sequenceCount):
-                sequenceIdx = (sequenceCount - i) % sequenceCount
-
-                for frameIdx in range(frameXCount):
-                    startX, startY = frameIdx % frameXCount, sequenceIdx
-                    l, t = startX * frameWidth, startY * frameHeight
-                    r, b = l + frameWidth, t + frameHeight
-
-                    obounds = (l, t, r, b)
-
-                    frameImg = animImage.crop(obounds)
-
-                    oFrameBox = frameImg.getbbox()
-                    if oFrameBox:
-                        croppedFrame = TLRectangle.fromBounds(oFrameBox)
-                    else:
-                        # No bounds found, it's possible the frame is empty. For example, an animation may temporarily
-                        # make a character disappear/reappear. Create a frame at the center that's 1x1.
-                        croppedFrame = TLRectangle(frameWidth // 2, frameHeight // 2, 1, 1)
-                        oFrameBox = croppedFrame.bounds()
-
-                    maxWidth = max(maxWidth, croppedFrame.width)
-                    maxHeight = max(maxHeight, croppedFrame.height)
-
-                    actionPointFrame = offsetImage.crop(obounds)
-
-                    actionPointLoc = getActionPointsFromPILImage(actionPointFrame)
+        self.actionPoints.update(imported.actionPoints)
 
-                    boundsCenter = croppedFrame.center
+        self.frameWidth = imported.frameWidth
+        self.frameHeight = imported.frameHeight
+        self.shadowSize = imported.shadowSize
 
-                    actionPoints = ActionPoints(Offset(*boundsCenter),
-                                                Offset(*boundsCenter),
-                                                Offset(*boundsCenter),
-                                                Offset(*boundsCenter))
+        with span("import.texture upload"):
+            self.sheetBuffer = PixelBuffer.fromPIL(imported.sheet)
+            self.sheetImage = self.sheetBuffer.toImageData()
 
-                    if actionPointLoc[0] and actionPointLoc[1] and actionPointLoc[2]:
-                        center = actionPointLoc[1]
-                        head = center
-                        if actionPointLoc[3]:
-                            head = actionPointLoc[3]
-
-                        leftHand = actionPointLoc[0]
-                        rightHand = actionPointLoc[2]
-                        actionPoints = ActionPoints(leftHand, center, rightHand, head)
-                    elif actionPointLoc[0] or actionPointLoc[1] or actionPointLoc[2] or actionPointLoc[3]:
-                        return self.createErrorPopup(
-                            f"Error decoding action points from offsets image. Frame Index: {frameIdx}")
-
-                    # Position relative to 0, 0.
-                    actionPoints.add(Offset(-boundsCenter[0], -boundsCenter[1]))
-
-                    offsetRect = actionPoints.getRect()
-                    cOffsetRect = centerBounds(offsetRect)
-
-                    maxWidth = max(maxWidth, cOffsetRect.width)
-                    maxHeight = max(maxHeight, cOffsetRect.height)
-
-                    animFrame = AnimFrame(len(group.directions[sequenceIdx].frames))
-
-                    offsetX = croppedFrame.x - ((frameWidth // 2) - (croppedFrame.width // 2))
-                    offsetY = croppedFrame.y - ((frameHeight // 2) - (croppedFrame.height // 2))
-
-                    animFrame.spriteOffset = Offset(offsetX, offsetY)
-                    animFrame.duration = durations[frameIdx]
-
-                    if shadowImage:
-                        simage = shadowImage.crop(obounds)
-
-                        if shadowOffset := getShadowLocationFromPILImage(simage):
-                            animFrame.shadowOffset.x = shadowOffset.x - frameWidth // 2
-                            animFrame.shadowOffset.y = shadowOffset.y - frameHeight // 2
-                    else:
-                        animFrame.shadowOffset.x = 0
-                        animFrame.shadowOffset.y = -(croppedFrame.y - frameHeight // 2) // 2
-
-                    frames.append((frameImg.crop(oFrameBox), actionPoints))
-                    framesToSequence.append((actionIdx, sequenceIdx, frameIdx))
-                    group.directions[sequenceIdx].frames.append(animFrame)
-
-            if sequenceCount == 1:
-                collapsedAnims.append(group)
-
-        maxWidth = roundUpToMult(maxWidth, 2)
-        maxHeight = roundUpToMult(maxHeight, 2)
-
-        uniqueImages, oldFrameToNewFrame, uniqueBodyPoints = checkDuplicateImages(frames, True)
-
-        maxTexSize = int(math.ceil(math.sqrt(len(uniqueImages))))
-
-        singleSheetSize = (maxWidth * maxTexSize, maxHeight * maxTexSize)
-
-        # Create single sheet
-        sheet = Image.new("RGBA", singleSheetSize, (0, 0, 0, 0))
-
-        apSheet = Image.new("RGBA", singleSheetSize, (0, 0, 0, 0))
-
-        apDraw = ImageDraw.Draw(apSheet)
-
-        # Map the positions of the frames to their sheet positions.
-        for frameIdx, uI in enumerate(uniqueImages):
-            diffX = maxWidth // 2 - uI.width // 2
-            diffY = maxHeight // 2 - uI.height // 2
-            startX = maxWidth * (frameIdx % maxTexSize)
-            startY = (maxHeight * (frameIdx // maxTexSize))
-
-            sheet.paste(uI, (startX + diffX, startY + diffY))
-
-            # Create an Offset sheet.
-            bpStartX = startX + maxWidth // 2
-            bpStartY = startY + maxHeight // 2
-
-            startOffset = Offset(bpStartX, bpStartY)
-
-            bp = uniqueBodyPoints[frameIdx]
-            lh = (startOffset + bp.leftHand).data()
-            center = (startOffset + bp.center).data()
-            rh = (startOffset + bp.rightHand).data()
-            head = (startOffset + bp.head).data()
-
-            positions = defaultdict(list)
-            positions[lh].append((255, 0, 0, 255))
-            positions[center].append((0, 255, 0, 255))
-            positions[head].append((0, 0, 0, 255))
-            positions[rh].append((0, 0, 255, 255))
-
-            for pos, color in overlapColors(positions).items():
-                apDraw.point(pos, fill=color)
-
-            self.actionPoints[frameIdx] = uniqueBodyPoints[frameIdx]
-
-        flippedFrames = set()
-        # Now we need to go through and update the data with the correct frame indexes.
-        for oldId, oldFrame in enumerate(frames):
-            oldInfo = framesToSequence[oldId]
-            groups = [group for group in self.groups if group.idx == oldInfo[0]]
-            group = groups[0]
-            newFrame = group.directions[oldInfo[1]].frames[oldInfo[2]]
-            changedFrame = oldFrameToNewFrame[oldId]
-            newFrame.frameIndex = changedFrame.frameIndex
-            newFrame.flip = changedFrame.flip
-
-            if newFrame.flip:
-                flippedFrames.add(newFrame.frameIndex)
-                if oldFrame[0].width % 2 == 1:
-                    newFrame.spriteOffset.x += 1
-
-        # Flip back clockwise.
-        for group in self.groups:
-            group.directions = [group.directions[0], *reversed(group.directions[1:])]
-
-            for sequence in group.directions:
-                for frame in sequence.frames:
-                    frame.reset()
-
-        # Now that we have proper frames, copy the collapsed ones to all directions.
-        for collapsedAnim in collapsedAnims:
-            for si in range(1, 8):
-                newSequence = copy.deepcopy(collapsedAnim.directions[0])
-                collapsedAnim.directions[si] = newSequence
-
-        # Unfortunately copy actions can come before the action they need to copy? Check after we have parsed all 
-        # actions.
-        # Some copy actions don't even have action indexes... Indexes currently have no use according to SkyTemple.
-        for groups in copyGroups:
-            name, copyName = groups.name, groups.copyName
-            # Find copy group
-            found = False
-            for currentGroup in self.groups:
-                if currentGroup.name == copyName:
-                    found = currentGroup
-                    break
-
-            if found:
-                # Find destination group.
-                for currentGroup in self.groups:
-                    if currentGroup.name == name:
-                        group = copy.deepcopy(found)
-                        currentGroup.rushFrame = group.rushFrame
-                        currentGroup.hitFrame = group.hitFrame
-                        currentGroup.returnFrame = group.returnFrame
-                        currentGroup.directions = group.directions
-
-            else:
-                print(f"Copy {name} not found")
-                continue
-
-        self.sheetImage = pyglet.image.ImageData(sheet.width, sheet.height, 'RGBA', sheet.tobytes(),
-                                                 pitch=-sheet.width * 4)
-
-        self.frameWidth = maxWidth
-        self.frameHeight = maxHeight
-        self.shadowSize = shadowSize
-
-        self.actionPtImage = pyglet.image.ImageData(apSheet.width, apSheet.height, 'RGBA', apSheet.tobytes(),
-                                                    pitch=-apSheet.width * 4)
+            self.actionPtBuffer = PixelBuffer.fromPIL(imported.actionPts)
+            self.actionPtImage = self.actionPtBuffer.toImageData()
 
         self.imageGrid = TopLeftGrid(self.sheetImage,
-                                     rows=maxTexSize,
-                                     columns=maxTexSize)
+                                     rows=imported.columns,
+                                     columns=imported.columns)
 
         self.actionGrid = TopLeftGrid(self.actionPtImage,
-                                      rows=maxTexSize,
-                                      columns=maxTexSize)
+                                      rows=imported.columns,
+                                      columns=imported.columns)
 
         self._addFramesFromGrid()
 
+        with span("import.frame usage"):
+            self._rebuildFrameUsage()
+
         self.addRecentList(fileName)
 
+        log.debug("Import copies: %s", copyReport())
+
         self.ui.statusBar.showMessage("Frame data and images loaded successfully.", 3000)
 
     def _saveExportFrameData(self, fileName, frameSizes: dict[str, Tuple[int, int]]):
-        existingRoot = self.loadedTree.getroot()
-
-        root = ElementTree.Element("AnimData")
-
-        ElementTree.SubElement(root, "ShadowSize").text = existingRoot.find("ShadowSize").text
-
-        animsEl = ElementTree.SubElement(root, "Anims")
-
-        trim = self.ui.actionTrim_Copies.isChecked()
-
-        for groupAnim in self.groups:
-            animEl = ElementTree.SubElement(animsEl, "Anim")
-            size = frameSizes[groupAnim.name] if groupAnim.name in frameSizes else None
-            self.createBaseAnimGroupXML(animEl, groupAnim.name, groupAnim.idx, groupAnim, trim=trim,
-                                        copyName=groupAnim.copyName, size=size)
-
-            if not groupAnim.copyName:
-                self.createMultiSheetFrameData(animEl, groupAnim)
-
-        ElementTree.indent(root)
+        root = createAnimDataXML(self.groups, frameSizes, self.shadowSize, self.ui.actionTrim_Copies.isChecked())
 
         if not fileName:
             # Use loaded file name
@@ -2117,8 +2466,7 @@ class AnimationEditor:
                 item.animGroup.modified = False
                 item.updateText()
 
-        tree = ElementTree.ElementTree(root)
-        tree.write(fileName, encoding='utf-8', xml_declaration=True)
+        writeXML(root, fileName)
 
     def exportSingleSheet(self):
         if self.loadedTree:
@@ -2132,12 +2480,14 @@ class AnimationEditor:
     def _exportSingleSheet(self, directory):
         self._saveFrameData(f"{directory}/FrameData.xml")
 
-        self.sheetImage.save(f"{directory}/Anim.png")
+        writer = self._createSheetWriter()
 
-        if self.actionPtImage:
-            self.actionPtImage.save(f"{directory}/Offsets.png")
+        writer.save(self.sheetBuffer.toPIL(), f"{directory}/Anim.png")
 
-        self.ui.statusBar.showMessage("Single sheet was output successfully.", 3000)
+        if self.actionPtBuffer:
+            writer.save(self.actionPtBuffer.toPIL(), f"{directory}/Offsets.png")
+
+        self._showWriteReport("Single sheet was output successfully.", writer)
 
     def exportMultipleSheets(self):
         if self.loadedTree:
@@ -2148,6 +2498,7 @@ class AnimationEditor:
             if directory:
                 self._exportMultipleSheets(directory)
 
+    @traced("export")
     def _exportMultipleSheets(self, filePath: str):
         if not self.loadedTree:
             return
@@ -2157,172 +2508,37 @@ class AnimationEditor:
             if self._getFrameUniformity(animGroup) is False:
                 return
 
+        resetCopyStats()
+
         baseFrame = self.imageGrid[0]
         frameWidth, frameHeight = baseFrame.width, baseFrame.height
 
-        croppedBounds = []
-        croppedImages = []
-
-        croppedActionPts = []
-
-        actionRects = []
-        frameRects = []
-
-        # Use PIL For image operations as it's faster than directly accessing bytes.
-        sheetPilImage = Image.frombytes('RGBA', (self.sheetImage.width, self.sheetImage.height),
-                                        self.sheetImage.get_image_data().get_data('RGBA', self.sheetImage.width * 4))
-
-        actionPilImage = Image.frombytes('RGBA', (self.actionPtImage.width, self.sheetImage.height),
-                                         self.actionPtImage.get_image_data().get_data('RGBA',
-                                                                                      self.sheetImage.width * 4))
-
-        shadowPilImage = Image.frombytes('RGBA', (self.shadowImage.width, self.shadowImage.height),
-                                         self.shadowImage.get_image_data().get_data('RGBA'))
-
-        # FLIP due to data upside down.
-        sheetPilImage = sheetPilImage.transpose(Image.FLIP_TOP_BOTTOM)
-        actionPilImage = actionPilImage.transpose(Image.FLIP_TOP_BOTTOM)
-        shadowPilImage = shadowPilImage.transpose(Image.FLIP_TOP_BOTTOM)
-
-        for i in range(len(self.imageGrid)):
-            startX, startY = i % self.imageGrid.columns, i // self.imageGrid.columns
-            l, t = startX * frameWidth, startY * frameHeight
-            r, b = l + frameWidth, t + frameHeight
-
-            obounds = (l, t, r, b)
-            originalFrame = sheetPilImage.crop(obounds)
-            oActionFrame = actionPilImage.crop(obounds)
-
-            frameBox = originalFrame.getbbox()
-            actionBox = oActionFrame.getbbox()
-
-            # No bounds. Empty frame.
-            if not frameBox:
-                # If no action box, it shouldn't be output?
-                if not actionBox:
-                    continue
-                else:
-                    frameBox = (l, t, l + 1, b + 1)
-
-            bounds = TLRectangle.fromBounds(frameBox)
-            actionBounds = TLRectangle.fromBounds(actionBox)
-
-            croppedBounds.append(bounds)
-
-            frameBound = bounds + (-frameWidth // 2, -frameHeight // 2)
-            # frameBound += actRects[i]
-
-            frameRects.append(frameBound)
-            actionRects.append(actionBounds + (-frameWidth // 2, -frameHeight // 2))
-
-            croppedImages.append(originalFrame.crop(frameBox))
-            croppedActionPts.append(oActionFrame.crop(actionBox))
-
-        groupSizes: dict[str, Tuple[int, int]] = {}
-
-        for groupId, animGroup in enumerate(self.groups):
-            # Skip copies.
-            if animGroup.copyName != "":
-                continue
-
-            # Max amount of sequences.
-            maxSequence = 0
+        streaming = self.ui.actionStreaming_Export.isChecked()
+        budget = MemoryBudget(self.exportMemoryLimit * 1024 * 1024)
+        writer = self._createSheetWriter()
 
-            # Frames go counter clockwise, but now you want to go clockwise...?
-            directions = [animGroup.directions[0], *reversed(animGroup.directions[1:])]
+        # Frames are cropped from the sheet buffers. Streaming only keeps a bounded amount of them around, otherwise
+        # crop them all up front.
+        source = FrameSource(self.sheetBuffer, self.actionPtBuffer, frameWidth, frameHeight, self.imageGrid.columns,
+                             budget, DEFAULT_STREAM_FRAMES if streaming else 0)
 
-            maxWidth = maxHeight = 0
-
-            offsetRects = {}
-
-            collapsed = False
-            if self.ui.actionCollapse_Singles.isChecked():
-                collapsed = self.isSequenceCollapsable(animGroup)
-
-            # Search all frames in the animation for the bounds that will fit the separated sheet.
-            for dirIdx, sequence in enumerate(directions):
-                # Determine the maximum bounds for all frames in the sequence.
-                maxSequence = max(maxSequence, len(sequence.frames))
-                for frameIdx, frame in enumerate(sequence.frames):
-                    croppedRect = croppedBounds[frame.frameIndex]
-
-                    # Get the biggest frame size we need. Offsets are expanded by 2x to make it centerable.
-                    adjusted_width = croppedRect.width + abs(frame.spriteOffset.x) * 2
-                    adjusted_height = croppedRect.height + abs(frame.spriteOffset.y) * 2
-
-                    offsetRects[(dirIdx, frameIdx)] = croppedRect + frame.spriteOffset
-
-                    maxWidth = max(maxWidth, adjusted_width)
-                    maxHeight = max(maxHeight, adjusted_height)
-
-            # Round up the boxes to the nearest eighth.
-            maxWidth = int(roundUpToMult(maxWidth, 8))
-            maxHeight = int(roundUpToMult(maxHeight, 8))
-
-            groupSizes[animGroup.name] = (maxWidth, maxHeight)
-
-            if collapsed:
-                directionCount = 1
-            else:
-                directionCount = 8
-
-            # Now lets output the texture.
-            newAnimImage = Image.new("RGBA", (maxWidth * maxSequence, maxHeight * directionCount), (0, 0, 0, 0))
-            newActionPtImage = Image.new("RGBA", (maxWidth * maxSequence, maxHeight * directionCount), (0, 0, 0, 0))
-            newShadowImage = Image.new("RGBA", (maxWidth * maxSequence, maxHeight * directionCount), (0, 0, 0, 0))
-
-            # Go over all sequences and frames.
-            for dirIdx, sequence in enumerate(directions):
-                startY = dirIdx * maxHeight
-                maxSequence = max(maxSequence, len(sequence.frames))
-
-                for frameIdx, frame in enumerate(sequence.frames):
-                    croppedImg = croppedImages[frame.frameIndex]
-                    croppedOffset = croppedActionPts[frame.frameIndex]
-
-                    frameBounds = croppedBounds[frame.frameIndex]
-                    actionBound = actionRects[frame.frameIndex]
-
-                    if frame.flip:
-                        croppedImg = croppedImg.transpose(Image.FLIP_LEFT_RIGHT)
-                        croppedOffset = croppedOffset.transpose(Image.FLIP_LEFT_RIGHT)
-
-                        frameBounds = Rectangle(-frameBounds.right + frameWidth, frameBounds.y, frameBounds.width,
-                                                frameBounds.height)
-                        actionBound = actionBound.getFlip()
-
-                    translatedRect = centerAndApplyOffset(maxWidth, maxHeight,
-                                                          frameBounds, frame.flip,
-                                                          frame.spriteOffset)
-
-                    startX = (frameIdx * maxWidth)
-
-                    newAnimImage.paste(croppedImg,
-                                       (startX + int(translatedRect[0]), startY + int(translatedRect[1]))
-                                       )
-
-                    actPtX = (maxWidth // 2) + frame.spriteOffset.x + actionBound.x
-                    actPtY = (maxHeight // 2) + frame.spriteOffset.y + actionBound.y
-
-                    newActionPtImage.paste(croppedOffset,
-                                           (startX + actPtX, startY + actPtY))
-
-                    shadowPtX = -(self.shadowImage.width // 2) + (maxWidth // 2) + frame.shadowOffset.x
-                    shadowPtY = -(self.shadowImage.height // 2) + (maxHeight // 2) + frame.shadowOffset.y
-
-                    newShadowImage.paste(shadowPilImage,
-                                         (startX + shadowPtX, startY + shadowPtY))
-
-                if collapsed:
-                    break
+        try:
+            if not streaming:
+                source.preload(len(self.imageGrid))
 
-            newAnimImage.save(f"{filePath}/{animGroup.name}-Anim.png")
-            newActionPtImage.save(f"{filePath}/{animGroup.name}-Offsets.png")
-            newShadowImage.save(f"{filePath}/{animGroup.name}-Shadow.png")
+            groupSizes = exportMultipleSheets(filePath, self.groups, source, self.shadowBuffer.toPIL(), writer,
+                                              self.ui.actionCollapse_Singles.isChecked(), streaming)
+        except ExportError as error:
+            return self.createErrorPopup(f"Could not export multi-sheets. {error}")
+        finally:
+            source.clear()
 
         self._saveExportFrameData(f"{filePath}/AnimData.xml", groupSizes)
 
-        self.ui.statusBar.showMessage("Multisheet frames were output successfully.", 3000)
+        log.debug("Export copies: %s", copyReport())
+
+        self._showWriteReport(f"Multisheet frames were output successfully. Peak export memory: "
+                              f"{formatBytes(budget.peak)}.", writer)
 
     def getAttachmentPointsFromTexture(self, path):
         if os.path.join(path, 'Offsets.png'):
@@ -2338,6 +2554,8 @@ def excepthook(exc_type, exc_value, exc_tb):
 
 
 if __name__ == "__main__":
+    # Indexing the sprite library runs in worker processes, which frozen builds need this for.
+    multiprocessing.freeze_support()
     sys.excepthook = excepthook
     app = QtWidgets.QApplication(sys.argv)
     ui = Ui_MainWindow()
@@ -0,0 +1,206 @@
+import hashlib
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data import FD_STR, MIRRORED_DIRECTIONS, AnimGroup, FrameUsageIndex
+from pixelbuffer import PixelBuffer
+from sheetio import SheetError
+
+
+@dataclass
+class SheetOptimization:
+    """Repacked single sheet and what was removed to get there."""
+    sheet: PixelBuffer
+    actionPts: Optional[PixelBuffer]
+    framesBefore: int
+    framesAfter: int
+    unusedRemoved: int
+    duplicatesMerged: int
+    flipsMerged: int
+    bytesBefore: int
+    bytesAfter: int
+
+    def summary(self) -> str:
+        return (f"{self.framesBefore} -> {self.framesAfter} frames: {self.unusedRemoved} unused removed, "
+                f"{self.duplicatesMerged} duplicates and {self.flipsMerged} mirrored frames merged.")
+
+
+def _splitCells(buffer: PixelBuffer, frameWidth: int, frameHeight: int) -> np.ndarray:
+    """View of a sheet as (frame, y, x, channel), frames in row major order like TopLeftGrid."""
+    rows, columns = buffer.height // frameHeight, buffer.width // frameWidth
+    data = buffer.data[:rows * frameHeight, :columns * frameWidth]
+    return data.reshape(rows, frameHeight, columns, frameWidth, 4).swapaxes(1, 2).reshape(-1, frameHeight,
+                                                                                          frameWidth, 4)
+
+
+def _contentWidth(cell: np.ndarray) -> int:
+    columns = np.flatnonzero(cell[:, :, 3].any(axis=0))
+    return int(columns[-1] - columns[0] + 1) if len(columns) else 0
+
+
+def _canFlip(cell: np.ndarray) -> bool:
+    """Exports center sprites on half their width rounded down, or up when flipped, so changing the flip of an odd width
+    sprite would move it by a pixel."""
+    return _contentWidth(cell) % 2 == 0
+
+
+def _packCells(cells: np.ndarray, indexes: List[int], frameWidth: int, frameHeight: int) -> PixelBuffer:
+    columns = math.ceil(math.sqrt(len(indexes)))
+    rows = math.ceil(len(indexes) / columns)
+
+    data = np.zeros((rows * frameHeight, columns * frameWidth, 4), dtype=np.uint8)
+    for newIndex, index in enumerate(indexes):
+        y, x = (newIndex // columns) * frameHeight, (newIndex % columns) * frameWidth
+        data[y:y + frameHeight, x:x + frameWidth] = cells[index]
+
+    return PixelBuffer(data)
+
+
+def optimizeSheet(groups: List[AnimGroup], sheet: PixelBuffer, actionPts: Optional[PixelBuffer],
+                  frameWidth: int, frameHeight: int) -> SheetOptimization:
+    """Drop frames no animation uses, merge identical and mirrored frames and repack what is left into a square grid.
+
+    Frames are compared on both the sprite and its action points. Every AnimFrame in the groups is rewritten in place
+    to point at the new sheet, mirrored frames have their flip inverted.
+    """
+    cells = _splitCells(sheet, frameWidth, frameHeight)
+    actionCells = _splitCells(actionPts, frameWidth, frameHeight) if actionPts else None
+
+    usage = FrameUsageIndex(groups)
+    if not usage:
+        raise SheetError("No animation uses any frame of the sheet.")
+
+    for index in usage:
+        if not 0 <= index < len(cells):
+            raise SheetError(f"Frame {index} is outside of the sheet ({len(cells)} frames).")
+
+    def frameKey(index: int, mirrored: bool) -> bytes:
+        step = -1 if mirrored else 1
+        digest = hashlib.blake2b(cells[index][:, ::step].tobytes(), digest_size=16)
+        if actionCells is not None:
+            digest.update(actionCells[index][:, ::step].tobytes())
+        return digest.digest()
+
+    keys: Dict[bytes, int] = {}
+    remap: Dict[int, Tuple[int, int]] = {}
+    uniqueIndexes = []
+    duplicates = flips = 0
+
+    # Usage is in order of first use, so frames keep roughly the order animations play them in.
+    for index in usage:
+        key = frameKey(index, False)
+        if key in keys:
+            remap[index] = (keys[key], 0)
+            duplicates += 1
+            continue
+
+        mirrorKey = frameKey(index, True)
+        if mirrorKey in keys and _canFlip(cells[index]):
+            remap[index] = (keys[mirrorKey], 1)
+            flips += 1
+            continue
+
+        keys[key] = len(uniqueIndexes)
+        remap[index] = (len(uniqueIndexes), 0)
+        uniqueIndexes.append(index)
+
+    for index, uses in usage.items():
+        newIndex, mirrored = remap[index]
+        for group, direction, slot in uses:
+            frame = group.directions[direction].frames[slot]
+            if frame.frameIndex != newIndex or mirrored:
+                group.modified = True
+
+            frame.frameIndex = newIndex
+            frame.flip = int(frame.flip) ^ mirrored
+            group.directions[direction].invalidate()
+
+    newSheet = _packCells(cells, uniqueIndexes, frameWidth, frameHeight)
+    newActionPts = _packCells(actionCells, uniqueIndexes, frameWidth, frameHeight) if actionCells is not None else None
+
+    bytesBefore = sheet.nbytes + (actionPts.nbytes if actionPts else 0)
+    bytesAfter = newSheet.nbytes + (newActionPts.nbytes if newActionPts else 0)
+
+    return SheetOptimization(newSheet, newActionPts, len(cells), len(uniqueIndexes), len(cells) - len(usage),
+                             duplicates, flips, bytesBefore, bytesAfter)
+
+
+@dataclass
+class MirroredDirection:
+    """A direction of a group whose frames are the mirror images of the frames of the opposite direction."""
+    group: AnimGroup
+    source: int
+    target: int
+
+    def __str__(self):
+        frameCount = len(self.group.directions[self.target].frames)
+        return f"{self.group.name}: {FD_STR[self.target]} mirrors {FD_STR[self.source]} ({frameCount} frames)"
+
+
+def findMirroredDirections(groups: List[AnimGroup], sheet: PixelBuffer, actionPts: Optional[PixelBuffer],
+                           frameWidth: int, frameHeight: int) -> List[MirroredDirection]:
+    """Find right facing directions that can be written as flipped references to the frames of the left facing one.
+
+    Every frame must have the same duration as its counterpart and its sprite and action points must be the exact
+    mirror image. Offsets are kept as they are, so they may differ. Directions that already reference the opposite
+    frames are skipped.
+    """
+    cells = _splitCells(sheet, frameWidth, frameHeight)
+    actionCells = _splitCells(actionPts, frameWidth, frameHeight) if actionPts else None
+
+    def oriented(layer: np.ndarray, index: int, flip: int) -> np.ndarray:
+        return layer[index][:, ::-1] if flip else layer[index]
+
+    def isMirror(sourceFrame, targetFrame) -> bool:
+        if sourceFrame.duration != targetFrame.duration:
+            return False
+
+        for index in (sourceFrame.frameIndex, targetFrame.frameIndex):
+            if not 0 <= index < len(cells):
+                return False
+
+        if int(targetFrame.flip) == int(sourceFrame.flip) and not _canFlip(cells[targetFrame.frameIndex]):
+            return False
+
+        for layer in (cells, actionCells):
+            if layer is None:
+                continue
+
+            mirrored = oriented(layer, sourceFrame.frameIndex, not sourceFrame.flip)
+            if not np.array_equal(mirrored, oriented(layer, targetFrame.frameIndex, targetFrame.flip)):
+                return False
+
+        return True
+
+    mirrors = []
+    for group in groups:
+        for source, target in MIRRORED_DIRECTIONS:
+            sourceFrames = group.directions[source].frames
+            targetFrames = group.directions[target].frames
+            if not sourceFrames or len(sourceFrames) != len(targetFrames):
+                continue
+
+            if all(t.frameIndex == s.frameIndex and int(t.flip) != int(s.flip)
+                   for s, t in zip(sourceFrames, targetFrames)):
+                continue
+
+            if all(isMirror(s, t) for s, t in zip(sourceFrames, targetFrames)):
+                mirrors.append(MirroredDirection(group, source, target))
+
+    return mirrors
+
+
+def applyMirroredDirections(mirrors: List[MirroredDirection]):
+    """Point each mirroring direction at the flipped frames of its source. The frames it used before may become unused,
+    Optimize Sheet drops them."""
+    for mirror in mirrors:
+        sequence = mirror.group.directions[mirror.target]
+        for sourceFrame, frame in zip(mirror.group.directions[mirror.source].frames, sequence.frames):
+            frame.frameIndex = sourceFrame.frameIndex
+            frame.flip = 1 - int(sourceFrame.flip)
+
+        sequence.invalidate()
+        mirror.group.modified = True
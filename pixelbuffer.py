@@ -0,0 +1,113 @@
+from collections import defaultdict
+from typing import Dict, Optional
+
+import numpy as np
+import pyglet
+from PIL import Image
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImage
+
+# Bytes of pixel data copied, per operation. Views handed out by PixelBuffer are not counted as they share memory.
+copyStats: Dict[str, int] = defaultdict(int)
+
+
+def recordCopy(operation: str, size: int):
+    copyStats[operation] += size
+
+
+def resetCopyStats():
+    copyStats.clear()
+
+
+def copyReport() -> str:
+    if not copyStats:
+        return "No pixel data copied."
+
+    return ", ".join(f"{operation}: {size} bytes" for operation, size in copyStats.items())
+
+
+class PixelBuffer:
+    """Owns one canonical RGBA buffer and hands PIL, pyglet and Qt views of it. data is a top-down view, the rows are
+    kept bottom-up, which is what pyglet uploads without reversing them.
+
+    The data is treated as immutable once created; anything that needs different pixels creates a new buffer.
+    """
+
+    def __init__(self, data: np.ndarray):
+        self.data = data
+        self._rows: Optional[bytes] = None  # Bottom-up rows that data views, once made.
+
+    @classmethod
+    def fromRows(cls, rows: bytes, width: int, height: int) -> 'PixelBuffer':
+        """Buffer viewing bottom-up RGBA rows."""
+        buffer = cls(np.frombuffer(rows, dtype=np.uint8).reshape(height, width, 4)[::-1])
+        buffer._rows = rows
+        return buffer
+
+    @classmethod
+    def fromPIL(cls, image: Image.Image, operation: str = "PIL to buffer") -> 'PixelBuffer':
+        if image.mode != 'RGBA':
+            image = image.convert('RGBA')
+
+        rows = image.tobytes('raw', 'RGBA', 0, -1)
+        recordCopy(operation, len(rows))
+        return cls.fromRows(rows, image.width, image.height)
+
+    @classmethod
+    def fromImageData(cls, image: pyglet.image.AbstractImage, operation: str = "pyglet to buffer") -> 'PixelBuffer':
+        rows = image.get_image_data().get_data('RGBA', image.width * 4)
+        recordCopy(operation, len(rows))
+        return cls.fromRows(rows, image.width, image.height)
+
+    @classmethod
+    def load(cls, path: str) -> 'PixelBuffer':
+        with Image.open(path) as image:
+            return cls.fromPIL(image, "decode")
+
+    @property
+    def width(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def rows(self) -> bytes:
+        """The pixels as bottom-up rows. Copied once for buffers made from an array, shared otherwise."""
+        if self._rows is None:
+            self._rows = self.data[::-1].tobytes()
+            recordCopy("buffer to pyglet", len(self._rows))
+
+        return self._rows
+
+    def toPIL(self) -> Image.Image:
+        """Read-only PIL image sharing memory with the buffer."""
+        if self._rows is None and self.data.flags.c_contiguous:
+            return Image.frombuffer('RGBA', (self.width, self.height), self.data, 'raw', 'RGBA', 0, 1)
+
+        return Image.frombuffer('RGBA', (self.width, self.height), self.rows(), 'raw', 'RGBA', 0, -1)
+
+    def toImageData(self) -> pyglet.image.ImageData:
+        """Image data for pyglet, sharing the rows with the buffer."""
+        return pyglet.image.ImageData(self.width, self.height, 'RGBA', self.rows(), pitch=self.width * 4)
+
+    def toQImage(self, x: int = 0, y: int = 0, width: Optional[int] = None, height: Optional[int] = None) -> QImage:
+        """QImage of a region of the buffer. Viewing the buffer when its rows are top-down, so the buffer must outlive
+        the returned image, otherwise a copy of the region turned upright."""
+        width = self.width - x if width is None else width
+        height = self.height - y if height is None else height
+
+        if self._rows is None and self.data.flags.c_contiguous:
+            start = (y * self.width + x) * 4
+            view = memoryview(self.data).cast('B')[start:]
+            return QImage(view, width, height, self.width * 4, QImage.Format.Format_RGBA8888)
+
+        start = ((self.height - y - height) * self.width + x) * 4
+        view = memoryview(self.rows()).cast('B')[start:]
+        recordCopy("buffer to Qt", width * height * 4)
+        return QImage(view, width, height, self.width * 4, QImage.Format.Format_RGBA8888).flipped(
+            Qt.Orientation.Vertical)
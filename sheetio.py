@@ -0,0 +1,752 @@
+import copy
+import math
+import os
+import pathlib
+import sys
+import xml.etree.ElementTree as ElementTree
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from data import (FD_STR, ActionPoints, AnimFrame, AnimGroup, AnimationSequence, DuplicateTolerance, NearDuplicate,
+                  Offset, TLRectangle, centerBounds, groupFingerprint, isSequenceCollapsable)
+from pixelbuffer import PixelBuffer
+from tracing import span
+from utils import (checkDuplicateImages, createActionPointSheet, getActionPointsFromPILImage,
+                   getShadowLocationsFromPILSheet, roundUpToMult)
+
+REDUCE_RUSH_FRAMES = False
+
+
+class SheetError(Exception):
+    pass
+
+
+@dataclass
+class SingleSheet:
+    """A FrameData.xml with its Anim.png and Offsets.png, loaded without the editor."""
+    fileName: str
+    groups: List[AnimGroup]
+    frameWidth: int
+    frameHeight: int
+    shadowSize: int
+    sheet: PixelBuffer
+    actionPts: Optional[PixelBuffer]
+
+
+@dataclass
+class MultiSheet:
+    """An AnimData.xml with its per animation sheets, packed into a single sheet."""
+    fileName: str
+    tree: ElementTree.ElementTree
+    groups: List[AnimGroup]
+    sheet: Image.Image
+    actionPts: Image.Image
+    frameWidth: int
+    frameHeight: int
+    shadowSize: int
+    columns: int
+    actionPoints: Dict[int, ActionPoints]
+
+
+def shadowImagePath() -> pathlib.Path:
+    if getattr(sys, 'frozen', False):
+        appDir = pathlib.Path(sys._MEIPASS)
+    else:
+        appDir = pathlib.Path(__file__).resolve().parent
+
+    return appDir / "shadow.png"
+
+
+def adjustOffset(rushFrame: int, frameNum: int, rushOffset: Offset, frameOffset: Offset):
+    """Calculation to truncate rush frames."""
+    if frameNum > rushFrame:
+        diff = frameOffset - rushOffset
+
+        final = rushOffset + (diff // 3)
+        return final
+
+
+def parseFrameDimensions(root: ElementTree.Element) -> Tuple[int, int, int]:
+    try:
+        width = int(root.find("FrameWidth").text)
+        height = int(root.find("FrameHeight").text)
+        shadowSize = int(root.find("ShadowSize").text)
+    except AttributeError:
+        raise SheetError("Unable to determine dimensions of XML data.")
+
+    return width, height, shadowSize
+
+
+def parseAnimGroups(anims: ElementTree.Element, width: int, height: int) -> List[AnimGroup]:
+    """Read the animation groups of a FrameData.xml. Copies are resolved to the frames of the group they copy."""
+    groups = []
+    copyGroups = []
+    for actionAnim in anims:
+        actionIdx = -1
+        rushFrame = -1
+        hitFrame = -1
+        returnFrame = -1
+        sequences = []
+        copyName = ''
+        for actionElement in actionAnim:
+            if actionElement.tag == "Name":
+                name = actionElement.text
+            elif actionElement.tag == "Index":
+                actionIdx = int(actionElement.text)
+            elif actionElement.tag == "CopyOf":
+                copyName = actionElement.text
+            elif actionElement.tag == "RushFrame":
+                rushFrame = int(actionElement.text)
+            elif actionElement.tag == "HitFrame":
+                hitFrame = int(actionElement.text)
+            elif actionElement.tag == "ReturnFrame":
+                returnFrame = int(actionElement.text)
+            elif actionElement.tag == "Sequences":
+                sequences = []
+                for sequenceElement in actionElement:
+                    frameSeqIdx = 0
+                    frames = []
+                    for animSequences in sequenceElement:
+                        for frame in animSequences:
+                            if frame.tag == "FrameIndex":
+                                frameIndex = int(frame.text)
+
+                            elif frame.tag == "Sprite":
+                                spriteOffset = Offset(*[int(offset.text) for offset in frame])
+
+                            elif frame.tag == "Shadow":
+                                shadowOffset = Offset(*[int(offset.text) for offset in frame])
+
+                            elif frame.tag == "HFlip":
+                                try:
+                                    hflip = int(frame.text)
+                                except ValueError:
+                                    hflip = int(bool(frame.text))
+
+                            elif frame.tag == "Duration":
+                                duration = int(frame.text)
+
+                        frames.append(
+                            AnimFrame(frameSeqIdx, frameIndex, hflip, duration, shadowOffset, spriteOffset))
+                        frameSeqIdx += 1
+
+                        if REDUCE_RUSH_FRAMES:
+                            if rushFrame > -1:
+                                frame2 = frameSeqIdx - 1
+                                # print(frame2, rushFrame, name, frames)
+                                if frame2 > rushFrame:
+                                    # print("NAME", name)
+                                    # print("FRAME!", name, adjustOffset(rushFrame, frame2, 
+                                    # frames[rushFrame].spriteOffset, spriteOffset))
+
+                                    frames[frame2].spriteOffset = adjustOffset(rushFrame, frame2,
+                                                                                    frames[rushFrame].spriteOffset,
+                                                                                    spriteOffset)
+                                    frames[frame2].shadowOffset = adjustOffset(rushFrame, frame2,
+                                                                                    frames[rushFrame].shadowOffset,
+                                                                                    shadowOffset)
+
+                    sequence = AnimationSequence(frames)
+                    sequences.append(sequence)
+
+        if copyName:
+            group = AnimGroup(actionIdx, name, copyName=copyName)
+            copyGroups.append(group)
+        else:
+            if len(sequences) == 1:
+                print(f"Warning: {name} only has 1 sequence. Duplicating for all directions.")
+                for i in range(7):
+                    newSequence = copy.deepcopy(sequences[0])
+                    sequences.append(newSequence)
+
+            elif len(sequences) == 0:
+                print(f"Warning: {name} no sequences found. Generating empty sequences.")
+                for i in range(8):
+                    sequences.append(AnimationSequence())
+
+            group = AnimGroup(actionIdx, name, rushFrame, hitFrame, returnFrame, sequences)
+        group.width = width
+        group.height = height
+        groups.append(group)
+
+    # Unfortunately copy actions can come before the action they need to copy? Check after we have parsed all 
+    # actions.
+    # Some copy actions don't even have action indexes... Indexes currently have no use.
+    for copyGroup in copyGroups:
+        name, copyName = copyGroup.name, copyGroup.copyName
+        # Find copy group
+        found = False
+        for currentGroup in groups:
+            if currentGroup.name == copyName:
+                found = currentGroup
+                break
+
+        if found:
+            # Find destination group.
+            for currentGroup in groups:
+                if currentGroup.name == name:
+                    group = copy.deepcopy(found)
+                    currentGroup.rushFrame = group.rushFrame
+                    currentGroup.hitFrame = group.hitFrame
+                    currentGroup.returnFrame = group.returnFrame
+                    currentGroup.directions = group.directions
+
+        else:
+            print(f"Copy {name} not found")
+            continue
+
+    return groups
+
+
+def createBaseAnimGroupXML(animEl: ElementTree.Element, name: str, index: int, group: AnimGroup,
+                           trim=False, copyName="", size=None) -> bool:
+    ElementTree.SubElement(animEl, "Name").text = name
+
+    if index != -1:
+        ElementTree.SubElement(animEl, "Index").text = str(index)
+
+    if trim:
+        if copyName:
+            ElementTree.SubElement(animEl, "CopyOf").text = str(copyName)
+            return False
+
+    if size:
+        ElementTree.SubElement(animEl, "FrameWidth").text = str(size[0])
+        ElementTree.SubElement(animEl, "FrameHeight").text = str(size[1])
+
+    if group.rushFrame != -1:
+        ElementTree.SubElement(animEl, "RushFrame").text = str(group.rushFrame)
+
+    if group.hitFrame != -1:
+        ElementTree.SubElement(animEl, "HitFrame").text = str(group.hitFrame)
+
+    if group.returnFrame != -1:
+        ElementTree.SubElement(animEl, "ReturnFrame").text = str(group.returnFrame)
+
+    return True
+
+
+def createSingleSheetFrameData(animEl: ElementTree.Element, group: AnimGroup, collapse):
+    sequencesEle = ElementTree.SubElement(animEl, "Sequences")
+
+    isCollapsable = False
+    if collapse:
+        isCollapsable = isSequenceCollapsable(group)
+
+    for sequence in group.directions:
+        seqEle = ElementTree.SubElement(sequencesEle, "AnimSequence")
+
+        for frame in sequence.frames:
+            frameEle = ElementTree.SubElement(seqEle, "AnimFrame")
+
+            ElementTree.SubElement(frameEle, "FrameIndex").text = str(frame.frameIndex)
+            ElementTree.SubElement(frameEle, "Duration").text = str(frame.duration)
+            ElementTree.SubElement(frameEle, "HFlip").text = str(int(frame.flip))
+            spriteOff = ElementTree.SubElement(frameEle, "Sprite")
+            ElementTree.SubElement(spriteOff, "XOffset").text = str(frame.spriteOffset.x)
+            ElementTree.SubElement(spriteOff, "YOffset").text = str(frame.spriteOffset.y)
+            shadowOff = ElementTree.SubElement(frameEle, "Shadow")
+            ElementTree.SubElement(shadowOff, "XOffset").text = str(frame.shadowOffset.x)
+            ElementTree.SubElement(shadowOff, "YOffset").text = str(frame.shadowOffset.y)
+
+        # Stop after writing a frame if we are collapsing it.
+        if isCollapsable:
+            break
+
+    return True
+
+
+def _automaticCopies(groups: List[AnimGroup]) -> Dict[int, str]:
+    """Groups identical to an earlier group written in full, by id, with the name of that group."""
+    # Name of the first group written in full for each fingerprint.
+    writtenGroups = {}
+    copies = {}
+
+    for groupAnim in groups:
+        if groupAnim.copyName or not any(sequence.frames for sequence in groupAnim.directions):
+            continue
+
+        fingerprint = groupFingerprint(groupAnim)
+        if fingerprint in writtenGroups:
+            copies[id(groupAnim)] = writtenGroups[fingerprint]
+        else:
+            writtenGroups[fingerprint] = groupAnim.name
+
+    return copies
+
+
+def createFrameDataXML(groups: List[AnimGroup], frameWidth: int, frameHeight: int, shadowSize: int, trim: bool,
+                       collapse: bool) -> Tuple[ElementTree.Element, int]:
+    """Build FrameData.xml for the groups. When trimming, groups identical to an earlier one are also written as a
+    CopyOf it. Returns the root and how many frames those automatic copies left out."""
+    root = ElementTree.Element("AnimData")
+
+    ElementTree.SubElement(root, "FrameWidth").text = str(frameWidth)
+    ElementTree.SubElement(root, "FrameHeight").text = str(frameHeight)
+    ElementTree.SubElement(root, "ShadowSize").text = str(shadowSize)
+
+    animsEl = ElementTree.SubElement(root, "Anims")
+
+    automaticCopies = _automaticCopies(groups) if trim else {}
+    elidedFrames = 0
+
+    for groupAnim in groups:
+        copyName = groupAnim.copyName
+        if id(groupAnim) in automaticCopies:
+            copyName = automaticCopies[id(groupAnim)]
+            elidedFrames += len(groupAnim.directions[0].frames) if collapse and isSequenceCollapsable(
+                groupAnim) else sum(len(sequence.frames) for sequence in groupAnim.directions)
+
+        animEl = ElementTree.SubElement(animsEl, "Anim")
+        if createBaseAnimGroupXML(animEl, groupAnim.name, groupAnim.idx, groupAnim, trim=trim, copyName=copyName):
+            createSingleSheetFrameData(animEl, groupAnim, collapse)
+
+    ElementTree.indent(root)
+
+    return root, elidedFrames
+
+
+def describeNearDuplicates(nearDuplicates: List[NearDuplicate], framesToSequence: List[Tuple[int, int, int]],
+                           groups: List[AnimGroup]) -> List[str]:
+    groupNames = {group.idx: group.name for group in groups}
+
+    lines = []
+    for merge in nearDuplicates:
+        actionIdx, sequenceIdx, frameIdx = framesToSequence[merge.imageIndex]
+        # Multi-sheet rows go counter clockwise from DOWN.
+        direction = -sequenceIdx % 8
+        flipped = " flipped" if merge.flip else ""
+        lines.append(f"{groupNames.get(actionIdx, actionIdx)} {FD_STR[direction]} #{frameIdx} -> sheet frame "
+                     f"{merge.uniqueIndex}{flipped}: {merge.differingPixels} pixels differ, largest difference "
+                     f"{merge.maxDelta}")
+
+    return lines
+
+
+def importMultiSheet(fileName: str, tolerance: Optional[DuplicateTolerance] = None,
+                     confirmNearDuplicates: Optional[Callable[[List[str]], bool]] = None) -> MultiSheet:
+    """Read an AnimData.xml and its sheets, packing the unique frames into a single sheet.
+
+    Near duplicate merges found with a tolerance are only kept if confirmNearDuplicates accepts their description.
+    """
+    dirName = os.path.dirname(fileName)
+
+    try:
+        with span("import.parse xml"):
+            tree = ElementTree.parse(fileName)
+    except ElementTree.ParseError:
+        raise SheetError("Failed to parse animations XML data.")
+
+    root = tree.getroot()
+
+    anims = root.find('Anims')
+    if anims is None:
+        raise SheetError("Unable to find any Animation XML data.")
+
+    try:
+        shadowSize = int(root.find("ShadowSize").text)
+    except AttributeError:
+        raise SheetError("Unable to determine dimensions of XML data.")
+
+    frameActionPoints: Dict[int, ActionPoints] = {}
+
+    groups = []
+    copyGroups = []
+    collapsedAnims = []
+    maxWidth = 0
+    maxHeight = 0
+    frames = []
+    framesToSequence = []
+    for actionAnim in anims:
+        name = "Unknown"
+        actionIdx = -1
+        rushFrame = -1
+        hitFrame = -1
+        returnFrame = -1
+        copyName = ''
+        frameHeight = 0
+        frameWidth = 0
+        durations = []
+        for actionElement in actionAnim:
+            if actionElement.tag == "Name":
+                name = actionElement.text
+            elif actionElement.tag == "Index":
+                actionIdx = int(actionElement.text)
+            elif actionElement.tag == "CopyOf":
+                copyName = actionElement.text
+            elif actionElement.tag == "RushFrame":
+                rushFrame = int(actionElement.text)
+            elif actionElement.tag == "HitFrame":
+                hitFrame = int(actionElement.text)
+            elif actionElement.tag == "ReturnFrame":
+                returnFrame = int(actionElement.text)
+            elif actionElement.tag == "FrameWidth":
+                frameWidth = int(actionElement.text)
+            elif actionElement.tag == "FrameHeight":
+                frameHeight = int(actionElement.text)
+            elif actionElement.tag == "Durations":
+                durations = []
+                for durationElement in actionElement:
+                    try:
+                        durationValue = int(durationElement.text)
+                    except ValueError:
+                        raise SheetError(
+                            f"{name} animation has an invalid duration value. Cannot be {durationElement.text}")
+
+                    if durationValue <= 0:
+                        raise SheetError(
+                            f"{name} animation has invalid duration value. Cannot be {durationValue}")
+
+                    durations.append(durationValue)
+
+        # After all checks, lets create some data.
+        if copyName:
+            group = AnimGroup(actionIdx, name, copyName=copyName)
+            copyGroups.append(group)
+            groups.append(group)
+            continue
+
+        animFile = f"{name}-Anim.png"
+        animImagePath = os.path.join(dirName, animFile)
+        if not os.path.exists(animImagePath):
+            raise SheetError(f"{animFile} not found.")
+
+        offsetFile = f"{name}-Offsets.png"
+        offsetImagePath = os.path.join(dirName, offsetFile)
+        if not os.path.exists(offsetImagePath):
+            raise SheetError(f"{offsetFile} not found.")
+
+        shadowFile = f"{name}-Shadow.png"
+        shadowImagePath = os.path.join(dirName, shadowFile)
+        if not os.path.exists(shadowImagePath):
+            raise SheetError(f"{shadowFile} not found.")
+
+        # Sheets may be written palette indexed, work in RGBA.
+        with span("import.decode"):
+            animImage = Image.open(animImagePath).convert('RGBA')
+            offsetImage = Image.open(offsetImagePath).convert('RGBA')
+            shadowImage = Image.open(shadowImagePath).convert('RGBA')
+
+        if (shadowImage.width != animImage.width or shadowImage.height != animImage.height or
+                animImage.width != offsetImage.width or animImage.height != offsetImage.height or
+                offsetImage.width != animImage.width or offsetImage.height != animImage.height):
+            raise SheetError(f"Dimensions of Anims, Shadows, and Offsets do not match for {name}.")
+
+        if frameWidth == 0 or frameHeight == 0:
+            raise SheetError(f"Could not find frame dimensions for {name}.")
+
+        if animImage.width % frameWidth != 0 or animImage.height % frameHeight != 0:
+            raise SheetError(f"Animation must be divisible by frame dimensions for {name}.")
+
+        frameXCount = animImage.width // frameWidth
+        sequenceCount = frameYCount = animImage.height // frameHeight
+
+        if len(durations) != frameXCount:
+            raise SheetError("Amount of frame duration does not match number of frames.")
+
+        if sequenceCount != 1 and sequenceCount != 8:
+            raise SheetError(f"Frame count is not 1 or 8 for {name}.")
+
+        group = AnimGroup(actionIdx, name, rushFrame, hitFrame, returnFrame)
+        groups.append(group)
+
+        # Locate the shadow of every frame in one pass instead of scanning each cropped frame.
+        with span("import.shadow scan"):
+            shadowLocations = getShadowLocationsFromPILSheet(shadowImage, frameWidth, frameHeight)
+
+        with span("import.crop and action points"):
+            for i in range(sequenceCount):
+                sequenceIdx = (sequenceCount - i) % sequenceCount
+
+                for frameIdx in range(frameXCount):
+                    startX, startY = frameIdx % frameXCount, sequenceIdx
+                    l, t = startX * frameWidth, startY * frameHeight
+                    r, b = l + frameWidth, t + frameHeight
+
+                    obounds = (l, t, r, b)
+
+                    frameImg = animImage.crop(obounds)
+
+                    oFrameBox = frameImg.getbbox()
+                    if oFrameBox:
+                        croppedFrame = TLRectangle.fromBounds(oFrameBox)
+                    else:
+                        # No bounds found, it's possible the frame is empty. For example, an animation may temporarily
+                        # make a character disappear/reappear. Create a frame at the center that's 1x1.
+                        croppedFrame = TLRectangle(frameWidth // 2, frameHeight // 2, 1, 1)
+                        oFrameBox = croppedFrame.bounds()
+
+                    maxWidth = max(maxWidth, croppedFrame.width)
+                    maxHeight = max(maxHeight, croppedFrame.height)
+
+                    actionPointFrame = offsetImage.crop(obounds)
+
+                    actionPointLoc = getActionPointsFromPILImage(actionPointFrame)
+
+                    boundsCenter = croppedFrame.center
+
+                    actionPoints = ActionPoints(Offset(*boundsCenter),
+                                                Offset(*boundsCenter),
+                                                Offset(*boundsCenter),
+                                                Offset(*boundsCenter))
+
+                    if actionPointLoc[0] and actionPointLoc[1] and actionPointLoc[2]:
+                        center = actionPointLoc[1]
+                        head = center
+                        if actionPointLoc[3]:
+                            head = actionPointLoc[3]
+
+                        leftHand = actionPointLoc[0]
+                        rightHand = actionPointLoc[2]
+                        actionPoints = ActionPoints(leftHand, center, rightHand, head)
+                    elif actionPointLoc[0] or actionPointLoc[1] or actionPointLoc[2] or actionPointLoc[3]:
+                        raise SheetError(
+                            f"Error decoding action points from offsets image. Frame Index: {frameIdx}")
+
+                    # Position relative to 0, 0.
+                    actionPoints.add(Offset(-boundsCenter[0], -boundsCenter[1]))
+
+                    offsetRect = actionPoints.getRect()
+                    cOffsetRect = centerBounds(offsetRect)
+
+                    maxWidth = max(maxWidth, cOffsetRect.width)
+                    maxHeight = max(maxHeight, cOffsetRect.height)
+
+                    animFrame = AnimFrame(len(group.directions[sequenceIdx].frames))
+
+                    offsetX = croppedFrame.x - ((frameWidth // 2) - (croppedFrame.width // 2))
+                    offsetY = croppedFrame.y - ((frameHeight // 2) - (croppedFrame.height // 2))
+
+                    animFrame.spriteOffset = Offset(offsetX, offsetY)
+                    animFrame.duration = durations[frameIdx]
+
+                    if shadowImage:
+                        shadowX, shadowY = shadowLocations[sequenceIdx, frameIdx]
+
+                        if shadowX >= 0:
+                            animFrame.shadowOffset.x = int(shadowX) - frameWidth // 2
+                            animFrame.shadowOffset.y = int(shadowY) - frameHeight // 2
+                    else:
+                        animFrame.shadowOffset.x = 0
+                        animFrame.shadowOffset.y = -(croppedFrame.y - frameHeight // 2) // 2
+
+                    frames.append((frameImg.crop(oFrameBox), actionPoints))
+                    framesToSequence.append((actionIdx, sequenceIdx, frameIdx))
+                    group.directions[sequenceIdx].frames.append(animFrame)
+
+        if sequenceCount == 1:
+            collapsedAnims.append(group)
+
+    maxWidth = roundUpToMult(maxWidth, 2)
+    maxHeight = roundUpToMult(maxHeight, 2)
+
+    with span("import.dedup"):
+        uniqueImages, oldFrameToNewFrame, uniqueBodyPoints, nearDuplicates = checkDuplicateImages(
+            frames, True, tolerance)
+
+        if nearDuplicates and not (confirmNearDuplicates and confirmNearDuplicates(
+                describeNearDuplicates(nearDuplicates, framesToSequence, groups))):
+            uniqueImages, oldFrameToNewFrame, uniqueBodyPoints, _ = checkDuplicateImages(frames, True)
+
+    with span("import.pack"):
+        maxTexSize = int(math.ceil(math.sqrt(len(uniqueImages))))
+
+        singleSheetSize = (maxWidth * maxTexSize, maxHeight * maxTexSize)
+
+        # Create single sheet
+        sheet = Image.new("RGBA", singleSheetSize, (0, 0, 0, 0))
+
+        apOrigins = []
+
+        # Map the positions of the frames to their sheet positions.
+        for frameIdx, uI in enumerate(uniqueImages):
+            diffX = maxWidth // 2 - uI.width // 2
+            diffY = maxHeight // 2 - uI.height // 2
+            startX = maxWidth * (frameIdx % maxTexSize)
+            startY = (maxHeight * (frameIdx // maxTexSize))
+
+            sheet.paste(uI, (startX + diffX, startY + diffY))
+
+            # Center of the frame, where the action points are relative to.
+            apOrigins.append((startX + maxWidth // 2, startY + maxHeight // 2))
+
+            frameActionPoints[frameIdx] = uniqueBodyPoints[frameIdx]
+
+        # Create an Offset sheet.
+        apSheet = createActionPointSheet(singleSheetSize, apOrigins, uniqueBodyPoints)
+
+    with span("import.remap frames"):
+        flippedFrames = set()
+        # Now we need to go through and update the data with the correct frame indexes.
+        for oldId, oldFrame in enumerate(frames):
+            oldInfo = framesToSequence[oldId]
+            group = [group for group in groups if group.idx == oldInfo[0]][0]
+            newFrame = group.directions[oldInfo[1]].frames[oldInfo[2]]
+            changedFrame = oldFrameToNewFrame[oldId]
+            newFrame.frameIndex = changedFrame.frameIndex
+            newFrame.flip = changedFrame.flip
+
+            if newFrame.flip:
+                flippedFrames.add(newFrame.frameIndex)
+                if oldFrame[0].width % 2 == 1:
+                    newFrame.spriteOffset.x += 1
+
+        # Flip back clockwise.
+        for group in groups:
+            group.directions = [group.directions[0], *reversed(group.directions[1:])]
+
+            for sequence in group.directions:
+                sequence.invalidate()
+                for frame in sequence.frames:
+                    frame.reset()
+
+        # Now that we have proper frames, copy the collapsed ones to all directions.
+        for collapsedAnim in collapsedAnims:
+            for si in range(1, 8):
+                newSequence = copy.deepcopy(collapsedAnim.directions[0])
+                collapsedAnim.directions[si] = newSequence
+
+    # Unfortunately copy actions can come before the action they need to copy? Check after we have parsed all 
+    # actions.
+    # Some copy actions don't even have action indexes... Indexes currently have no use according to SkyTemple.
+    for copyGroup in copyGroups:
+        name, copyName = copyGroup.name, copyGroup.copyName
+        # Find copy group
+        found = False
+        for currentGroup in groups:
+            if currentGroup.name == copyName:
+                found = currentGroup
+                break
+
+        if found:
+            # Find destination group.
+            for currentGroup in groups:
+                if currentGroup.name == name:
+                    group = copy.deepcopy(found)
+                    currentGroup.rushFrame = group.rushFrame
+                    currentGroup.hitFrame = group.hitFrame
+                    currentGroup.returnFrame = group.returnFrame
+                    currentGroup.directions = group.directions
+
+        else:
+            print(f"Copy {name} not found")
+            continue
+
+    return MultiSheet(fileName, tree, groups, sheet, apSheet, maxWidth, maxHeight, shadowSize, maxTexSize,
+                      frameActionPoints)
+
+
+def getFrameUniformity(group: AnimGroup) -> Set[Tuple]:
+    """Durations of the group's directions, which a multi-sheet needs to be the same for all of them."""
+    uniformDurations: Set[Tuple] = set()
+    for sequence in group.directions:
+        durations = tuple([frame.duration for frame in sequence.frames])
+        if not durations:  # Ignore empty sequences?
+            continue
+
+        uniformDurations.add(durations)
+
+        if len(uniformDurations) > 1:
+            # Check if frame count differs between directions.
+            firstLength = len(next(iter(uniformDurations), ()))
+            for t in uniformDurations:
+                if len(t) != firstLength:
+                    sFrameCount = ""
+                    for idx, subseq in enumerate(group.directions):
+                        sFrameCount += f"{FD_STR[idx]}: {len(subseq.frames)} Frames\n"
+                    raise SheetError(
+                        f"Could not save AnimData.xml. All directions for animation {group.name} must all be the "
+                        f"same number of frames.\n{sFrameCount}")
+
+            sDurations = ""
+            for idx, sequence2 in enumerate(group.directions):
+                frameDurations = [fr.duration for fr in sequence2.frames]
+                sDurations += f"{FD_STR[idx]}: {tuple(frameDurations)} - Total: ({sum(frameDurations)})\n"
+
+            # If frame counts are fine, then the durations are messed up.
+            raise SheetError(
+                f"Could not save AnimData.xml. Duration values for {group.name} must match for all directions for "
+                f"each frame.\n{sDurations}")
+
+    return uniformDurations
+
+
+def createMultiSheetFrameData(animEl: ElementTree.Element, group: AnimGroup):
+    """This essentially just includes the durations of each frame. Limited in that durations are set for the whole
+    animation regardless of direction."""
+    uniformDurations = getFrameUniformity(group)
+
+    durationEle = ElementTree.SubElement(animEl, "Durations")
+
+    for durations in uniformDurations:
+        for value in durations:
+            ElementTree.SubElement(durationEle, "Duration").text = str(value)
+
+    return True
+
+
+def createAnimDataXML(groups: List[AnimGroup], frameSizes: Dict[str, Tuple[int, int]], shadowSize: int,
+                      trim: bool) -> ElementTree.Element:
+    """Build AnimData.xml for the groups. When trimming, groups identical to an earlier one are also written as a
+    CopyOf it, like createFrameDataXML."""
+    root = ElementTree.Element("AnimData")
+
+    ElementTree.SubElement(root, "ShadowSize").text = str(shadowSize)
+
+    animsEl = ElementTree.SubElement(root, "Anims")
+
+    automaticCopies = _automaticCopies(groups) if trim else {}
+
+    for groupAnim in groups:
+        copyName = automaticCopies.get(id(groupAnim), groupAnim.copyName)
+        animEl = ElementTree.SubElement(animsEl, "Anim")
+        size = frameSizes[groupAnim.name] if groupAnim.name in frameSizes else None
+        createBaseAnimGroupXML(animEl, groupAnim.name, groupAnim.idx, groupAnim, trim=trim, copyName=copyName,
+                               size=size)
+
+        if not copyName:
+            createMultiSheetFrameData(animEl, groupAnim)
+
+    ElementTree.indent(root)
+
+    return root
+
+
+def writeXML(root: ElementTree.Element, fileName: str):
+    tree = ElementTree.ElementTree(root)
+    tree.write(fileName, encoding='utf-8', xml_declaration=True)
+
+
+def loadSingleSheet(fileName: str) -> SingleSheet:
+    """Load a FrameData.xml with the Anim.png and Offsets.png next to it. Offsets are optional."""
+    dirName = os.path.dirname(fileName)
+
+    try:
+        with span("load.parse xml"):
+            root = ElementTree.parse(fileName).getroot()
+    except ElementTree.ParseError:
+        raise SheetError("Failed to parse animations XML data.")
+
+    width, height, shadowSize = parseFrameDimensions(root)
+
+    anims = root.find('Anims')
+    if anims is None:
+        raise SheetError("Unable to find any Animation XML data.")
+
+    with span("load.decode"):
+        try:
+            sheet = PixelBuffer.load(os.path.join(dirName, "Anim.png"))
+        except FileNotFoundError:
+            raise SheetError("Failed to find Anim.png.")
+
+        try:
+            actionPts = PixelBuffer.load(os.path.join(dirName, "Offsets.png"))
+        except FileNotFoundError:
+            actionPts = None
+
+    with span("load.anim groups"):
+        groups = parseAnimGroups(anims, width, height)
+
+    return SingleSheet(fileName, groups, width, height, shadowSize, sheet, actionPts)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+import pyglet
+
+# The modules under test import pyglet.image, which opens a hidden window unless told not to. Tests run without a
+# display.
+pyglet.options['shadow_window'] = False
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,50 @@
+from bulkedit import BulkEdit, applyBulkEdit, dropTouching
+from optimize import MirroredDirection, applyMirroredDirections
+
+from test_data import createGroup
+
+
+def allTargets(groups):
+    return [(group, direction, sequence.frames) for group in groups
+            for direction, sequence in enumerate(group.directions)]
+
+
+def test_copiesOfEditedGroupsStayCopies():
+    source, copied, partial = createGroup(0, [0, 1]), createGroup(1, [0, 1]), createGroup(2, [0, 1])
+    copied.copyName = partial.copyName = source.name
+
+    targets = allTargets([source, copied]) + [(partial, 0, partial.directions[0].frames)]
+    record = applyBulkEdit(targets, BulkEdit(spriteOffset=(1, 0)))
+    assert copied.copyName == source.name
+    assert partial.copyName == ""
+    assert record.touches(copied) and record.touches(partial)
+
+    record.undo()
+    assert partial.copyName == source.name
+    assert all(frame.spriteOffset.x == 0 for sequence in copied.directions for frame in sequence.frames)
+
+
+def test_copiesOfUneditedGroupsStopBeingCopies():
+    source, copied = createGroup(0, [0, 1]), createGroup(1, [0, 1])
+    copied.copyName = source.name
+
+    applyBulkEdit(allTargets([copied]), BulkEdit(durationScale=2))
+    assert copied.copyName == ""
+
+
+def test_mirroringDropsBulkUndoOfTheGroup():
+    group, other = createGroup(0, [0, 1]), createGroup(1, [0, 1])
+    history = [applyBulkEdit(allTargets([group]), BulkEdit(frameRemap={0: 2})),
+               applyBulkEdit(allTargets([other]), BulkEdit(durationScale=2))]
+
+    mirrors = [MirroredDirection(group, 2, 6)]
+    assert all(dropTouching(history, mirror.group) for mirror in mirrors)
+    applyMirroredDirections(mirrors)
+    assert [record.touches(other) for record in history] == [True]
+
+    for record in reversed(history):
+        record.undo()
+
+    mirrored = group.directions[6].frames
+    assert [(frame.frameIndex, frame.flip) for frame in mirrored] == [(2, 1), (1, 1)]
+    assert group.modified
@@ -0,0 +1,52 @@
+import os
+
+from PIL import Image
+
+from convert import ConvertOptions, batchConvert
+from sheetio import createFrameDataXML, writeXML
+
+from test_sheetio import createGroup
+
+
+def createSingleSheet(directory):
+    os.makedirs(directory)
+    root, _ = createFrameDataXML([createGroup(0, "Walk", 4), createGroup(1, "Idle", 8)], 32, 32, 0, trim=True,
+                                 collapse=False)
+    writeXML(root, os.path.join(directory, "FrameData.xml"))
+
+    sheet, actionPts = Image.new('RGBA', (96, 32)), Image.new('RGBA', (96, 32))
+    for frame in range(3):
+        sheet.paste((255, 80 * frame, 0, 255), (frame * 32 + 8, 8, frame * 32 + 24, 28))
+        for x, color in ((14, (0, 0, 0, 255)), (15, (255, 0, 0, 255)), (16, (0, 255, 0, 255)),
+                         (17, (0, 0, 255, 255))):
+            actionPts.putpixel((frame * 32 + x, 20), color)
+    sheet.save(os.path.join(directory, "Anim.png"))
+    actionPts.save(os.path.join(directory, "Offsets.png"))
+
+
+def statuses(results):
+    return {result.source.replace(os.sep, "/"): result.status for result in results}
+
+
+def test_batchConvertSkipsUnchangedSheets(tmp_path):
+    source, output = tmp_path / "sheets", str(tmp_path / "converted")
+    for name in ("Alpha", "Beta"):
+        createSingleSheet(str(source / name))
+    options = ConvertOptions("multi")
+
+    first = batchConvert(str(source), options, output, workers=1)
+    assert statuses(first) == {"Alpha/FrameData.xml": "converted", "Beta/FrameData.xml": "converted"}, first
+    assert all(os.path.exists(os.path.join(output, path)) for result in first for path in result.outputs)
+
+    assert set(statuses(batchConvert(str(source), options, output, workers=1)).values()) == {"skipped"}
+
+    # Changed inputs, deleted outputs, other options and forcing each convert again.
+    with open(source / "Alpha" / "FrameData.xml", 'a', encoding='utf-8') as file:
+        file.write("\n")
+    os.remove(os.path.join(output, "Beta", "Walk-Anim.png"))
+    assert set(statuses(batchConvert(str(source), options, output, workers=1)).values()) == {"converted"}
+
+    assert set(statuses(batchConvert(str(source), ConvertOptions("multi", indexed=True), output,
+                                     workers=1)).values()) == {"converted"}
+    assert set(statuses(batchConvert(str(source), ConvertOptions("multi", indexed=True), output, workers=1,
+                                     force=True)).values()) == {"converted"}
@@ -0,0 +1,75 @@
+import math
+
+from data import AnimationSequence, AnimFrame, AnimGroup, FrameUsageIndex, SequenceTimeline, isSequenceCollapsable
+
+
+def createGroup(idx: int, frameIndexes) -> AnimGroup:
+    group = AnimGroup(idx, f"Action{idx}")
+    group.directions = [AnimationSequence([AnimFrame(slot, frameIndex, 0, 4) for slot, frameIndex in
+                                           enumerate(frameIndexes)]) for _ in range(8)]
+    return group
+
+
+def test_frameUsageIndexRemoveGroup():
+    kept, removed = createGroup(0, [0, 1]), createGroup(1, [1, 2])
+    index = FrameUsageIndex([kept, removed])
+    assert index.count(1) == 16
+
+    assert index.removeGroup(removed) == {1, 2}
+    assert index.count(1) == 8
+    assert 2 not in index
+    assert all(group is kept for group, _, _ in index.uses(1))
+
+    # A group created after the removal starts from an empty index, whatever id it gets.
+    added = createGroup(2, [2])
+    assert index.updateGroup(added) == {2}
+    assert index.count(2) == 8
+
+    rebuilt = FrameUsageIndex([kept, added])
+    assert sorted(index) == sorted(rebuilt)
+    assert all(index.count(frameIndex) == rebuilt.count(frameIndex) for frameIndex in rebuilt)
+
+
+def test_fingerprintsFollowEditsWithoutInvalidate():
+    group = createGroup(0, [0, 1])
+    assert isSequenceCollapsable(group)
+    sequence = group.directions[3]
+    cached = sequence.fingerprint
+    assert sequence.fingerprint is cached
+
+    # Edits that don't call invalidate.
+    sequence.frames[1].spriteOffset.x += 1
+    assert not isSequenceCollapsable(group)
+    sequence.frames[1].spriteOffset.x -= 1
+    assert isSequenceCollapsable(group)
+
+    edits = [lambda frames: frames.append(AnimFrame(2, 5, 0, 4)), lambda frames: frames.pop(),
+             lambda frames: frames.__setitem__(slice(None), frames[::-1]), lambda frames: frames.reverse()]
+    fingerprints = [sequence.fingerprint]
+    for edit in edits:
+        edit(sequence.frames)
+        fingerprints.append(sequence.fingerprint)
+    assert fingerprints[0] == fingerprints[-1] == fingerprints[2] != fingerprints[1]
+    assert fingerprints[2] != fingerprints[3]
+
+    sequence.frames = [AnimFrame(0, 0, 1, 4)]
+    assert sequence.fingerprint != fingerprints[0]
+    assert sequence.timeline.length == 4
+
+
+def test_sequenceTimeline():
+    timeline = SequenceTimeline.fromFrames([AnimFrame(0, 0, 0, 2), AnimFrame(1, 1, 0, 0), AnimFrame(2, 2, 0, 3)])
+    assert timeline.length == 5
+
+    # The frame without a duration is never shown.
+    assert [timeline.frameAt(tick) for tick in range(7)] == [0, 0, 2, 2, 2, 0, 0]
+    assert timeline.frameAt(1.5) == 0 and timeline.frameAt(2) == 2
+    assert [timeline.nextChange(tick) for tick in (0, 1.5, 2, 4.9, 5, 12)] == [2, 2, 5, 5, 7, 15]
+
+
+def test_zeroLengthTimeline():
+    for frames in ([], [AnimFrame(0, 0, 0, 0), AnimFrame(1, 1, 0, 0)]):
+        timeline = SequenceTimeline.fromFrames(frames)
+        assert timeline.length == 0
+        assert timeline.frameAt(3) == 0
+        assert timeline.nextChange(3) == math.inf
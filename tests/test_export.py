@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from data import AnimationSequence, AnimFrame, AnimGroup
+from export import (COMPRESSION_PROFILES, DEFAULT_STREAM_FRAMES, PNG_ENCODER_BYTES, CroppedFrame, ExportError,
+                    FrameSource, MemoryBudget, SheetWriter, exportMultipleSheets)
+from pixelbuffer import PixelBuffer
+from utils import stampImageBytes
+
+
+def createImage(colors: int, width: int = 16, height: int = 16) -> Image.Image:
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    values = (np.arange(width * height) % colors).reshape(height, width)
+    pixels[..., 0], pixels[..., 1] = values % 256, values // 256
+    pixels[..., 3] = 255
+    return Image.fromarray(pixels, 'RGBA')
+
+
+def test_writerReportsEachFile(tmp_path):
+    writer = SheetWriter(indexed=True)
+    writer.save(createImage(4), str(tmp_path / "Walk-Anim.png"))
+    writer.save(createImage(256 + 1, 32, 32), str(tmp_path / "Walk-Shadow.png"))
+
+    assert writer.summary() == "1 of 2 files indexed"
+    assert writer.details().split("\n") == ["Walk-Anim.png: indexed, 4 colors", "Walk-Shadow.png: RGBA, over 256 colors"]
+    assert all(os.path.exists(path) for path, _ in writer.report)
+
+
+def createSource(budget: MemoryBudget, maxFrames: int = DEFAULT_STREAM_FRAMES) -> FrameSource:
+    # Four 16x16 frames, the last one empty.
+    sheet = np.zeros((32, 32, 4), dtype=np.uint8)
+    sheet[2:10, 3:9] = (255, 0, 0, 255)
+    sheet[4:14, 20:30] = (0, 255, 0, 255)
+    sheet[18:30, 2:6] = (0, 0, 255, 255)
+    actionPts = np.zeros_like(sheet)
+    actionPts[[8, 8, 24], [8, 24, 8]] = (255, 0, 0, 255)
+    return FrameSource(PixelBuffer(sheet), PixelBuffer(actionPts), 16, 16, 2, budget, maxFrames)
+
+
+def createGroups():
+    walk = AnimGroup(0, "Walk")
+    walk.directions = [AnimationSequence([AnimFrame(slot, frameIndex, direction % 2, 4)
+                                          for slot, frameIndex in enumerate((0, 1, 2, 3))]) for direction in range(8)]
+    idle = AnimGroup(1, "Idle")
+    idle.directions = [AnimationSequence([AnimFrame(0, 2, 0, 8)]) for _ in range(8)]
+    return [walk, idle]
+
+
+def test_streamingExportStaysWithinTheLimit(tmp_path):
+    shadow = createImage(2, 8, 4)
+
+    unlimited = MemoryBudget()
+    exportMultipleSheets(str(tmp_path), createGroups(), createSource(unlimited), shadow, SheetWriter(indexed=True),
+                         False, True)
+    # The shadow stamping of the biggest sheet, 4 by 8 frames of 16x16.
+    assert unlimited.peak >= stampImageBytes((64, 128), shadow.size, 24)
+
+    budget = MemoryBudget(unlimited.peak)
+    source = createSource(budget)
+    exportMultipleSheets(str(tmp_path), createGroups(), source, shadow, SheetWriter(indexed=True), False, True)
+    source.clear()
+    assert 0 < budget.peak <= budget.limit
+    assert budget.current == 0
+
+    with pytest.raises(ExportError):
+        exportMultipleSheets(str(tmp_path), createGroups(), createSource(MemoryBudget(PNG_ENCODER_BYTES)), shadow,
+                             SheetWriter(), False, True)
+
+
+def test_streamingMirrorsEachFrameOnce(tmp_path, monkeypatch):
+    mirrored = []
+    flipped = CroppedFrame.flipped
+
+    def countFlip(frame, bounds):
+        mirrored.append(bounds)
+        return flipped(frame, bounds)
+
+    monkeypatch.setattr(CroppedFrame, "flipped", countFlip)
+
+    source = createSource(MemoryBudget(), maxFrames=1)
+    exportMultipleSheets(str(tmp_path), createGroups(), source, createImage(2, 8, 4), SheetWriter(), False, True)
+    assert len(mirrored) == 3
+
+    for index in range(4):
+        frame = source.get(index, True)
+        assert (frame.bounds if frame else None) == source.getBounds(index, True)
+    assert len(mirrored) == 3
+    assert source.getBounds(0, True).x == 16 - source.getBounds(0).right
+
+
+@pytest.mark.parametrize("profile", COMPRESSION_PROFILES)
+@pytest.mark.parametrize("indexed", (False, True))
+def test_writerRoundTripsEveryProfile(tmp_path, profile, indexed):
+    image = createImage(40)
+    pixels = np.array(image)
+    pixels[0, :4, 3] = (0, 64, 128, 192)
+    image = Image.fromarray(pixels, 'RGBA')
+
+    path = str(tmp_path / "Anim.png")
+    writer = SheetWriter(indexed, COMPRESSION_PROFILES[profile])
+    writer.save(image, path)
+
+    with Image.open(path) as written:
+        assert written.mode == ("P" if indexed else "RGBA")
+        assert np.array_equal(np.asarray(written.convert('RGBA')), pixels)
+    assert writer.report == [(path, "indexed, 44 colors" if indexed else "RGBA")]
@@ -0,0 +1,34 @@
+import os
+
+from library import indexCollection, openLibrary, queryLibrary, refreshCharacters
+
+
+def writeCharacter(directory: str, *actions: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "FrameData.xml")
+    anims = "".join(f"<Anim><Name>{action}</Name></Anim>" for action in actions)
+    with open(path, "w") as file:
+        file.write(f"<AnimData><FrameWidth>32</FrameWidth><FrameHeight>32</FrameHeight><Anims>{anims}</Anims>"
+                   f"</AnimData>")
+    return path
+
+
+def test_refreshCharactersOnlyRereadsChangedOnes(tmp_path):
+    first = writeCharacter(str(tmp_path / "0001"), "Walk")
+    second = writeCharacter(str(tmp_path / "0002"), "Walk", "Hop")
+    database = str(tmp_path / "library.sqlite")
+    indexCollection(str(tmp_path), database, workers=1)
+
+    writeCharacter(str(tmp_path / "0001"), "Walk", "Hop")
+    os.utime(first, ns=(0, os.stat(first).st_mtime_ns + 10 ** 9))
+    os.remove(second)
+    writeCharacter(str(tmp_path / "0003"), "Walk")
+
+    connection = openLibrary(database)
+    assert refreshCharacters(connection, [first, second]) == 2
+    assert refreshCharacters(connection, [first]) == 0
+
+    # The new character is left for the next index.
+    assert [entry.path for entry in queryLibrary(connection, str(tmp_path))] == [first]
+    assert queryLibrary(connection, str(tmp_path), missingAction="Hop") == []
+    connection.close()
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from data import AnimationSequence, AnimFrame, AnimGroup
+from optimize import _canFlip, applyMirroredDirections, findMirroredDirections, optimizeSheet
+from pixelbuffer import PixelBuffer
+from sheetio import SheetError
+
+SIZE = 8
+
+
+def createCell(width: int, color) -> np.ndarray:
+    """An L shaped sprite width pixels wide, so mirroring it changes it."""
+    cell = np.zeros((SIZE, SIZE, 4), dtype=np.uint8)
+    cell[1:7, 1] = color
+    cell[6, 1:1 + width] = color
+    return cell
+
+
+def createSheet(cells, columns: int = 3) -> PixelBuffer:
+    rows = -(-len(cells) // columns)
+    data = np.zeros((rows * SIZE, columns * SIZE, 4), dtype=np.uint8)
+    for index, cell in enumerate(cells):
+        y, x = (index // columns) * SIZE, (index % columns) * SIZE
+        data[y:y + SIZE, x:x + SIZE] = cell
+    return PixelBuffer(data)
+
+
+def createGroup(name: str, frames) -> AnimGroup:
+    """frames are (frameIndex, flip) of every direction."""
+    group = AnimGroup(0, name)
+    group.directions = [AnimationSequence([AnimFrame(slot, index, flip, 4) for slot, (index, flip) in
+                                           enumerate(frames)]) for _ in range(8)]
+    return group
+
+
+def cellsOf(buffer: PixelBuffer):
+    columns = buffer.width // SIZE
+    return [buffer.data[(index // columns) * SIZE:(index // columns + 1) * SIZE,
+                        (index % columns) * SIZE:(index % columns + 1) * SIZE]
+            for index in range((buffer.height // SIZE) * columns)]
+
+
+def test_optimizeDropsUnusedAndMergesDuplicatesAndMirrors():
+    even, odd = createCell(4, (255, 0, 0, 255)), createCell(3, (0, 255, 0, 255))
+    assert _canFlip(even) and not _canFlip(odd)
+    # Frame 3 is unused, 5 mirrors 4 but is an odd width, so flipping it would move it by a pixel.
+    sheet = createSheet([even, even.copy(), even[:, ::-1], createCell(2, (0, 0, 255, 255)), odd, odd[:, ::-1]])
+    group = createGroup("Walk", [(0, 0), (1, 1), (2, 0), (2, 1), (4, 0), (5, 1)])
+
+    optimized = optimizeSheet([group], sheet, None, SIZE, SIZE)
+    assert (optimized.framesBefore, optimized.framesAfter) == (6, 3)
+    assert (optimized.unusedRemoved, optimized.duplicatesMerged, optimized.flipsMerged) == (1, 1, 1)
+    assert optimized.actionPts is None and optimized.bytesAfter < optimized.bytesBefore
+
+    cells = cellsOf(optimized.sheet)
+    for cell, expected in zip(cells, (even, odd, odd[:, ::-1])):
+        assert np.array_equal(cell, expected)
+
+    for sequence in group.directions:
+        assert [(frame.frameIndex, frame.flip) for frame in sequence.frames] == [(0, 0), (0, 1), (0, 1), (0, 0),
+                                                                                 (1, 0), (2, 1)]
+    assert group.modified
+
+
+def test_optimizeComparesActionPoints():
+    cell = createCell(4, (255, 0, 0, 255))
+    marker = np.zeros_like(cell)
+    marker[2, 5] = (255, 0, 0, 255)
+    sheet = createSheet([cell, cell.copy()])
+    actionPts = createSheet([np.zeros_like(cell), marker])
+    group = createGroup("Walk", [(0, 0), (1, 0)])
+
+    optimized = optimizeSheet([group], sheet, actionPts, SIZE, SIZE)
+    assert optimized.framesAfter == 2 and optimized.duplicatesMerged == 0
+    assert np.array_equal(cellsOf(optimized.actionPts)[1], marker)
+
+
+def test_optimizeRejectsFramesOutsideTheSheet():
+    with pytest.raises(SheetError):
+        optimizeSheet([createGroup("Walk", [(7, 0)])], createSheet([createCell(2, (255, 0, 0, 255))]), None, SIZE,
+                      SIZE)
+
+
+def test_findMirroredDirections():
+    even, odd = createCell(4, (255, 0, 0, 255)), createCell(3, (0, 255, 0, 255))
+    sheet = createSheet([even, even[:, ::-1], odd, odd[:, ::-1]])
+    group = createGroup("Walk", [(0, 0)])
+    group.directions[6] = AnimationSequence([AnimFrame(0, 1, 0, 4)])
+    # The odd width sprite is mirrored too, but flipping it in game would move it by a pixel.
+    group.directions[3] = AnimationSequence([AnimFrame(0, 2, 0, 4)])
+    group.directions[5] = AnimationSequence([AnimFrame(0, 3, 0, 4)])
+    # Already a flipped reference to its opposite direction.
+    group.directions[7] = AnimationSequence([AnimFrame(0, 0, 1, 4)])
+    slower = createGroup("Idle", [(0, 0)])
+    slower.directions[6] = AnimationSequence([AnimFrame(0, 1, 0, 8)])
+
+    mirrors = findMirroredDirections([group, slower], sheet, None, SIZE, SIZE)
+    assert [(mirror.group, mirror.source, mirror.target) for mirror in mirrors] == [(group, 2, 6)]
+
+    applyMirroredDirections(mirrors)
+    assert [(frame.frameIndex, frame.flip) for frame in group.directions[6].frames] == [(0, 1)]
+    assert group.modified and not slower.modified
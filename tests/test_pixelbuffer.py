@@ -0,0 +1,51 @@
+import numpy as np
+from PIL import Image
+
+from pixelbuffer import PixelBuffer, copyStats, resetCopyStats
+
+
+def createSheet(width: int = 6, height: int = 4) -> np.ndarray:
+    return np.arange(width * height * 4, dtype=np.uint32).astype(np.uint8).reshape(height, width, 4)
+
+
+def test_loadCopiesOnce(tmp_path):
+    pixels = createSheet()
+    path = str(tmp_path / "Anim.png")
+    Image.fromarray(pixels, 'RGBA').save(path)
+
+    resetCopyStats()
+    buffer = PixelBuffer.load(path)
+    image = buffer.toImageData()
+    assert np.array_equal(np.asarray(buffer.toPIL()), pixels)
+    assert dict(copyStats) == {"decode": pixels.nbytes}
+
+    # Bottom-up rows with a positive pitch, which pyglet uploads as they are.
+    assert image.pitch == buffer.width * 4
+    assert image.get_data('RGBA', image.pitch) is buffer.rows()
+    assert np.array_equal(np.frombuffer(buffer.rows(), dtype=np.uint8).reshape(pixels.shape)[::-1], pixels)
+
+
+def test_arrayBuffersCopyRowsOnce():
+    pixels = createSheet()
+    resetCopyStats()
+    buffer = PixelBuffer(pixels)
+    assert np.array_equal(np.asarray(buffer.toPIL()), pixels)
+    assert not copyStats
+
+    buffer.toImageData()
+    buffer.toImageData()
+    assert dict(copyStats) == {"buffer to pyglet": pixels.nbytes}
+
+
+def test_qImageRegionsAreUpright():
+    pixels = createSheet()
+    buffer = PixelBuffer.fromPIL(Image.fromarray(pixels, 'RGBA'))
+    resetCopyStats()
+
+    image = buffer.toQImage(2, 1, 3, 2)
+    assert (image.width(), image.height()) == (3, 2)
+    for y in range(2):
+        for x in range(3):
+            color = image.pixelColor(x, y)
+            assert (color.red(), color.green(), color.blue()) == tuple(pixels[1 + y, 2 + x, :3])
+    assert dict(copyStats) == {"buffer to Qt": 3 * 2 * 4}
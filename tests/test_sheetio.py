@@ -0,0 +1,45 @@
+import copy
+
+from data import AnimationSequence, AnimFrame, AnimGroup
+from sheetio import createAnimDataXML, createFrameDataXML
+
+
+def createGroup(idx: int, name: str, duration: int) -> AnimGroup:
+    group = AnimGroup(idx, name)
+    group.directions = [AnimationSequence([AnimFrame(slot, slot, 0, duration) for slot in range(3)])
+                        for _ in range(8)]
+    return group
+
+
+def copiesOf(root) -> dict:
+    return {anim.findtext("Name"): anim.findtext("CopyOf") for anim in root.find("Anims")}
+
+
+def test_automaticCopiesMatchBetweenFormats():
+    walk = createGroup(0, "Walk", 4)
+    groups = [walk, createGroup(1, "Idle", 8), copy.deepcopy(walk)]
+    groups[2].idx, groups[2].name = 2, "Hop"
+
+    frameData, elidedFrames = createFrameDataXML(groups, 32, 32, 0, trim=True, collapse=False)
+    animData = createAnimDataXML(groups, {group.name: (32, 32) for group in groups}, 0, trim=True)
+
+    assert copiesOf(frameData) == copiesOf(animData) == {"Walk": None, "Idle": None, "Hop": "Walk"}
+    assert elidedFrames == 24
+
+    # Copies are only written when trimming.
+    assert set(copiesOf(createAnimDataXML(groups, {}, 0, trim=False)).values()) == {None}
+
+
+def test_automaticCopiesFollowEditsWithoutInvalidate():
+    walk = createGroup(0, "Walk", 4)
+    hop = copy.deepcopy(walk)
+    hop.idx, hop.name = 1, "Hop"
+    # Fill the caches.
+    assert createFrameDataXML([walk, hop], 32, 32, 0, trim=True, collapse=False)[1] == 24
+
+    # Edited without invalidate.
+    hop.directions[5].frames[0].duration = 9
+
+    root, elidedFrames = createFrameDataXML([walk, hop], 32, 32, 0, trim=True, collapse=False)
+    assert copiesOf(root) == {"Walk": None, "Hop": None}
+    assert elidedFrames == 0
@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from data import ActionPoints, Offset
+from utils import (ACTION_POINT_COLORS, _blockSignature, _blockSizes, _signatureExcess, createActionPointSheet,
+                   getShadowLocationFromPILImage, getShadowLocationsFromPILSheet, overlapColors)
+
+
+def createShadowSheet(rows: int, columns: int, frameWidth: int, frameHeight: int, seed: int) -> Image.Image:
+    """Random sheet mixing empty frames, frames with several white pixels, and opaque or near white pixels that are
+    not shadow."""
+    rng = np.random.default_rng(seed)
+    data = np.zeros((rows * frameHeight, columns * frameWidth, 4), dtype=np.uint8)
+
+    for row in range(rows):
+        for column in range(columns):
+            cell = data[row * frameHeight:(row + 1) * frameHeight, column * frameWidth:(column + 1) * frameWidth]
+            kind = rng.integers(4)
+            if kind == 0:
+                continue
+
+            ys, xs = rng.integers(frameHeight, size=6), rng.integers(frameWidth, size=6)
+            cell[ys, xs] = rng.integers(0, 255, size=(6, 4), dtype=np.uint8)
+            cell[ys[:2], xs[:2]] = (255, 255, 254, 255)
+            cell[ys[2], xs[2]] = (255, 255, 255, 0)
+            if kind != 1:
+                cell[ys[3:], xs[3:]] = 255
+
+    return Image.fromarray(data, 'RGBA')
+
+
+def test_sheetLocationsMatchPerFrameSearch():
+    frameWidth, frameHeight = 9, 7
+    for seed in range(5):
+        sheet = createShadowSheet(4, 6, frameWidth, frameHeight, seed)
+        locations = getShadowLocationsFromPILSheet(sheet, frameWidth, frameHeight)
+        assert locations.shape == (4, 6, 2)
+
+        for row in range(4):
+            for column in range(6):
+                frame = sheet.crop((column * frameWidth, row * frameHeight,
+                                    (column + 1) * frameWidth, (row + 1) * frameHeight))
+                expected = getShadowLocationFromPILImage(frame)
+                found = tuple(int(value) for value in locations[row, column])
+                assert found == ((expected.x, expected.y) if expected else (-1, -1)), (seed, row, column)
+
+
+def test_sheetLocationsIgnorePartialFrames():
+    sheet = Image.new('RGBA', (20, 10))
+    sheet.putpixel((19, 9), (255, 255, 255, 255))
+
+    locations = getShadowLocationsFromPILSheet(sheet, 8, 8)
+    assert locations.shape == (1, 2, 2)
+    assert (locations == -1).all()
+
+
+def drawActionPointSheet(size, origins, bodyPoints) -> Image.Image:
+    """Frame by frame drawing that createActionPointSheet replaces."""
+    sheet = Image.new('RGBA', size)
+    draw = ImageDraw.Draw(sheet)
+    for origin, bp in zip(origins, bodyPoints):
+        start = Offset(*origin)
+        positions = defaultdict(list)
+        for point, color in zip(bp.allPos(), ACTION_POINT_COLORS):
+            positions[(start + point).data()].append(color)
+
+        for pos, color in overlapColors(positions).items():
+            draw.point(pos, fill=color)
+
+    return sheet
+
+
+def test_actionPointSheetMatchesDrawing():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        frameCount = int(rng.integers(1, 12))
+        # Small cells and a wide point spread make markers overlap, within a frame and across frames.
+        origins = [(int(x), int(y)) for x, y in rng.integers(0, 16, size=(frameCount, 2))]
+        bodyPoints = [ActionPoints(*(Offset(*(int(v) for v in rng.integers(-3, 4, size=2))) for _ in range(4)))
+                      for _ in range(frameCount)]
+
+        expected = np.asarray(drawActionPointSheet((16, 16), origins, bodyPoints))
+        assert (np.asarray(createActionPointSheet((16, 16), origins, bodyPoints)) == expected).all()
+
+
+def test_signatureExcessNeverRulesOutAMatch():
+    rng = np.random.default_rng(1)
+    for maxPixels, maxDelta in ((0, 6), (4, 0), (4, 12), (30, 40)):
+        for _ in range(50):
+            width, height = (int(value) for value in rng.integers(3, 24, size=2))
+            image = rng.integers(0, 256, size=(height, width, 3)).astype(np.int64)
+
+            # Every pixel moves by up to maxDelta, and up to maxPixels pixels change completely.
+            other = np.clip(image + rng.integers(-maxDelta, maxDelta + 1, size=image.shape), 0, 255)
+            changed = rng.choice(width * height, size=min(maxPixels, width * height), replace=False)
+            other.reshape(-1, 3)[changed] = rng.integers(0, 256, size=(len(changed), 3))
+
+            excess = _signatureExcess(_blockSignature(other)[None], _blockSignature(image),
+                                      _blockSizes(width, height), maxDelta)
+            assert excess[0] <= (255 - maxDelta) * maxPixels
+
+
+def test_signatureExcessRulesOutDifferentFrames():
+    rng = np.random.default_rng(2)
+    maxPixels, maxDelta = 4, 12
+    images = [rng.integers(0, 256, size=(32, 32, 3)) for _ in range(200)]
+    signatures = np.stack([_blockSignature(image) for image in images])
+
+    excess = _signatureExcess(signatures, _blockSignature(images[0]), _blockSizes(32, 32), maxDelta)
+    # Only the image itself passes, unrelated frames are left out without comparing pixels.
+    assert np.flatnonzero(excess <= (255 - maxDelta) * maxPixels).tolist() == [0]
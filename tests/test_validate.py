@@ -0,0 +1,95 @@
+import os
+from xml.etree import ElementTree
+
+import numpy as np
+from PIL import Image
+
+from convert import ConvertOptions, convertSingleToMulti
+from validate import validateFile
+
+from test_convert import createSingleSheet
+
+
+def messages(report):
+    return sorted((issue.severity, issue.animation, issue.message) for issue in report.issues)
+
+
+def editXML(path, edit):
+    tree = ElementTree.parse(path)
+    edit(tree.getroot())
+    tree.write(path)
+
+
+def test_validFilesHaveNoIssues(tmp_path):
+    createSingleSheet(str(tmp_path / "single"))
+    os.makedirs(tmp_path / "multi")
+    convertSingleToMulti(str(tmp_path / "single" / "FrameData.xml"), str(tmp_path / "multi"), ConvertOptions("multi"))
+
+    for relativePath in ("single/FrameData.xml", "multi/AnimData.xml"):
+        assert validateFile(str(tmp_path), relativePath).issues == []
+
+
+def test_brokenFrameData(tmp_path):
+    createSingleSheet(str(tmp_path / "Bulbasaur"))
+    os.remove(tmp_path / "Bulbasaur" / "Offsets.png")
+
+    def breakFrames(root):
+        walk, idle = root.find("Anims")
+        frames = walk.findall("Sequences/AnimSequence/AnimFrame")
+        frames[0].find("FrameIndex").text = "9"
+        frames[1].find("Duration").text = "-1"
+        frames[2].remove(frames[2].find("HFlip"))
+        frames[3].find("Sprite").remove(frames[3].find("Sprite/XOffset"))
+        # Duration differs from the other directions.
+        frames[4].find("Duration").text = "5"
+        sequences = idle.find("Sequences")
+        for sequence in sequences.findall("AnimSequence")[3:]:
+            sequences.remove(sequence)
+        ElementTree.SubElement(ElementTree.SubElement(root.find("Anims"), "Anim"), "CopyOf").text = "Run"
+
+    editXML(str(tmp_path / "Bulbasaur" / "FrameData.xml"), breakFrames)
+    report = validateFile(str(tmp_path), os.path.join("Bulbasaur", "FrameData.xml"))
+    assert report.format == "single" and (report.errors, report.warnings) == (6, 2)
+    issues = messages(report)
+    assert ("error", "Walk", "Sequence 0, frame 0 uses frame 9, the sheet has 3 frames.") in issues
+    assert ("error", "Walk", "Sequence 0, frame 1 has an invalid duration of -1.") in issues
+    assert ("error", "Walk", "Sequence 0, frame 2 has no HFlip.") in issues
+    assert ("error", "Walk", "Sequence 1, frame 0 has an invalid Sprite offset.") in issues
+    assert ("error", "Idle", "Has 3 sequences, must be 1 or 8.") in issues
+    assert ("error", "Anim 2", "CopyOf Run does not exist.") in issues
+    assert ("warning", "", "Offsets.png not found, action points will be unavailable.") in issues
+
+
+def test_brokenAnimData(tmp_path):
+    createSingleSheet(str(tmp_path / "single"))
+    convertSingleToMulti(str(tmp_path / "single" / "FrameData.xml"), str(tmp_path), ConvertOptions("multi"))
+    os.remove(tmp_path / "Idle-Shadow.png")
+
+    offsetsPath = str(tmp_path / "Walk-Offsets.png")
+    with Image.open(offsetsPath) as image:
+        offsets = np.array(image.convert('RGBA'))
+    # Lose the blue action point of one frame.
+    rows, columns = np.nonzero((offsets[..., 2] == 255) & (offsets[..., 3] != 0))
+    offsets[rows[0], columns[0]] = 0
+    Image.fromarray(offsets).save(offsetsPath)
+
+    def breakDurations(root):
+        walk = root.find("Anims")[0]
+        walk.find("Durations/Duration").text = "x"
+        ElementTree.SubElement(walk.find("Durations"), "Duration").text = "4"
+
+    editXML(str(tmp_path / "AnimData.xml"), breakDurations)
+    report = validateFile(str(tmp_path), "AnimData.xml")
+    assert report.format == "multi" and (report.errors, report.warnings) == (4, 0)
+    issues = messages(report)
+    assert ("error", "Walk", "Invalid duration value. Cannot be x") in issues
+    assert ("error", "Walk", "Has 4 durations for 3 frames.") in issues
+    assert ("error", "Idle", "Idle-Shadow.png not found.") in issues
+    assert any(message.startswith("Frame ") and message.endswith("incomplete action points, red, green and blue "
+                                                                 "are all needed.") for _, _, message in issues)
+
+
+def test_unreadableData(tmp_path):
+    (tmp_path / "AnimData.xml").write_text("<AnimData><Anims>", encoding='utf-8')
+    report = validateFile(str(tmp_path), "AnimData.xml")
+    assert report.errors == 1 and report.issues[0].message.startswith("Failed to parse animations XML data")
@@ -0,0 +1,157 @@
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+# Records kept before new spans are only counted, so leaving tracing on can't grow memory without bound.
+MAX_RECORDS = 200000
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    start: int  # perf_counter_ns
+    duration: int  # ns
+    thread: int
+    depth: int
+
+
+@dataclass
+class SpanSummary:
+    name: str
+    depth: int  # Shallowest nesting the span was seen at.
+    calls: int
+    total: int  # ns
+    longest: int  # ns
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls
+
+
+class _NullSpan:
+    """Handed out while tracing is off, entering and leaving it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start", "depth")
+
+    def __init__(self, tracer: 'Tracer', name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        local = self.tracer.local
+        self.depth = getattr(local, "depth", 0)
+        local.depth = self.depth + 1
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer.local.depth = self.depth
+        self.tracer.record(SpanRecord(self.name, self.start, end - self.start, threading.get_ident(), self.depth))
+        return False
+
+
+class Tracer:
+    """Collects named, nested timing spans. Off by default, a disabled span costs a call and an attribute check.
+
+    Span names are dotted, the part before the first dot is the phase ("import.decode" belongs to "import").
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.records: List[SpanRecord] = []
+        self.dropped = 0
+        self.local = threading.local()
+
+    def span(self, name: str):
+        return _Span(self, name) if self.enabled else NULL_SPAN
+
+    def traced(self, name: str) -> Callable:
+        """Decorator timing every call of a function as a span."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+
+                with _Span(self, name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def record(self, record: SpanRecord):
+        if len(self.records) < MAX_RECORDS:
+            self.records.append(record)
+        else:
+            self.dropped += 1
+
+    def reset(self):
+        self.records = []
+        self.dropped = 0
+
+    def summary(self) -> List[SpanSummary]:
+        """Spans aggregated by name, in the order they were first started."""
+        spans: Dict[str, SpanSummary] = {}
+        for record in sorted(self.records, key=lambda record: record.start):
+            entry = spans.get(record.name)
+            if entry is None:
+                spans[record.name] = SpanSummary(record.name, record.depth, 1, record.duration, record.duration)
+            else:
+                entry.depth = min(entry.depth, record.depth)
+                entry.calls += 1
+                entry.total += record.duration
+                entry.longest = max(entry.longest, record.duration)
+
+        return list(spans.values())
+
+    def formatSummary(self) -> str:
+        if not self.records:
+            return "Nothing recorded."
+
+        lines = [f"{'Span':<40}{'Calls':>8}{'Total':>12}{'Mean':>12}{'Longest':>12}"]
+        for entry in self.summary():
+            name = "  " * entry.depth + entry.name
+            lines.append(f"{name:<40}{entry.calls:>8}{entry.total / 1e6:>10.2f}ms{entry.mean / 1e6:>10.3f}ms"
+                         f"{entry.longest / 1e6:>10.2f}ms")
+
+        if self.dropped:
+            lines.append(f"{self.dropped} spans past the first {MAX_RECORDS} were not recorded.")
+
+        return "\n".join(lines)
+
+    def chromeTrace(self) -> dict:
+        """Spans as complete events of the Chrome trace event format, for chrome://tracing or Perfetto."""
+        origin = min((record.start for record in self.records), default=0)
+        pid = os.getpid()
+        events = [{"name": record.name, "cat": record.name.split(".", 1)[0], "ph": "X", "pid": pid,
+                   "tid": record.thread, "ts": (record.start - origin) / 1000, "dur": record.duration / 1000}
+                  for record in self.records]
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def writeChromeTrace(self, path: str):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.chromeTrace(), file)
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
@@ -1,10 +1,11 @@
 import math
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 
+import numpy as np
 import pyglet
-from PIL import Image, ImageChops, ImageDraw
+from PIL import Image, ImageDraw
 
-from data import AnimFrame, Offset
+from data import AnimFrame, DuplicateTolerance, NearDuplicate, Offset
 
 
 class TopLeftTextureGrid(pyglet.image.TextureGrid):
@@ -93,54 +94,123 @@ class Camera:
         self.glWidget.view = view_matrix
 
 
-def checkDuplicateImages(images: List, bodyCheck=True):
+# Frames are summarized as this many blocks a side to rule out near-duplicate candidates cheaply.
+SIGNATURE_BLOCKS = 4
+
+
+def _blockEdges(length: int) -> np.ndarray:
+    return np.unique(np.linspace(0, length, SIGNATURE_BLOCKS, endpoint=False).astype(int))
+
+
+def _blockSignature(pixels: np.ndarray) -> np.ndarray:
+    """Per-block channel sums of an RGB array, shaped (blocks, 3)."""
+    sums = np.add.reduceat(pixels.astype(np.int64), _blockEdges(pixels.shape[0]), axis=0)
+    return np.add.reduceat(sums, _blockEdges(pixels.shape[1]), axis=1).reshape(-1, 3)
+
+
+def _blockSizes(width: int, height: int) -> np.ndarray:
+    """Pixels in each block of _blockSignature."""
+    rows = np.diff(np.append(_blockEdges(height), height))
+    columns = np.diff(np.append(_blockEdges(width), width))
+    return np.outer(rows, columns).ravel()
+
+
+def _signatureExcess(signatures: np.ndarray, signature: np.ndarray, sizes: np.ndarray, maxDelta: int) -> np.ndarray:
+    """Lower bound of (255 - maxDelta) times the pixels that differ by more than maxDelta, for every signature.
+
+    A block sum can move by maxDelta for each of its pixels plus 255 - maxDelta more for each differing pixel, so
+    what a block differs by beyond maxDelta times its size takes at least that many differing pixels in it."""
+    excess = np.abs(signatures - signature) - maxDelta * sizes[:, None]
+    return np.clip(excess, 0, None).max(axis=-1).sum(axis=-1)
+
+
+def checkDuplicateImages(images: List, bodyCheck=True, tolerance: Optional[DuplicateTolerance] = None):
+    """Map every image to a unique one, possibly flipped, merging near duplicates within the tolerance. Returns the
+    unique images, the frame of each image, the body points of each unique image and the near duplicate merges made."""
     uniqueImages = []
     uniqueBodyPoints = []
     cachedRGB = []
     imagesToFrames = {}
-    testing = {}
+    nearDuplicates: List[NearDuplicate] = []
+
+    exactBuckets: Dict[Tuple, List[int]] = {}
+    # Unique indexes and signatures of each image size, for near duplicate searches.
+    sizeBuckets: Dict[Tuple[int, int], Tuple[List[int], List[np.ndarray]]] = {}
+    useTolerance = tolerance is not None and tolerance.enabled
 
     for imgIdx, (image, bodyPoints) in enumerate(images):
-        convert = image.convert('RGB')  # Convert to RGB or comparisons won't work.
-        flipped = convert.transpose(Image.FLIP_LEFT_RIGHT)
+        convert = np.asarray(image.convert('RGB'))  # Convert to RGB or comparisons won't work.
+        flipped = convert[:, ::-1]
         oddWidth = image.width % 2 == 1
-
-        dupe = False
-        # Check if the image is a duplicate of our unique ones, if not, it will be unique.
-        for compareIdx, compareImage in enumerate(uniqueImages):
-            # Quick check for sizes.
-
-            if image.width == compareImage.width and image.height == compareImage.height:
-                diff = ImageChops.difference(convert, cachedRGB[compareIdx])
-                if diff.getbbox() is None and (bodyCheck is False or uniqueBodyPoints[compareIdx].equals(bodyPoints, False, oddWidth)):
-                    # It's a duplicate.
-                    #print("duplicate")
-                    aniFrame = AnimFrame()
-                    aniFrame.frameIndex = compareIdx
-                    imagesToFrames[imgIdx] = aniFrame
-                    dupe = True
-                    break
-
-                diff = ImageChops.difference(flipped, cachedRGB[compareIdx])
-                if diff.getbbox() is None and (bodyCheck is False or uniqueBodyPoints[compareIdx].equals(bodyPoints, True, oddWidth)):
-                    #print("I found a flip!")
-                    aniFrame = AnimFrame()
-                    aniFrame.frameIndex = compareIdx
-                    aniFrame.flip = True
-                    imagesToFrames[imgIdx] = aniFrame
-                    dupe = True
-                    break
-
-        if not dupe:
+        size = (image.width, image.height)
+
+        key = (size, convert.tobytes())
+        flipKey = (size, flipped.tobytes())
+        direct = exactBuckets.get(key, [])
+        mirrored = exactBuckets.get(flipKey, [])
+
+        aniFrame = None
+        # Check if the image is a duplicate of our unique ones, in unique order, if not, it will be unique.
+        for compareIdx in sorted(set(direct) | set(mirrored)):
+            if compareIdx in direct and (bodyCheck is False or
+                                         uniqueBodyPoints[compareIdx].equals(bodyPoints, False, oddWidth)):
+                aniFrame = AnimFrame()
+                aniFrame.frameIndex = compareIdx
+                break
+
+            if compareIdx in mirrored and (bodyCheck is False or
+                                           uniqueBodyPoints[compareIdx].equals(bodyPoints, True, oddWidth)):
+                aniFrame = AnimFrame()
+                aniFrame.frameIndex = compareIdx
+                aniFrame.flip = True
+                break
+
+        if aniFrame is None and useTolerance and size in sizeBuckets:
+            indexes, signatures = sizeBuckets[size]
+            stacked = np.stack(signatures)
+            sizes = _blockSizes(image.width, image.height)
+            # Largest excess a pair within the tolerance can have.
+            bound = (255 - tolerance.maxDelta) * tolerance.maxPixels
+
+            best = None
+            for flip, candidate in ((False, convert), (True, flipped)):
+                excess = _signatureExcess(stacked, _blockSignature(candidate), sizes, tolerance.maxDelta)
+                for position in np.flatnonzero(excess <= bound):
+                    compareIdx = indexes[position]
+                    delta = np.abs(candidate.astype(np.int16) - cachedRGB[compareIdx].astype(np.int16)).max(axis=2)
+                    differing = int((delta > tolerance.maxDelta).sum())
+                    if differing > tolerance.maxPixels:
+                        continue
+
+                    if bodyCheck and not uniqueBodyPoints[compareIdx].equals(bodyPoints, flip, oddWidth):
+                        continue
+
+                    if best is None or (differing, compareIdx, flip) < (best.differingPixels, best.uniqueIndex,
+                                                                         best.flip):
+                        best = NearDuplicate(imgIdx, compareIdx, flip, differing, int(delta.max()))
+
+            if best:
+                aniFrame = AnimFrame()
+                aniFrame.frameIndex = best.uniqueIndex
+                aniFrame.flip = best.flip
+                nearDuplicates.append(best)
+
+        if aniFrame is None:
             aniFrame = AnimFrame()
             aniFrame.frameIndex = len(uniqueImages)
+            exactBuckets.setdefault(key, []).append(aniFrame.frameIndex)
+            if useTolerance:
+                indexes, signatures = sizeBuckets.setdefault(size, ([], []))
+                indexes.append(aniFrame.frameIndex)
+                signatures.append(_blockSignature(convert))
+
             uniqueImages.append(image)
             cachedRGB.append(convert)
             uniqueBodyPoints.append(bodyPoints)
-            testing[aniFrame.frameIndex] = imgIdx
-            imagesToFrames[imgIdx] = aniFrame
 
-    return uniqueImages, imagesToFrames, uniqueBodyPoints
+        imagesToFrames[imgIdx] = aniFrame
+
+    return uniqueImages, imagesToFrames, uniqueBodyPoints, nearDuplicates
 
 
 def roundUpToMult(inInt: int, inMult: int) -> int:
@@ -232,6 +302,29 @@ def getShadowLocationFromPILImage(image) -> Offset | None:
     return None
 
 
+def getShadowLocationsFromPILSheet(image, frameWidth: int, frameHeight: int) -> np.ndarray:
+    """Find the first white shadow pixel of every frame in a shadow sheet at once.
+
+    Returns an array of shape (rows, columns, 2) holding the (x, y) location relative to each frame, matching
+    getShadowLocationFromPILImage. Frames without a shadow pixel are set to -1."""
+    data = np.asarray(image.convert('RGBA'))
+    rows, columns = image.height // frameHeight, image.width // frameWidth
+
+    # Split the sheet into (row, column, pixels) so each frame is scanned in the same order as the per-frame search.
+    data = data[:rows * frameHeight, :columns * frameWidth]
+    white = np.all(data == 255, axis=-1)
+    white = white.reshape(rows, frameHeight, columns, frameWidth).transpose(0, 2, 1, 3)
+    white = white.reshape(rows, columns, frameHeight * frameWidth)
+
+    first = np.argmax(white, axis=-1)
+    found = np.take_along_axis(white, first[..., None], axis=-1)[..., 0]
+
+    locations = np.stack((first % frameWidth, first // frameWidth), axis=-1)
+    locations[~found] = -1
+
+    return locations
+
+
 def getActionPointsFromPILImage(image) -> Tuple[None | Offset, None | Offset, None | Offset,
                                                                            None | Offset]:
     """Search an offsets image for the colors specifying attachment points on the animation."""
@@ -272,6 +365,102 @@ def createPlusImage(size: int, color: Tuple):
 
     return pyglet.image.ImageData(image.width, image.height, 'RGBA', image.tobytes())
 
+def stampImage(size: Tuple[int, int], stamp: Image.Image, positions: List[Tuple[int, int]]) -> Image.Image:
+    """Paste stamp at every position in one operation.
+
+    Same result as pasting without a mask in order: where stamps overlap the last one wins, and anything outside the
+    image is clipped."""
+    width, height = size
+    canvas = np.zeros((height, width, 4), dtype=np.uint8)
+
+    positions = np.array(positions, dtype=np.int64).reshape(-1, 2)
+    if not len(positions):
+        return Image.fromarray(canvas)
+
+    stampData = np.asarray(stamp.convert('RGBA'))
+    localY, localX = np.mgrid[0:stampData.shape[0], 0:stampData.shape[1]]
+
+    xs = positions[:, 0, None, None] + localX
+    ys = positions[:, 1, None, None] + localY
+    order = np.broadcast_to(np.arange(len(positions))[:, None, None], xs.shape)
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+
+    # Find the last stamp covering each pixel, then copy the stamp's pixels over in one go.
+    owner = np.full((height, width), -1, dtype=np.int64)
+    np.maximum.at(owner, (ys[inside], xs[inside]), order[inside])
+
+    coverY, coverX = np.nonzero(owner >= 0)
+    stampIdx = owner[coverY, coverX]
+    canvas[coverY, coverX] = stampData[coverY - positions[stampIdx, 1], coverX - positions[stampIdx, 0]]
+
+    return Image.fromarray(canvas)
+
+
+def stampImageBytes(size: Tuple[int, int], stampSize: Tuple[int, int], count: int) -> int:
+    """Most memory stampImage holds at once for these arguments, the returned canvas included."""
+    pixels = size[0] * size[1]
+    stampPixels = stampSize[0] * stampSize[1]
+    # Per stamped pixel: int64 x and y, the inside mask and the masked x, y and order. Per canvas pixel: the canvas,
+    # the int64 owner, the covered y, x and owner, and the gathered stamp pixels.
+    return count * stampPixels * (8 * 2 + 1 + 8 * 3) + pixels * (4 + 8 + 8 * 3 + 4) + stampPixels * (4 + 8 * 2)
+
+
+def toPaletteImage(image: Image.Image, maxColors: int = 256) -> Optional[Image.Image]:
+    """Losslessly convert an image to palette mode, with alpha kept in the palette transparency.
+
+    Returns None if the image has more than maxColors distinct colors (counting alpha)."""
+    data = np.ascontiguousarray(np.asarray(image.convert('RGBA')))
+    colors, indexes = np.unique(data.view(np.uint32).ravel(), return_inverse=True)
+    if len(colors) > maxColors:
+        return None
+
+    palette = colors.view(np.uint8).reshape(-1, 4)
+
+    paletteImage = Image.frombytes('P', image.size, indexes.astype(np.uint8).tobytes())
+    paletteImage.putpalette(palette[:, :3].tobytes(), 'RGB')
+    if (palette[:, 3] != 255).any():
+        paletteImage.info['transparency'] = palette[:, 3].tobytes()
+
+    return paletteImage
+
+
+# Marker colors in the order of ActionPoints.allPos(): left hand, center, right hand, head.
+ACTION_POINT_COLORS = ((255, 0, 0, 255), (0, 255, 0, 255), (0, 0, 255, 255), (0, 0, 0, 255))
+
+
+def createActionPointSheet(size: Tuple[int, int], origins: List[Tuple[int, int]], bodyPoints: List) -> Image.Image:
+    """Build an offsets sheet by scattering the action point markers of every frame in one operation.
+
+    origins are the sheet positions of each frame's center, bodyPoints the matching ActionPoints. Markers of one frame
+    that land on the same pixel are combined by taking the maximum of each channel, the same as overlapColors, and a
+    later frame's marker replaces an earlier frame's, the same as drawing the frames in order."""
+    width, height = size
+    data = np.zeros((height, width, 4), dtype=np.uint8)
+
+    points = np.array([[point.data() for point in bp.allPos()] for bp in bodyPoints], dtype=np.int64).reshape(-1, 4, 2)
+    points += np.array(origins, dtype=np.int64).reshape(-1, 1, 2)
+
+    xs, ys = points[..., 0].ravel(), points[..., 1].ravel()
+    frames = np.repeat(np.arange(len(points)), 4)
+    colors = np.tile(np.array(ACTION_POINT_COLORS, dtype=np.uint8), (len(points), 1))
+
+    # Drawing ignores points outside of the image, do the same.
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    pixels = ys[inside] * width + xs[inside]
+
+    # Combine the markers of each frame per pixel, keys sort by pixel then frame.
+    keys, owner = np.unique(pixels * max(len(points), 1) + frames[inside], return_inverse=True)
+    combined = np.zeros((len(keys), 4), dtype=np.uint8)
+    np.maximum.at(combined, owner, colors[inside])
+
+    # Then keep the last frame drawn on each pixel.
+    keyPixels = keys // max(len(points), 1)
+    last = np.append(keyPixels[1:] != keyPixels[:-1], True)
+    data.reshape(-1, 4)[keyPixels[last]] = combined[last]
+
+    return Image.fromarray(data)
+
+
 def overlapColors(positions: Dict):
     combinedPositions = {}
 
@@ -0,0 +1,338 @@
+import os
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyglet
+
+# Workers never need a window, also when they import this module fresh.
+pyglet.options['shadow_window'] = False
+
+from PIL import Image
+
+from data import AnimFrame, AnimGroup, AnimationSequence
+from sheetio import SheetError, getFrameUniformity
+
+DATA_FILES = {"FrameData.xml": "single", "AnimData.xml": "multi"}
+
+# Images an AnimData.xml needs for every animation that isn't a copy.
+MULTI_SHEET_LAYERS = ("Anim", "Offsets", "Shadow")
+
+
+@dataclass
+class Issue:
+    severity: str  # "error" or "warning".
+    message: str
+    animation: str = ""
+
+
+@dataclass
+class FileReport:
+    path: str
+    format: str  # "single" or "multi".
+    issues: List[Issue] = field(default_factory=list)
+
+    def error(self, message: str, animation: str = ""):
+        self.issues.append(Issue("error", message, animation))
+
+    def warning(self, message: str, animation: str = ""):
+        self.issues.append(Issue("warning", message, animation))
+
+    @property
+    def errors(self) -> int:
+        return sum(1 for issue in self.issues if issue.severity == "error")
+
+    @property
+    def warnings(self) -> int:
+        return sum(1 for issue in self.issues if issue.severity == "warning")
+
+    def toDict(self) -> dict:
+        return {"path": self.path, "format": self.format, "errors": self.errors, "warnings": self.warnings,
+                "issues": [asdict(issue) for issue in self.issues]}
+
+
+def findDataFiles(directory: str) -> List[str]:
+    """Every FrameData.xml and AnimData.xml under the directory, relative to it."""
+    found = []
+    for dirPath, dirNames, fileNames in os.walk(directory):
+        dirNames.sort()
+        for name in sorted(fileNames):
+            if name in DATA_FILES:
+                found.append(os.path.relpath(os.path.join(dirPath, name), directory))
+
+    return found
+
+
+def _int(element: Optional[ElementTree.Element]) -> Optional[int]:
+    """Integer text of an element, None if it is missing or not a number."""
+    if element is None or element.text is None:
+        return None
+
+    try:
+        return int(element.text)
+    except ValueError:
+        return None
+
+
+def _loadImage(report: FileReport, path: str, animation: str = "") -> Optional[Image.Image]:
+    if not os.path.exists(path):
+        report.error(f"{os.path.basename(path)} not found.", animation)
+        return None
+
+    try:
+        with Image.open(path) as image:
+            return image.convert('RGBA')
+    except OSError as e:
+        report.error(f"{os.path.basename(path)} could not be read: {e}", animation)
+        return None
+
+
+def _checkCopies(report: FileReport, names: List[str], copies: Dict[str, str]):
+    for name, copyName in copies.items():
+        if copyName not in names:
+            report.error(f"CopyOf {copyName} does not exist.", name)
+        elif copyName in copies:
+            report.warning(f"CopyOf {copyName}, which is a copy itself.", name)
+
+    seen = set()
+    for name in names:
+        if name in seen:
+            report.warning("Animation name is used more than once.", name)
+        seen.add(name)
+
+
+def _checkUniformity(report: FileReport, name: str, durations: List[List[int]]):
+    """Single sheets with durations differing per direction load fine, but can't be exported as multi-sheets."""
+    group = AnimGroup(-1, name, directions=[AnimationSequence([AnimFrame(i, 0, 0, duration)
+                                                               for i, duration in enumerate(sequence)])
+                                            for sequence in durations])
+    try:
+        getFrameUniformity(group)
+    except SheetError as e:
+        report.warning(str(e), name)
+
+
+def _partialActionPoints(offsetImage: Image.Image, frameWidth: int, frameHeight: int) -> List[Tuple[int, int]]:
+    """(row, column) of every frame with some action points, but not all of red, green and blue."""
+    data = np.asarray(offsetImage)
+    rows, columns = offsetImage.height // frameHeight, offsetImage.width // frameWidth
+    cells = data[:rows * frameHeight, :columns * frameWidth].reshape(rows, frameHeight, columns, frameWidth, 4)
+
+    # Same tests as the importer does per pixel.
+    visible = cells[..., 3] != 0
+    red = (visible & (cells[..., 0] == 255)).any(axis=(1, 3))
+    green = (visible & (cells[..., 1] == 255)).any(axis=(1, 3))
+    blue = (visible & (cells[..., 2] == 255)).any(axis=(1, 3))
+    black = (visible & (cells[..., :3] == 0).all(axis=-1) & (cells[..., 3] == 255)).any(axis=(1, 3))
+
+    partial = (red | green | blue | black) & ~(red & green & blue)
+    return [(int(row), int(column)) for row, column in zip(*np.nonzero(partial))]
+
+
+def _parseRoot(report: FileReport, path: str) -> Optional[ElementTree.Element]:
+    try:
+        root = ElementTree.parse(path).getroot()
+    except (ElementTree.ParseError, OSError) as e:
+        report.error(f"Failed to parse animations XML data: {e}")
+        return None
+
+    if root.find('Anims') is None:
+        report.error("Unable to find any Animation XML data.")
+        return None
+
+    if _int(root.find("ShadowSize")) is None:
+        report.error("ShadowSize is missing or not a number.")
+
+    return root
+
+
+def validateFrameData(path: str, report: FileReport):
+    root = _parseRoot(report, path)
+    if root is None:
+        return
+
+    frameWidth, frameHeight = _int(root.find("FrameWidth")), _int(root.find("FrameHeight"))
+    if not frameWidth or not frameHeight or frameWidth < 0 or frameHeight < 0:
+        report.error("FrameWidth and FrameHeight must be positive numbers.")
+        frameWidth = frameHeight = None
+
+    dirName = os.path.dirname(path)
+    sheet = _loadImage(report, os.path.join(dirName, "Anim.png"))
+    frameCount = None
+    if sheet and frameWidth:
+        if sheet.width % frameWidth or sheet.height % frameHeight:
+            report.warning(f"Sheet is not evenly divisible by frame dimensions. Image Dimensions: "
+                           f"{sheet.width}x{sheet.height}, Data Dimensions: {frameWidth}x{frameHeight}.")
+
+        frameCount = (sheet.width // frameWidth) * (sheet.height // frameHeight)
+
+    offsetsPath = os.path.join(dirName, "Offsets.png")
+    if os.path.exists(offsetsPath):
+        offsets = _loadImage(report, offsetsPath)
+        if offsets and sheet and offsets.size != sheet.size:
+            report.error(f"Offsets.png is {offsets.width}x{offsets.height}, Anim.png is {sheet.width}x{sheet.height}.")
+    else:
+        report.warning("Offsets.png not found, action points will be unavailable.")
+
+    names = []
+    copies = {}
+    for index, anim in enumerate(root.find('Anims')):
+        name = anim.findtext("Name") or f"Anim {index}"
+        names.append(name)
+
+        copyName = anim.findtext("CopyOf")
+        if copyName:
+            copies[name] = copyName
+            continue
+
+        for tag in ("Index", "RushFrame", "HitFrame", "ReturnFrame"):
+            if anim.find(tag) is not None and _int(anim.find(tag)) is None:
+                report.error(f"{tag} is not a number.", name)
+
+        sequences = anim.findall("Sequences/AnimSequence")
+        if not sequences:
+            report.warning("No sequences found, empty ones will be generated.", name)
+            continue
+
+        if len(sequences) not in (1, 8):
+            report.error(f"Has {len(sequences)} sequences, must be 1 or 8.", name)
+
+        durations = []
+        for sequenceIdx, sequence in enumerate(sequences):
+            durations.append([])
+            for frameIdx, frame in enumerate(sequence.findall("AnimFrame")):
+                where = f"Sequence {sequenceIdx}, frame {frameIdx}"
+                for tag in ("FrameIndex", "Duration", "HFlip", "Sprite", "Shadow"):
+                    if frame.find(tag) is None:
+                        report.error(f"{where} has no {tag}.", name)
+
+                for tag in ("Sprite", "Shadow"):
+                    offset = frame.find(tag)
+                    if offset is not None and (len(offset) != 2 or any(_int(value) is None for value in offset)):
+                        report.error(f"{where} has an invalid {tag} offset.", name)
+
+                frameIndex = _int(frame.find("FrameIndex"))
+                if frame.find("FrameIndex") is not None and frameIndex is None:
+                    report.error(f"{where} has an invalid FrameIndex.", name)
+                elif frameIndex is not None and frameCount is not None and not 0 <= frameIndex < frameCount:
+                    report.error(f"{where} uses frame {frameIndex}, the sheet has {frameCount} frames.", name)
+
+                duration = _int(frame.find("Duration"))
+                if frame.find("Duration") is not None and (duration is None or duration <= 0):
+                    report.error(f"{where} has an invalid duration of {frame.findtext('Duration')}.", name)
+
+                durations[-1].append(duration or 0)
+
+        if len(sequences) == 8:
+            _checkUniformity(report, name, durations)
+
+    _checkCopies(report, names, copies)
+
+
+def validateAnimData(path: str, report: FileReport):
+    root = _parseRoot(report, path)
+    if root is None:
+        return
+
+    dirName = os.path.dirname(path)
+    names = []
+    copies = {}
+    for index, anim in enumerate(root.find('Anims')):
+        name = anim.findtext("Name") or f"Anim {index}"
+        names.append(name)
+
+        copyName = anim.findtext("CopyOf")
+        if copyName:
+            copies[name] = copyName
+            continue
+
+        durations = []
+        for durationElement in anim.findall("Durations/Duration"):
+            duration = _int(durationElement)
+            if duration is None or duration <= 0:
+                report.error(f"Invalid duration value. Cannot be {durationElement.text}", name)
+            durations.append(duration)
+
+        frameWidth, frameHeight = _int(anim.find("FrameWidth")), _int(anim.find("FrameHeight"))
+        if not frameWidth or not frameHeight:
+            report.error("Could not find frame dimensions.", name)
+
+        images = {layer: _loadImage(report, os.path.join(dirName, f"{name}-{layer}.png"), name)
+                  for layer in MULTI_SHEET_LAYERS}
+        if not all(images.values()):
+            continue
+
+        if len({image.size for image in images.values()}) > 1:
+            report.error("Dimensions of Anims, Shadows, and Offsets do not match.", name)
+            continue
+
+        animImage = images["Anim"]
+        if not frameWidth or not frameHeight:
+            continue
+
+        if animImage.width % frameWidth or animImage.height % frameHeight:
+            report.error(f"Animation of {animImage.width}x{animImage.height} is not divisible by frame dimensions "
+                         f"{frameWidth}x{frameHeight}.", name)
+            continue
+
+        columns, rows = animImage.width // frameWidth, animImage.height // frameHeight
+        if len(durations) != columns:
+            report.error(f"Has {len(durations)} durations for {columns} frames.", name)
+
+        if rows not in (1, 8):
+            report.error(f"Has {rows} directions, must be 1 or 8.", name)
+
+        for row, column in _partialActionPoints(images["Offsets"], frameWidth, frameHeight):
+            report.error(f"Frame {column} of direction row {row} has incomplete action points, red, green and blue "
+                         f"are all needed.", name)
+
+    _checkCopies(report, names, copies)
+
+
+def validateFile(directory: str, relativePath: str) -> FileReport:
+    """Check one data file and the images next to it, collecting every issue. Runs in a worker process."""
+    path = os.path.join(directory, relativePath)
+    report = FileReport(relativePath.replace(os.sep, "/"), DATA_FILES[os.path.basename(path)])
+
+    try:
+        if report.format == "single":
+            validateFrameData(path, report)
+        else:
+            validateAnimData(path, report)
+    except Exception as e:
+        # A check tripping over something unexpected is still a problem with the file, keep going with the rest.
+        report.error(f"Validation stopped: {type(e).__name__}: {e}")
+
+    return report
+
+
+def validateTree(directory: str, workers: Optional[int] = None) -> List[FileReport]:
+    paths = findDataFiles(directory)
+    if not paths:
+        return []
+
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(validateFile, [directory] * len(paths), paths))
+
+
+def validationSummary(reports: List[FileReport]) -> dict:
+    return {"files": len(reports),
+            "failed": sum(1 for report in reports if report.errors),
+            "errors": sum(report.errors for report in reports),
+            "warnings": sum(report.warnings for report in reports)}
+
+
+def formatValidationReport(reports: List[FileReport]) -> str:
+    lines = []
+    for report in reports:
+        for issue in report.issues:
+            animation = f" [{issue.animation}]" if issue.animation else ""
+            message = issue.message.replace("\n", " ").strip()
+            lines.append(f"{report.path}{animation}: {issue.severity}: {message}")
+
+    summary = validationSummary(reports)
+    lines.append(f"{summary['files']} files checked, {summary['failed']} with errors. {summary['errors']} errors and "
+                 f"{summary['warnings']} warnings.")
+    return "\n".join(lines)